@@ -0,0 +1,201 @@
+import math
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, DurationField, ExpressionWrapper, F, FloatField, Min, Q, Sum, Value, Window
+from django.db.models.functions import Cos, CumeDist, ExtractHour, ExtractMinute, ExtractSecond, Sin
+
+from .cohorts import AGE_BAND_WIDTH
+from .models import CompanyUserEngagement, CampaignStatistics
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+# Upper edges, in seconds, of the time-to-open and time-to-click histogram buckets
+DELAY_BUCKETS = [60, 5 * 60, 15 * 60, 60 * 60, 6 * 60 * 60, SECONDS_PER_DAY]
+DELAY_PERCENTILES = [50, 90, 99]
+# Aggregates are invalidated on change; the timeout only bounds how stale a missed invalidation can leave them
+AGGREGATE_CACHE_TIMEOUT = 60 * 60
+FUNNEL_CACHE_TIMEOUT = 5 * 60
+
+# Breakdown name -> expression grouping engagement rows into segments
+FUNNEL_SEGMENTS = {
+    'gender': F('user_id__gender'),
+    'timezone': F('user_id__timezone'),
+    'age_band': F('user_id__age') / AGE_BAND_WIDTH * AGE_BAND_WIDTH,
+    'send_hour': ExtractHour('send_time'),
+}
+
+
+def optimal_start_time_key(org_id):
+    return f"optimal_start_time_{org_id}"
+
+
+def chart_data_key(org_id):
+    return f"chart_data_{org_id}"
+
+
+def campaign_funnel_key(campaign_id):
+    return f"campaign_funnel_{campaign_id}"
+
+
+def compute_optimal_start_time(org_id):
+    """
+    Circular mean of the organization's open times as "HH:MM" (UTC), or None.
+
+    Open times are mapped onto the unit circle by time of day and averaged in a
+    single aggregate query, so 23:50 and 00:10 average to 00:00 instead of noon.
+    """
+    seconds_of_day = ExpressionWrapper(
+        ExtractHour('open_time') * 3600 + ExtractMinute('open_time') * 60 + ExtractSecond('open_time'),
+        output_field=FloatField(),
+    )
+    angle = ExpressionWrapper(
+        seconds_of_day * Value(2 * math.pi / SECONDS_PER_DAY),
+        output_field=FloatField(),
+    )
+    totals = CompanyUserEngagement.objects.filter(
+        org_id_id=org_id,
+        open_time__isnull=False,
+    ).aggregate(opens=Count('id'), cos_sum=Sum(Cos(angle)), sin_sum=Sum(Sin(angle)))
+
+    if not totals['opens']:
+        return None
+
+    mean_angle = math.atan2(totals['sin_sum'], totals['cos_sum']) % (2 * math.pi)
+    mean_seconds = int(round(mean_angle * SECONDS_PER_DAY / (2 * math.pi))) % SECONDS_PER_DAY
+    return f"{mean_seconds // 3600:02d}:{mean_seconds % 3600 // 60:02d}"
+
+
+def get_optimal_start_time(org_id):
+    """Cached optimal start time of an organization; invalidated when an open is recorded"""
+    optimal_start_time = cache.get(optimal_start_time_key(org_id))
+    if optimal_start_time is None:
+        # An empty string caches "no opens yet" so it is not recomputed on every request
+        optimal_start_time = compute_optimal_start_time(org_id) or ''
+        cache.set(optimal_start_time_key(org_id), optimal_start_time, timeout=AGGREGATE_CACHE_TIMEOUT)
+    return optimal_start_time or None
+
+
+def get_chart_data_rows(org_id):
+    """Per-campaign chart rows of an organization, joined in one query and cached until stats change"""
+    chart_data = cache.get(chart_data_key(org_id))
+    if chart_data is None:
+        chart_data = list(
+            CampaignStatistics.objects.filter(org_id_id=org_id).annotate(
+                campaignName=F('campaign_id__campaign_name'),
+                start_date=F('campaign_id__campaign_start_date'),
+                clickRate=F('user_click_rate'),
+                openRate=F('user_open_rate'),
+                engagementDelay=F('user_engagement_delay'),
+                campaignId=F('campaign_id_id'),
+            ).values('id', 'campaignName', 'start_date', 'clickRate', 'openRate', 'engagementDelay', 'campaignId')
+        )
+        cache.set(chart_data_key(org_id), chart_data, timeout=AGGREGATE_CACHE_TIMEOUT)
+    return chart_data
+
+
+def stage_counts():
+    """Aggregates counting sends, opens and clicks, by row and by distinct contact"""
+    opened, clicked = Q(open_time__isnull=False), Q(click_time__isnull=False)
+    return {
+        'sent': Count('id'),
+        'opened': Count('id', filter=opened),
+        'clicked': Count('id', filter=clicked),
+        'contactsSent': Count('user_id', distinct=True),
+        'contactsOpened': Count('user_id', distinct=True, filter=opened),
+        'contactsClicked': Count('user_id', distinct=True, filter=clicked),
+    }
+
+
+def conversion(numerator, denominator):
+    return numerator / denominator if denominator else None
+
+
+def delay_distribution(engagements, event_field):
+    """
+    Percentiles and histogram of the time from send to `event_field`, in seconds.
+
+    Percentiles come from a CUME_DIST window over the delays and the histogram
+    from filtered counts, all folded into one aggregate query.
+    """
+    delays = engagements.filter(**{f'{event_field}__isnull': False}).annotate(
+        delay=ExpressionWrapper(F(event_field) - F('send_time'), output_field=DurationField()),
+        cume_dist=Window(CumeDist(), order_by=F('delay').asc()),
+    )
+    aggregates = {f'p{p}': Min('delay', filter=Q(cume_dist__gte=p / 100)) for p in DELAY_PERCENTILES}
+    aggregates.update({
+        f'under_{edge}': Count('id', filter=Q(delay__lt=timedelta(seconds=edge))) for edge in DELAY_BUCKETS
+    })
+    aggregates['total'] = Count('id')
+    totals = delays.aggregate(**aggregates)
+
+    histogram, below = [], 0
+    for lower, upper in zip([0] + DELAY_BUCKETS, DELAY_BUCKETS + [None]):
+        cumulative = totals[f'under_{upper}'] if upper else totals['total']
+        histogram.append({'from': lower, 'to': upper, 'count': cumulative - below})
+        below = cumulative
+    return {
+        'percentiles': {
+            f'p{p}': totals[f'p{p}'].total_seconds() if totals[f'p{p}'] is not None else None
+            for p in DELAY_PERCENTILES
+        },
+        'histogram': histogram,
+    }
+
+
+def compute_campaign_funnel(org_id, campaign_id):
+    """
+    Send -> open -> click funnel of a campaign, computed entirely in the database.
+
+    Returns the stage counts and conversion rates, the time-to-open and
+    time-to-click distributions, and the funnel per contact segment.
+    """
+    engagements = CompanyUserEngagement.objects.filter(org_id_id=org_id, campaign_id_id=campaign_id)
+    stages = engagements.aggregate(**stage_counts())
+    stages.update({
+        'openRate': conversion(stages['opened'], stages['sent']),
+        'clickRate': conversion(stages['clicked'], stages['sent']),
+        'clickToOpenRate': conversion(stages['clicked'], stages['opened']),
+    })
+
+    segments = {}
+    for name, expression in FUNNEL_SEGMENTS.items():
+        rows = (
+            engagements.annotate(segment=expression)
+            .values('segment')
+            .annotate(**stage_counts())
+            .order_by('segment')
+        )
+        segments[name] = [
+            {
+                'segment': row['segment'],
+                'sent': row['sent'],
+                'opened': row['opened'],
+                'clicked': row['clicked'],
+                'openRate': conversion(row['opened'], row['sent']),
+                'clickRate': conversion(row['clicked'], row['sent']),
+            }
+            for row in rows
+        ]
+
+    return {
+        'campaignId': int(campaign_id),
+        'stages': stages,
+        'timeToOpen': delay_distribution(engagements, 'open_time'),
+        'timeToClick': delay_distribution(engagements, 'click_time'),
+        'segments': segments,
+    }
+
+
+def get_campaign_funnel(org_id, campaign_id):
+    """
+    Cached funnel of a campaign; invalidated whenever one of its engagement rows changes.
+
+    Sends are recorded by the Celery worker, so the entry also expires to
+    bound how long a missed invalidation can leave the stages stale.
+    """
+    funnel = cache.get(campaign_funnel_key(campaign_id))
+    if funnel is None:
+        funnel = compute_campaign_funnel(org_id, campaign_id)
+        cache.set(campaign_funnel_key(campaign_id), funnel, timeout=FUNNEL_CACHE_TIMEOUT)
+    return funnel
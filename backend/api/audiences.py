@@ -0,0 +1,142 @@
+from functools import reduce
+
+import numpy as np
+from django.core.cache import cache
+
+from .bitmaps import AudienceBitmap
+from .models import AudienceSegment, CampaignDetails, CompanyUser, CompanyUserEngagement
+from .segments import SEGMENT_SIZE_TIMEOUT, segment_contacts
+from .versions import CONTACT_DATA, ENGAGEMENT_DATA, SEGMENT_DATA, get_data_version
+
+# Audience sources: "all", "segment:<id>", "opened:<campaign id>", "clicked:<campaign id>"
+AUDIENCE_SOURCES = ('all', 'segment', 'opened', 'clicked')
+AUDIENCE_KEYS = ('include', 'require', 'exclude')
+RECIPIENT_CHUNK_SIZE = 1000
+
+
+class AudienceError(ValueError):
+    """Raised for a malformed or unknown audience source"""
+
+
+# Data each kind of source is built from; its bitmap is rebuilt only when one of these changes
+SOURCE_SCOPES = {
+    'all': (CONTACT_DATA,),
+    'segment': (CONTACT_DATA, SEGMENT_DATA),
+    'opened': (ENGAGEMENT_DATA,),
+    'clicked': (ENGAGEMENT_DATA,),
+}
+
+
+def parse_source(source):
+    """(kind, argument) of an audience source, or raise AudienceError"""
+    if not isinstance(source, str):
+        raise AudienceError(f"Audience {source!r} must be a string.")
+    kind, _, argument = source.partition(':')
+    if kind == 'all' and not argument:
+        return kind, argument
+    if kind not in AUDIENCE_SOURCES or kind == 'all' or not argument.isdigit():
+        raise AudienceError(f"Unknown audience {source}.")
+    return kind, argument
+
+
+def audience_key(org_id, source):
+    """Cache key of a source's bitmap; moves on with every change to the data the source reads"""
+    kind, _ = parse_source(source)
+    versions = '_'.join(str(get_data_version(org_id, scope)) for scope in SOURCE_SCOPES[kind])
+    return f"audience_{org_id}_{source}_{versions}"
+
+
+def source_contact_ids(org_id, source):
+    """Queryset of the contact ids an audience source stands for"""
+    kind, argument = parse_source(source)
+    if kind == 'all':
+        return CompanyUser.objects.filter(org_id_id=org_id).values_list('id', flat=True)
+
+    if kind == 'segment':
+        segment = AudienceSegment.objects.filter(id=argument, org_id_id=org_id).first()
+        if segment is None:
+            raise AudienceError(f"Unknown audience {source}.")
+        return segment_contacts(org_id, segment.definition).values_list('id', flat=True)
+
+    event_field = 'open_time' if kind == 'opened' else 'click_time'
+    return (
+        CompanyUserEngagement.objects.filter(org_id_id=org_id, campaign_id_id=argument, **{f'{event_field}__isnull': False})
+        .values_list('user_id_id', flat=True)
+        .distinct()
+    )
+
+
+def get_audience_bitmap(org_id, source):
+    """Bitmap of an audience source, built with one id query and cached per data version"""
+    key = audience_key(org_id, source)
+    bitmap = cache.get(key)
+    if bitmap is None:
+        ids = np.fromiter(source_contact_ids(org_id, source).iterator(chunk_size=50000), dtype=np.int64)
+        bitmap = AudienceBitmap.from_ids(ids)
+        # Engagement recency rules of segments move with time, so bitmaps also expire
+        cache.set(key, bitmap, timeout=SEGMENT_SIZE_TIMEOUT)
+    return bitmap
+
+
+def resolve_audience(org_id, include=(), require=(), exclude=()):
+    """
+    Contacts in any `include` audience (default: all contacts), in every
+    `require` audience and in no `exclude` audience, as a bitmap.
+    """
+    bitmap = reduce(AudienceBitmap.__or__, (get_audience_bitmap(org_id, source) for source in include or ['all']))
+    for source in require:
+        bitmap = bitmap & get_audience_bitmap(org_id, source)
+    for source in exclude:
+        bitmap = bitmap - get_audience_bitmap(org_id, source)
+    return bitmap
+
+
+def validate_audience(definition):
+    """Checked copy of an include/require/exclude audience definition, or raise AudienceError"""
+    if not isinstance(definition, dict):
+        raise AudienceError("audience must be an object.")
+    unknown = set(definition) - set(AUDIENCE_KEYS)
+    if unknown:
+        raise AudienceError(f"Unknown audience keys: {', '.join(sorted(unknown))}.")
+    cleaned = {}
+    for key in AUDIENCE_KEYS:
+        sources = definition.get(key, [])
+        if not isinstance(sources, list):
+            raise AudienceError(f"{key} must be a list.")
+        for source in sources:
+            parse_source(source)
+        cleaned[key] = sources
+    return cleaned
+
+
+def audiences_using_source(org_id, source):
+    """Campaigns of an organization whose stored audience refers to `source`"""
+    campaigns = CampaignDetails.objects.filter(org_id_id=org_id, audience__isnull=False).only('campaign_id', 'audience')
+    return [
+        campaign for campaign in campaigns
+        if any(source in campaign.audience.get(key, []) for key in AUDIENCE_KEYS)
+    ]
+
+
+def contacts_by_ids(org_id, contact_ids, chunk_size=RECIPIENT_CHUNK_SIZE):
+    """Contacts of an organization with the given sorted ids, loaded one id chunk per query"""
+    for start in range(0, len(contact_ids), chunk_size):
+        chunk = contact_ids[start:start + chunk_size].tolist()
+        yield from CompanyUser.objects.filter(org_id_id=org_id, id__in=chunk).order_by('id')
+
+
+def campaign_audience(campaign):
+    """
+    Contacts a campaign is sent to.
+
+    A stored include/require/exclude audience is resolved through the cached
+    bitmaps and its contacts loaded by id in chunks; otherwise the campaign
+    targets its segment, or the whole organization.
+    """
+    org_id = campaign.org_id_id
+    if campaign.audience:
+        contact_ids = resolve_audience(org_id, **validate_audience(campaign.audience)).to_ids()
+        return list(contacts_by_ids(org_id, contact_ids))
+    if campaign.segment_id is None:
+        return CompanyUser.objects.filter(org_id_id=org_id)
+    return segment_contacts(org_id, campaign.segment.definition)
@@ -0,0 +1,75 @@
+import numpy as np
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import SendTimeArm
+
+HOURS = 24
+
+# Weight, in pseudo-sends, of the organization-wide open rate used as each
+# contact's prior; contacts with little history follow the org until their own
+# opens outweigh it.
+PRIOR_STRENGTH = 5.0
+
+
+def _increment_arm(org_id, user_id, hour, field):
+    """Atomically add one to an arm counter, creating the arm on first use"""
+    arms = SendTimeArm.objects.filter(org_id_id=org_id, user_id_id=user_id, hour=hour)
+    if arms.update(**{field: F(field) + 1}):
+        return
+    try:
+        with transaction.atomic():
+            SendTimeArm.objects.create(org_id_id=org_id, user_id_id=user_id, hour=hour, **{field: 1})
+    except IntegrityError:
+        # Another worker created the arm first
+        arms.update(**{field: F(field) + 1})
+
+
+def record_send(org_id, user_id, hour):
+    """Count a send in the contact's and the organization's arm for that hour"""
+    _increment_arm(org_id, user_id, hour, 'sends')
+    _increment_arm(org_id, None, hour, 'sends')
+
+
+def record_open(org_id, user_id, hour):
+    """Count an open of an email sent at the given hour as a success for that arm"""
+    _increment_arm(org_id, user_id, hour, 'opens')
+    _increment_arm(org_id, None, hour, 'opens')
+
+
+def load_posteriors(org_id, user_ids):
+    """
+    Beta posterior parameters of every hour slot for the given contacts.
+
+    Returns (alpha, beta) arrays of shape (len(user_ids), 24). Each contact's
+    prior is the organization-wide open rate of the slot, scaled to
+    PRIOR_STRENGTH pseudo-sends.
+    """
+    index = {user_id: row for row, user_id in enumerate(user_ids)}
+    sends = np.zeros((len(user_ids), HOURS))
+    opens = np.zeros((len(user_ids), HOURS))
+    org_sends = np.zeros(HOURS)
+    org_opens = np.zeros(HOURS)
+
+    arms = SendTimeArm.objects.filter(org_id_id=org_id).values_list('user_id_id', 'hour', 'sends', 'opens')
+    for user_id, hour, arm_sends, arm_opens in arms.iterator(chunk_size=10000):
+        if user_id is None:
+            org_sends[hour], org_opens[hour] = arm_sends, arm_opens
+        elif user_id in index:
+            sends[index[user_id], hour], opens[index[user_id], hour] = arm_sends, arm_opens
+
+    org_rate = (org_opens + 1) / (org_sends + 2)
+    opens = np.minimum(opens, sends)
+    alpha = 1 + opens + PRIOR_STRENGTH * org_rate
+    beta = 1 + (sends - opens) + PRIOR_STRENGTH * (1 - org_rate)
+    return alpha, beta
+
+
+def sample_send_hours(org_id, user_ids, rng=None):
+    """Thompson-sample one send hour per contact; returns {user_id: hour}"""
+    if not user_ids:
+        return {}
+    rng = rng or np.random.default_rng()
+    alpha, beta = load_posteriors(org_id, user_ids)
+    hours = rng.beta(alpha, beta).argmax(axis=1)
+    return dict(zip(user_ids, hours.tolist()))
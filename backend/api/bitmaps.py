@@ -0,0 +1,121 @@
+import numpy as np
+
+# Contact ids are split into a 16-bit high key selecting a container and a
+# 16-bit low value stored in it. Sparse containers are sorted uint16 arrays,
+# dense ones 8 KiB bitsets, switching at the size where a bitset is smaller.
+CONTAINER_BITS = 16
+CONTAINER_SIZE = 1 << CONTAINER_BITS
+ARRAY_LIMIT = 4096
+BITSET_WORDS = CONTAINER_SIZE // 64
+
+
+def _to_bitset(container):
+    if container.dtype == np.uint64:
+        return container
+    bits = np.zeros(CONTAINER_SIZE, dtype=bool)
+    bits[container] = True
+    return np.packbits(bits, bitorder='little').view(np.uint64)
+
+
+def _to_array(container):
+    if container.dtype == np.uint16:
+        return container
+    return np.flatnonzero(np.unpackbits(container.view(np.uint8), bitorder='little')).astype(np.uint16)
+
+
+def _cardinality(container):
+    if container.dtype == np.uint16:
+        return len(container)
+    return int(np.unpackbits(container.view(np.uint8)).sum())
+
+
+def _normalize(container):
+    """Store a container in its smaller form, or None when it is empty"""
+    cardinality = _cardinality(container)
+    if not cardinality:
+        return None
+    if cardinality <= ARRAY_LIMIT:
+        return _to_array(container)
+    return _to_bitset(container)
+
+
+def _combine(left, right, array_op, bitset_op):
+    if left.dtype == np.uint16 and right.dtype == np.uint16:
+        return _normalize(array_op(left, right))
+    return _normalize(bitset_op(_to_bitset(left), _to_bitset(right)))
+
+
+class AudienceBitmap:
+    """
+    Compressed set of contact ids (a roaring bitmap) supporting |, & and -.
+
+    Set operations run container by container with NumPy, so combining
+    audiences of millions of contacts touches a few hundred small arrays
+    instead of joining tables. Bitmaps pickle compactly for the cache.
+    """
+
+    def __init__(self, containers=None):
+        self.containers = containers or {}
+
+    @classmethod
+    def from_ids(cls, ids):
+        ids = np.unique(np.asarray(ids, dtype=np.int64))
+        if not len(ids):
+            return cls()
+        highs = ids >> CONTAINER_BITS
+        keys, starts = np.unique(highs, return_index=True)
+        containers = {}
+        for key, values in zip(keys.tolist(), np.split(ids, starts[1:])):
+            containers[key] = _normalize((values & (CONTAINER_SIZE - 1)).astype(np.uint16))
+        return cls(containers)
+
+    def __or__(self, other):
+        containers = dict(self.containers)
+        for key, container in other.containers.items():
+            if key in containers:
+                containers[key] = _combine(containers[key], container, np.union1d, np.bitwise_or)
+            else:
+                containers[key] = container
+        return AudienceBitmap(containers)
+
+    def __and__(self, other):
+        containers = {}
+        for key in self.containers.keys() & other.containers.keys():
+            container = _combine(self.containers[key], other.containers[key],
+                                 lambda a, b: np.intersect1d(a, b, assume_unique=True), np.bitwise_and)
+            if container is not None:
+                containers[key] = container
+        return AudienceBitmap(containers)
+
+    def __sub__(self, other):
+        containers = {}
+        for key, container in self.containers.items():
+            if key in other.containers:
+                container = _combine(container, other.containers[key],
+                                     lambda a, b: np.setdiff1d(a, b, assume_unique=True),
+                                     lambda a, b: a & ~b)
+            if container is not None:
+                containers[key] = container
+        return AudienceBitmap(containers)
+
+    def __len__(self):
+        return sum(_cardinality(container) for container in self.containers.values())
+
+    def __contains__(self, contact_id):
+        container = self.containers.get(contact_id >> CONTAINER_BITS)
+        if container is None:
+            return False
+        low = contact_id & (CONTAINER_SIZE - 1)
+        if container.dtype == np.uint16:
+            index = np.searchsorted(container, low)
+            return index < len(container) and container[index] == low
+        return bool(container[low // 64] >> np.uint64(low % 64) & np.uint64(1))
+
+    def to_ids(self):
+        """Sorted int64 array of the contact ids in the set"""
+        if not self.containers:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([
+            (np.int64(key) << CONTAINER_BITS) | _to_array(self.containers[key]).astype(np.int64)
+            for key in sorted(self.containers)
+        ])
@@ -0,0 +1,38 @@
+import csv
+import io
+
+from django.db import connection
+
+
+def supports_copy():
+    """Whether the default database can bulk load with COPY FROM STDIN"""
+    return connection.vendor == 'postgresql'
+
+
+def column_names(model, fields):
+    """Database column names of the given model fields"""
+    return [model._meta.get_field(field).column for field in fields]
+
+
+def copy_rows(table, columns, rows):
+    """
+    Stream rows into a PostgreSQL table with COPY FROM STDIN.
+
+    `rows` is an iterable of tuples in `columns` order; None is written as NULL.
+    Returns the number of rows sent.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    count = 0
+    for row in rows:
+        writer.writerow(['\\N' if value is None else value for value in row])
+        count += 1
+    buffer.seek(0)
+
+    sql = "COPY {} ({}) FROM STDIN WITH (FORMAT csv, NULL '\\N')".format(
+        connection.ops.quote_name(table),
+        ', '.join(connection.ops.quote_name(column) for column in columns),
+    )
+    with connection.cursor() as cursor:
+        cursor.copy_expert(sql, buffer)
+    return count
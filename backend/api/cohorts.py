@@ -0,0 +1,117 @@
+import logging
+
+import pandas as pd
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import ExtractHour
+
+from .models import CompanyUserEngagement, CohortSendTime
+
+logger = logging.getLogger(__name__)
+
+AGE_BAND_WIDTH = 10
+
+# Cohort keys from the most to the least specific; a cold-start contact gets the
+# hour of the first level that has click data for its attributes.
+COHORT_LEVELS = (
+    ('timezone', 'age_band', 'gender', 'location'),
+    ('timezone', 'age_band', 'gender'),
+    ('timezone',),
+    (),
+)
+COHORT_FIELDS = COHORT_LEVELS[0]
+BLANK_COHORT = {'timezone': '', 'age_band': None, 'gender': '', 'location': ''}
+
+
+def age_band(age):
+    """Lower bound of the age band a contact falls into"""
+    if age is None:
+        return None
+    return (int(age) // AGE_BAND_WIDTH) * AGE_BAND_WIDTH
+
+
+def cohort_cache_key(org_id):
+    return f"cohort_send_hours_{org_id}"
+
+
+def cohort_key(level, values):
+    """Build the lookup key for a cohort level; fields outside the level are blank"""
+    return tuple(values[field] if field in level else BLANK_COHORT[field] for field in COHORT_FIELDS)
+
+
+def compute_cohort_send_times(org_id):
+    """Recompute the best click hour of every cohort in an organization and store it"""
+    clicks = (
+        CompanyUserEngagement.objects
+        .filter(org_id_id=org_id, click_time__isnull=False)
+        .annotate(click_hour=ExtractHour('click_time'))
+        .values('user_id__timezone', 'user_id__age', 'user_id__gender', 'user_id__location', 'click_hour')
+        .annotate(clicks=Count('id'))
+    )
+    df = pd.DataFrame(list(clicks))
+
+    cohorts = []
+    if not df.empty:
+        df = df.rename(columns={
+            'user_id__timezone': 'timezone',
+            'user_id__gender': 'gender',
+            'user_id__location': 'location',
+        })
+        df['age_band'] = df['user_id__age'] // AGE_BAND_WIDTH * AGE_BAND_WIDTH
+        df['org'] = org_id  # constant grouping column for the org-wide level
+
+        for level in COHORT_LEVELS:
+            keys = list(level) or ['org']
+            hourly = df.groupby(keys + ['click_hour'], as_index=False)['clicks'].sum()
+            hourly['total'] = hourly.groupby(keys)['clicks'].transform('sum')
+            best = hourly.loc[hourly.groupby(keys)['clicks'].idxmax()]
+
+            for row in best.to_dict('records'):
+                values = {field: row[field] if field in level else BLANK_COHORT[field] for field in COHORT_FIELDS}
+                cohorts.append(CohortSendTime(
+                    org_id_id=org_id,
+                    timezone=values['timezone'],
+                    age_band=None if values['age_band'] is None else int(values['age_band']),
+                    gender=values['gender'],
+                    location=values['location'],
+                    send_hour=int(row['click_hour']),
+                    clicks=int(row['total']),
+                ))
+
+    with transaction.atomic():
+        CohortSendTime.objects.filter(org_id_id=org_id).delete()
+        CohortSendTime.objects.bulk_create(cohorts, batch_size=1000)
+
+    cache.delete(cohort_cache_key(org_id))
+    logger.info(f"Computed {len(cohorts)} cohort send times for organization {org_id}")
+    return len(cohorts)
+
+
+def load_cohort_send_hours(org_id):
+    """Return {cohort key: send hour} for an organization, cached between campaigns"""
+    cohort_hours = cache.get(cohort_cache_key(org_id))
+    if cohort_hours is None:
+        cohort_hours = {
+            (row['timezone'], row['age_band'], row['gender'], row['location']): row['send_hour']
+            for row in CohortSendTime.objects.filter(org_id_id=org_id).values(
+                'timezone', 'age_band', 'gender', 'location', 'send_hour'
+            )
+        }
+        cache.set(cohort_cache_key(org_id), cohort_hours, timeout=3600)
+    return cohort_hours
+
+
+def cohort_send_hour(cohort_hours, user):
+    """Look up a contact's cohort send hour, or None when no cohort has click data"""
+    values = {
+        'timezone': user.timezone,
+        'age_band': age_band(user.age),
+        'gender': user.gender,
+        'location': user.location,
+    }
+    for level in COHORT_LEVELS:
+        hour = cohort_hours.get(cohort_key(level, values))
+        if hour is not None:
+            return hour
+    return None
@@ -0,0 +1,65 @@
+from django.core.cache import cache
+
+from .analytics import AGGREGATE_CACHE_TIMEOUT, get_chart_data_rows
+from .models import CampaignDetails
+
+RECENT_CAMPAIGNS = 5
+TOP_CAMPAIGNS = 5
+TREND_WINDOW = 5
+
+
+def dashboard_summary_key(org_id):
+    return f"dashboard_summary_{org_id}"
+
+
+def average(rows, field):
+    return sum(row[field] for row in rows) / len(rows) if rows else None
+
+
+def build_dashboard_summary(org_id):
+    """
+    Assemble the landing dashboard document of an organization.
+
+    Built from the cached per-campaign chart rows plus one query for the most
+    recent campaigns, so a rebuild after a change stays cheap.
+    """
+    stats = get_chart_data_rows(org_id)
+    by_start = sorted(stats, key=lambda row: row['start_date'], reverse=True)
+
+    recent_campaigns = list(
+        CampaignDetails.objects.filter(org_id_id=org_id)
+        .order_by('-campaign_start_date')
+        .values('campaign_id', 'campaign_name', 'campaign_start_date', 'campaign_end_date')[:RECENT_CAMPAIGNS]
+    )
+
+    # Latest campaign against the average of the ones before it
+    trend = {}
+    if len(by_start) > 1:
+        latest, previous = by_start[0], by_start[1:1 + TREND_WINDOW]
+        trend = {
+            field: latest[field] - average(previous, field)
+            for field in ('openRate', 'clickRate', 'engagementDelay')
+        }
+
+    return {
+        'totals': {
+            'campaigns': CampaignDetails.objects.filter(org_id_id=org_id).count(),
+            'campaignsWithStats': len(stats),
+            'avgOpenRate': average(stats, 'openRate'),
+            'avgClickRate': average(stats, 'clickRate'),
+            'avgEngagementDelay': average(stats, 'engagementDelay'),
+        },
+        'recentCampaigns': recent_campaigns,
+        'topByOpenRate': sorted(stats, key=lambda row: row['openRate'], reverse=True)[:TOP_CAMPAIGNS],
+        'topByClickRate': sorted(stats, key=lambda row: row['clickRate'], reverse=True)[:TOP_CAMPAIGNS],
+        'trend': trend,
+    }
+
+
+def get_dashboard_snapshot(org_id):
+    """Dashboard document of an organization, rebuilt only after its campaigns or stats change"""
+    summary = cache.get(dashboard_summary_key(org_id))
+    if summary is None:
+        summary = build_dashboard_summary(org_id)
+        cache.set(dashboard_summary_key(org_id), summary, timeout=AGGREGATE_CACHE_TIMEOUT)
+    return summary
@@ -0,0 +1,98 @@
+import logging
+
+from django.core.cache import cache
+from django.db import connection, models, transaction
+
+from .analytics import campaign_funnel_key, chart_data_key, optimal_start_time_key
+from .dashboard import dashboard_summary_key
+from .models import CampaignDetails, CompanyUser, CompanyUserEngagement
+from .sketches import remove_engagement_delays
+from .versions import CAMPAIGN_DATA, CONTACT_DATA, ENGAGEMENT_DATA, bump_data_version
+
+logger = logging.getLogger(__name__)
+
+DELETE_CHUNK_SIZE = 1000
+# Deletions of more contacts than this run in the background
+INLINE_DELETE_LIMIT = 1000
+
+
+def _delete_where_in(table, column, ids):
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {connection.ops.quote_name(table)} WHERE {connection.ops.quote_name(column)} IN ({placeholders})",
+            ids,
+        )
+        return cursor.rowcount
+
+
+def delete_contact_rows(contact_ids):
+    """
+    Delete contacts and every row cascading from them, without loading those rows.
+
+    Tables referencing company_users with ON DELETE CASCADE semantics are
+    cleared with one DELETE ... WHERE fk IN (...) each. A related model with
+    dependents of its own falls back to the ORM so its cascade still runs.
+    SET_NULL references are cleared with an UPDATE, and a PROTECT or RESTRICT
+    reference to any of the contacts aborts the deletion. The deleted clicks
+    are taken out of the engagement delay sketches, which no signal updates.
+    Returns the number of contacts deleted.
+    """
+    with transaction.atomic():
+        clicks = CompanyUserEngagement.objects.filter(user_id__in=contact_ids, click_time__isnull=False)
+        remove_engagement_delays(clicks.values_list('campaign_id', 'engagement_delay'))
+        for relation in CompanyUser._meta.related_objects:
+            related = relation.related_model
+            rows = related.objects.filter(**{f'{relation.field.name}__in': contact_ids})
+            if relation.on_delete in (models.PROTECT, models.RESTRICT):
+                if rows.exists():
+                    error = models.ProtectedError if relation.on_delete is models.PROTECT else models.RestrictedError
+                    raise error(f"Contacts are still referenced by {related.__name__}.", set(rows))
+            elif relation.on_delete is models.SET_NULL:
+                rows.update(**{relation.field.name: None})
+            elif relation.on_delete is models.DO_NOTHING:
+                continue
+            elif relation.on_delete is not models.CASCADE:
+                raise ValueError(f"Unsupported on_delete for {related.__name__}.{relation.field.name}")
+            elif related._meta.related_objects:
+                rows.delete()
+            else:
+                _delete_where_in(related._meta.db_table, relation.field.column, contact_ids)
+        return _delete_where_in(CompanyUser._meta.db_table, CompanyUser._meta.pk.column, contact_ids)
+
+
+def invalidate_after_deletion(org_id):
+    """Drop the aggregates, dashboards and sketch versions that the raw deletes bypassed the signals for"""
+    campaign_ids = CampaignDetails.objects.filter(org_id_id=org_id).values_list('campaign_id', flat=True)
+    cache.delete_many(
+        [optimal_start_time_key(org_id), chart_data_key(org_id), dashboard_summary_key(org_id)]
+        + [campaign_funnel_key(campaign_id) for campaign_id in campaign_ids]
+    )
+    bump_data_version(org_id, CAMPAIGN_DATA)
+    bump_data_version(org_id, CONTACT_DATA)
+    bump_data_version(org_id, ENGAGEMENT_DATA)
+
+
+def delete_contacts(org_id, contact_ids=None, chunk_size=DELETE_CHUNK_SIZE):
+    """
+    Delete an organization's contacts (the given ones, or all) in chunks.
+
+    Each chunk is its own transaction, so a large deletion never holds long
+    locks and a restarted run simply continues with whatever is left.
+    Returns the number of contacts deleted.
+    """
+    contacts = CompanyUser.objects.filter(org_id_id=org_id).order_by('id')
+    deleted = 0
+    if contact_ids is None:
+        while chunk := list(contacts.values_list('id', flat=True)[:chunk_size]):
+            deleted += delete_contact_rows(chunk)
+    else:
+        # Only ids that belong to the organization are deleted
+        for start in range(0, len(contact_ids), chunk_size):
+            chunk = list(contacts.filter(id__in=contact_ids[start:start + chunk_size]).values_list('id', flat=True))
+            if chunk:
+                deleted += delete_contact_rows(chunk)
+
+    invalidate_after_deletion(org_id)
+    logger.info(f"Deleted {deleted} contacts of organization {org_id}")
+    return deleted
@@ -0,0 +1,77 @@
+import csv
+import json
+
+from .models import CompanyUserEngagement
+
+EXPORT_CHUNK_SIZE = 5000
+
+# (output column, queryset field) of an exported engagement row
+ENGAGEMENT_COLUMNS = [
+    ('id', 'id'),
+    ('user_id', 'user_id_id'),
+    ('campaign_id', 'campaign_id_id'),
+    ('org_id', 'org_id_id'),
+    ('send_time', 'send_time'),
+    ('open_time', 'open_time'),
+    ('click_time', 'click_time'),
+    ('engagement_delay', 'engagement_delay'),
+]
+
+
+def engagement_rows(org_id, campaign_id=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Stream engagement rows of an organization (or one of its campaigns) as tuples.
+
+    `iterator()` reads through a server-side cursor on PostgreSQL, so only one
+    chunk of rows is held in memory at a time.
+    """
+    engagements = CompanyUserEngagement.objects.filter(org_id_id=org_id)
+    if campaign_id is not None:
+        engagements = engagements.filter(campaign_id_id=campaign_id)
+    fields = [field for _, field in ENGAGEMENT_COLUMNS]
+    return engagements.order_by('id').values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def _serialize(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def ndjson_lines(rows, batch_size=EXPORT_CHUNK_SIZE):
+    """Render rows as newline-delimited JSON, yielding one string per batch of rows"""
+    columns = [column for column, _ in ENGAGEMENT_COLUMNS]
+    batch = []
+    for row in rows:
+        batch.append(json.dumps(dict(zip(columns, map(_serialize, row)))) + '\n')
+        if len(batch) >= batch_size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to the csv writer's caller"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows, batch_size=EXPORT_CHUNK_SIZE):
+    """Render rows as CSV with a header line, yielding one string per batch of rows"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow([column for column, _ in ENGAGEMENT_COLUMNS])
+    batch = []
+    for row in rows:
+        batch.append(writer.writerow(['' if value is None else _serialize(value) for value in row]))
+        if len(batch) >= batch_size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+# format name -> (renderer, content type, file extension)
+EXPORT_FORMATS = {
+    'ndjson': (ndjson_lines, 'application/x-ndjson', 'ndjson'),
+    'csv': (csv_lines, 'text/csv', 'csv'),
+}
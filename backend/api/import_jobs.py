@@ -0,0 +1,131 @@
+import csv
+import logging
+import os
+import uuid
+from itertools import islice
+
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.db import transaction
+from django.utils.timezone import now
+
+from .importers import ContactImporter, IMPORT_CHUNK_SIZE, MAX_REPORTED_ERRORS, chunked, is_gzipped, open_csv_text
+from .models import ContactImportJob
+
+logger = logging.getLogger(__name__)
+
+
+def store_upload(org_id, upload):
+    """
+    Keep an uploaded CSV (plain or gzip) under CONTACT_IMPORT_DIR and create its pending job.
+
+    An upload Django already spooled to a temporary file is moved into place
+    rather than copied; a small in-memory one is written out chunk by chunk.
+    """
+    os.makedirs(settings.CONTACT_IMPORT_DIR, exist_ok=True)
+    suffix = '.csv.gz' if is_gzipped(upload.file) else '.csv'
+    path = os.path.join(settings.CONTACT_IMPORT_DIR, f"{org_id}-{uuid.uuid4().hex}{suffix}")
+    if hasattr(upload, 'temporary_file_path'):
+        file_move_safe(upload.temporary_file_path(), path)
+    else:
+        with open(path, 'wb') as destination:
+            for chunk in upload.chunks():
+                destination.write(chunk)
+    return ContactImportJob.objects.create(
+        org_id_id=org_id,
+        file_name=upload.name,
+        file_path=path,
+        file_size=upload.size,
+    )
+
+
+def resume_importer(job, chunk_size=IMPORT_CHUNK_SIZE):
+    """Importer carrying the counters a job already committed"""
+    importer = ContactImporter(job.org_id_id, chunk_size)
+    importer.processed = job.rows_processed
+    importer.created = job.rows_created
+    importer.duplicates = job.duplicates
+    importer.rejected = job.rejected
+    importer.errors = list(job.errors)
+    return importer
+
+
+def save_progress(job, importer):
+    job.rows_processed = importer.processed
+    job.rows_created = importer.created
+    job.duplicates = importer.duplicates
+    job.rejected = importer.rejected
+    job.errors = importer.errors[:MAX_REPORTED_ERRORS]
+    job.save(update_fields=['rows_processed', 'rows_created', 'duplicates', 'rejected', 'errors', 'updated_at'])
+
+
+def run_import_job(job_id, chunk_size=IMPORT_CHUNK_SIZE, final=True):
+    """
+    Import a stored CSV, committing each chunk together with the job's counters.
+
+    A job that was interrupted (worker crash, redelivered task) skips the rows
+    it already committed and continues from the next chunk; contacts of a
+    partially written chunk are rolled back with it, so nothing is imported twice.
+    An error marks the job failed, or retrying when this is not its `final` attempt.
+    """
+    job = ContactImportJob.objects.get(id=job_id)
+    if job.status == ContactImportJob.COMPLETED:
+        return job
+
+    job.status = ContactImportJob.RUNNING
+    job.started_at = job.started_at or now()
+    job.save(update_fields=['status', 'started_at', 'updated_at'])
+
+    importer = resume_importer(job, chunk_size)
+    try:
+        with open(job.file_path, 'rb') as binary, open_csv_text(binary) as file:
+            rows = islice(csv.DictReader(file), job.rows_processed, None)
+            line = job.rows_processed + 2
+            for chunk in chunked(rows, importer.chunk_size):
+                with transaction.atomic():
+                    importer.import_chunk(chunk, line)
+                    save_progress(job, importer)
+                line += len(chunk)
+    except Exception as e:
+        job.status = ContactImportJob.FAILED if final else ContactImportJob.RETRYING
+        job.error = str(e)
+        job.finished_at = now()
+        job.save(update_fields=['status', 'error', 'finished_at', 'updated_at'])
+        logger.error(f"Contact import job {job.id} failed after {job.rows_processed} rows: {e}")
+        raise
+
+    job.status = ContactImportJob.COMPLETED
+    job.error = ''
+    job.finished_at = now()
+    job.save(update_fields=['status', 'error', 'finished_at', 'updated_at'])
+    os.remove(job.file_path)
+    logger.info(f"Contact import job {job.id} completed: {importer.summary()}")
+    return job
+
+
+def discard_upload(job_id):
+    """Remove the stored file of a job that failed for good; its status and counters are kept"""
+    job = ContactImportJob.objects.get(id=job_id)
+    if job.file_path and os.path.exists(job.file_path):
+        os.remove(job.file_path)
+        logger.info(f"Discarded upload of failed contact import job {job.id}")
+
+
+def job_status(job):
+    """Progress document of an import job, including its row rate"""
+    elapsed = ((job.finished_at or now()) - job.started_at).total_seconds() if job.started_at else 0
+    return {
+        'id': job.id,
+        'file_name': job.file_name,
+        'status': job.status,
+        'processed': job.rows_processed,
+        'created': job.rows_created,
+        'duplicates': job.duplicates,
+        'rejected': job.rejected,
+        'errors': job.errors,
+        'error': job.error,
+        'rows_per_second': job.rows_processed / elapsed if elapsed else None,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    }
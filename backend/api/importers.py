@@ -0,0 +1,281 @@
+import gzip
+from io import TextIOWrapper
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import connection, transaction
+from django.utils.timezone import now
+
+from .bulk import column_names, copy_rows, supports_copy
+from .models import CompanyUser
+from .versions import CONTACT_DATA, bump_data_version
+
+IMPORT_CHUNK_SIZE = 5000
+# Cap on the created contacts echoed back in a response and on reported row errors
+MAX_RETURNED_USERS = 1000
+MAX_REPORTED_ERRORS = 100
+
+REQUIRED_COLUMNS = ['email', 'age', 'gender', 'location', 'timezone']
+OPTIONAL_COLUMNS = ['first_name', 'last_name']
+MAX_LENGTHS = {
+    column: CompanyUser._meta.get_field(column).max_length
+    for column in REQUIRED_COLUMNS + OPTIONAL_COLUMNS
+    if CompanyUser._meta.get_field(column).max_length
+}
+COPY_FIELDS = ['org_id', 'date_joined'] + REQUIRED_COLUMNS + OPTIONAL_COLUMNS
+CONTACT_RESPONSE_FIELDS = ['id', 'first_name', 'last_name', 'email', 'age', 'gender', 'location', 'timezone', 'date_joined', 'org_id_id']
+
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def is_gzipped(binary):
+    """Whether a seekable binary file starts with the gzip magic number"""
+    position = binary.tell()
+    magic = binary.read(len(GZIP_MAGIC))
+    binary.seek(position)
+    return magic == GZIP_MAGIC
+
+
+def open_csv_text(binary):
+    """
+    Text stream over a binary CSV file, decompressing gzip transparently.
+
+    Both the decompression and the decoding are incremental, so reading rows
+    only ever holds one buffer of the file in memory.
+    """
+    if is_gzipped(binary):
+        binary = gzip.GzipFile(fileobj=binary)
+    return TextIOWrapper(binary, encoding='utf-8', newline='')
+
+
+def chunked(rows, size):
+    """Split an iterable of rows into lists of at most `size` rows"""
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def validate_contact_row(row):
+    """Cleaned CompanyUser field values of a CSV row, or raise ValidationError"""
+    values = {column: (row.get(column) or '').strip() for column in REQUIRED_COLUMNS + OPTIONAL_COLUMNS}
+    missing = [column for column in REQUIRED_COLUMNS if not values[column]]
+    if missing:
+        raise ValidationError(f"Missing {', '.join(missing)}")
+
+    validate_email(values['email'])
+    try:
+        values['age'] = int(values['age'])
+    except ValueError:
+        raise ValidationError("age must be an integer")
+    if not 0 < values['age'] < 150:
+        raise ValidationError("age out of range")
+
+    for column, max_length in MAX_LENGTHS.items():
+        if len(values[column]) > max_length:
+            raise ValidationError(f"{column} is longer than {max_length} characters")
+    return values
+
+
+class ContactImporter:
+    """
+    Import contacts into an organization one chunk of CSV rows at a time.
+
+    Each chunk is validated in memory, deduplicated within itself and against
+    the database (which holds the earlier chunks) with a single `email IN (...)`
+    query, and inserted with one bulk INSERT. On PostgreSQL the chunk is
+    instead streamed into a temporary staging table with COPY and merged with
+    INSERT ... ON CONFLICT DO NOTHING. Counters and a capped list of row
+    errors and created contacts are kept for the import summary.
+    """
+
+    def __init__(self, org_id, chunk_size=IMPORT_CHUNK_SIZE, use_copy=None):
+        self.org_id = org_id
+        self.chunk_size = chunk_size
+        self.use_copy = supports_copy() if use_copy is None else use_copy
+        self.processed = 0
+        self.created = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.errors = []
+        self.users = []
+
+    def reject(self, line, error):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': error})
+
+    def validate_chunk(self, rows, first_line):
+        """
+        Valid contacts of a chunk as {email: field values}, first occurrence winning.
+
+        Repeats of an email from an earlier chunk are left to the database
+        lookup in import_chunk, so memory stays bounded by the chunk size.
+        """
+        contacts = {}
+        for line, row in enumerate(rows, start=first_line):
+            try:
+                values = validate_contact_row(row)
+            except ValidationError as e:
+                self.reject(line, ' '.join(e.messages))
+                continue
+            if values['email'] in contacts:
+                self.duplicates += 1
+                continue
+            contacts[values['email']] = values
+        return contacts
+
+    def insert_contacts(self, contacts):
+        """Insert new contacts; returns the number of rows written"""
+        if self.use_copy:
+            return self.copy_contacts(contacts)
+        # Emails inserted concurrently are skipped by the conflict clause, so count what was written
+        existing = CompanyUser.objects.filter(email__in=list(contacts))
+        before = existing.count()
+        CompanyUser.objects.bulk_create(
+            [CompanyUser(org_id_id=self.org_id, **values) for values in contacts.values()],
+            batch_size=self.chunk_size,
+            ignore_conflicts=True,
+        )
+        return existing.count() - before
+
+    def copy_contacts(self, contacts):
+        """COPY contacts into a staging table and merge the new ones into company_users"""
+        table = connection.ops.quote_name(CompanyUser._meta.db_table)
+        staging = connection.ops.quote_name(f"{CompanyUser._meta.db_table}_staging")
+        columns = column_names(CompanyUser, COPY_FIELDS)
+        column_list = ', '.join(connection.ops.quote_name(column) for column in columns)
+        joined = now()
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE IF NOT EXISTS {staging} ON COMMIT DROP AS "
+                f"SELECT {column_list} FROM {table} WITH NO DATA"
+            )
+            # The staging table outlives this chunk when an outer transaction is open
+            cursor.execute(f"TRUNCATE {staging}")
+            copy_rows(
+                f"{CompanyUser._meta.db_table}_staging",
+                columns,
+                ([self.org_id, joined] + [values[column] for column in COPY_FIELDS[2:]] for values in contacts.values()),
+            )
+            cursor.execute(
+                f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {staging} "
+                f"ON CONFLICT ({connection.ops.quote_name('email')}) DO NOTHING"
+            )
+            return cursor.rowcount
+
+    def import_chunk(self, rows, first_line):
+        """Validate, deduplicate and insert one chunk of CSV rows"""
+        self.processed += len(rows)
+        contacts = self.validate_chunk(rows, first_line)
+        if contacts:
+            existing = CompanyUser.objects.filter(email__in=list(contacts)).values_list('email', flat=True)
+            for email in existing:
+                del contacts[email]
+                self.duplicates += 1
+        if not contacts:
+            return
+
+        self.created += self.insert_contacts(contacts)
+        bump_data_version(self.org_id, CONTACT_DATA)
+        if len(self.users) < MAX_RETURNED_USERS:
+            emails = list(contacts)[:MAX_RETURNED_USERS - len(self.users)]
+            self.users.extend(
+                CompanyUser.objects.filter(org_id_id=self.org_id, email__in=emails).values(*CONTACT_RESPONSE_FIELDS)
+            )
+
+    def run(self, rows, first_line=2):
+        """Import an iterable of CSV dict rows; line numbers start after the header"""
+        for chunk in chunked(rows, self.chunk_size):
+            self.import_chunk(chunk, first_line)
+            first_line += len(chunk)
+        return self
+
+    def summary(self):
+        return {
+            'processed': self.processed,
+            'created': self.created,
+            'duplicates': self.duplicates,
+            'rejected': self.rejected,
+            'errors': self.errors,
+        }
+
+
+MAX_UPSERT_CONTACTS = 5000
+# Always replaced on update; optional columns only when the item gives a value
+UPSERT_FIELDS = REQUIRED_COLUMNS[1:]
+
+
+class ContactConflictError(Exception):
+    """Raised when another organization claimed an upserted email mid-request"""
+
+
+def upsert_result(index, email, status, **extra):
+    return {'index': index, 'email': email, 'status': status, **extra}
+
+
+def upsert_contacts(org_id, items):
+    """
+    Create or update an organization's contacts keyed by email.
+
+    Items are validated like CSV rows. A single `email IN (...)` query
+    classifies the valid ones as new, owned by the organization, or owned by
+    another organization (rejected). The accepted contacts are then written
+    with one INSERT ... ON CONFLICT (email) DO UPDATE per batch, replacing
+    the required fields and whichever optional fields the item gives; an
+    omitted or blank name keeps the stored one. Returns a result per item in
+    request order.
+    """
+    results = [None] * len(items)
+    contacts = {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[index] = upsert_result(index, None, 'error', error="Contact must be an object")
+            continue
+        email = str(item.get('email') or '').strip()
+        try:
+            values = validate_contact_row({key: '' if value is None else str(value) for key, value in item.items()})
+        except ValidationError as e:
+            results[index] = upsert_result(index, email, 'error', error=' '.join(e.messages))
+            continue
+        if values['email'] in contacts:
+            results[index] = upsert_result(index, email, 'error', error="Duplicate email in request")
+            continue
+        contacts[values['email']] = (index, values)
+
+    with transaction.atomic():
+        owners = dict(CompanyUser.objects.select_for_update().filter(email__in=list(contacts)).values_list('email', 'org_id_id'))
+        for email, owner in owners.items():
+            if owner != org_id:
+                index, _ = contacts.pop(email)
+                results[index] = upsert_result(index, email, 'error', error="Email belongs to another organization")
+
+        if contacts:
+            # One statement per combination of given optional columns, so only those are overwritten
+            groups = {}
+            for _, values in contacts.values():
+                given = tuple(column for column in OPTIONAL_COLUMNS if values[column])
+                groups.setdefault(given, []).append(CompanyUser(org_id_id=org_id, **values))
+            for given, group in groups.items():
+                CompanyUser.objects.bulk_create(
+                    group,
+                    batch_size=IMPORT_CHUNK_SIZE,
+                    update_conflicts=True,
+                    unique_fields=['email'],
+                    update_fields=UPSERT_FIELDS + list(given),
+                )
+            # Rows another organization inserted since the lookup were just overwritten; undo them all
+            written = CompanyUser.objects.filter(email__in=list(contacts)).values_list('email', 'id', 'org_id_id')
+            ids = {}
+            for email, contact_id, owner in written:
+                if owner != org_id:
+                    raise ContactConflictError(email)
+                ids[email] = contact_id
+            bump_data_version(org_id, CONTACT_DATA)
+
+    for email, (index, _) in contacts.items():
+        status = 'updated' if email in owners else 'created'
+        results[index] = upsert_result(index, email, status, id=ids[email])
+    return results
@@ -0,0 +1,95 @@
+import resource
+import time
+import tracemalloc
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import now
+from rest_framework.test import APIRequestFactory
+
+from api.models import Organization, CompanyUser, CompanyUserEngagement, CampaignDetails
+from api.analytics import compute_optimal_start_time
+from api.bandit import sample_send_hours
+from api.cohorts import compute_cohort_send_times, load_cohort_send_hours, cohort_send_hour
+from api.scheduling import local_send_times, to_utc_datetimes, wall_clock
+from api.views import send_time_optim
+
+
+class Command(BaseCommand):
+    help = "Time send-time optimization training, batch inference and scheduling for an organization"
+
+    def add_arguments(self, parser):
+        parser.add_argument('org_id', type=int, help="Organization to benchmark (see generate_synthetic_engagement)")
+        parser.add_argument('--campaign', type=int, help="Campaign to time dispatch for (default: the latest one)")
+
+    def measure(self, name, rows, func):
+        """
+        Run one stage, recording wall time, throughput and peak traced memory.
+
+        The stage is timed untraced, as tracemalloc slows allocation-heavy code
+        down several times, then run a second time under tracemalloc for its peak.
+        """
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.stdout.write(
+            f"{name:<28}{rows:>12,}{elapsed:>10.3f}{rows / elapsed if elapsed else 0:>14,.0f}{peak / 2 ** 20:>12.1f}"
+        )
+        return result
+
+    def dispatch(self, org_id, campaign_id):
+        """Run the send_time_optim view for a campaign with email scheduling stubbed out"""
+        previous = cache.get_many(['org_id', 'campaign_id'])
+        cache.set_many({'org_id': org_id, 'campaign_id': campaign_id})
+        try:
+            with patch('api.views.send_scheduled_email.apply_async'):
+                response = send_time_optim(APIRequestFactory().get('/api/sto/'))
+        finally:
+            cache.delete_many(['org_id', 'campaign_id'])
+            cache.set_many(previous)
+        if response.status_code != 200:
+            raise CommandError(f"Dispatch failed: {response.data}")
+        return response
+
+    def handle(self, *args, **options):
+        org_id = options['org_id']
+        if not Organization.objects.filter(org_id_id=org_id).exists():
+            raise CommandError(f"Organization {org_id} not found")
+
+        engagements = CompanyUserEngagement.objects.filter(org_id_id=org_id).count()
+        contacts = list(CompanyUser.objects.filter(org_id_id=org_id).only('id', 'age', 'gender', 'location', 'timezone'))
+        contact_ids = [contact.id for contact in contacts]
+
+        self.stdout.write(f"Organization {org_id}: {len(contacts):,} contacts, {engagements:,} engagements\n")
+        self.stdout.write(f"{'stage':<28}{'rows':>12}{'seconds':>10}{'rows/s':>14}{'peak MiB':>12}")
+
+        self.measure("train: cohort send times", engagements, lambda: compute_cohort_send_times(org_id))
+        self.measure("train: optimal start time", engagements, lambda: compute_optimal_start_time(org_id))
+
+        cohort_hours = load_cohort_send_hours(org_id)
+        self.measure("infer: cohort lookup", len(contacts),
+                     lambda: [cohort_send_hour(cohort_hours, contact) for contact in contacts])
+        self.measure("infer: bandit sampling", len(contacts), lambda: sample_send_hours(org_id, contact_ids))
+
+        timezones = [contact.timezone for contact in contacts]
+        self.measure("schedule: local send times", len(contacts),
+                     lambda: to_utc_datetimes(local_send_times(timezones, wall_clock(now()).replace(hour=9, minute=0))))
+
+        campaigns = CampaignDetails.objects.filter(org_id_id=org_id)
+        if options['campaign']:
+            campaigns = campaigns.filter(campaign_id=options['campaign'])
+        campaign = campaigns.order_by('-campaign_id').first()
+        if campaign is None:
+            self.stdout.write("dispatch: skipped, no campaign")
+        else:
+            self.measure("dispatch: send_time_optim", len(contacts), lambda: self.dispatch(org_id, campaign.campaign_id))
+
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        self.stdout.write(f"\nPeak process RSS: {peak_rss:,.1f} MiB")
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.exports import EXPORT_FORMATS, engagement_rows
+
+
+class Command(BaseCommand):
+    help = "Stream the engagement rows of an organization or campaign to a file or stdout as NDJSON or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument('org_id', type=int)
+        parser.add_argument('--campaign', type=int, default=None, help="Only export this campaign")
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='ndjson')
+        parser.add_argument('--output', default='-', help="Output file (default: stdout)")
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Rows fetched per database round trip")
+
+    def handle(self, *args, **options):
+        render_lines = EXPORT_FORMATS[options['format']][0]
+        rows = engagement_rows(options['org_id'], options['campaign'], chunk_size=options['chunk_size'])
+
+        if options['output'] == '-':
+            for lines in render_lines(rows, batch_size=options['chunk_size']):
+                self.stdout.write(lines, ending='')
+            return
+
+        try:
+            with open(options['output'], 'w', newline='') as output:
+                for lines in render_lines(rows, batch_size=options['chunk_size']):
+                    output.write(lines)
+        except OSError as e:
+            raise CommandError(f"Could not write {options['output']}: {e}")
+        self.stderr.write(self.style.SUCCESS(f"Exported engagements to {options['output']}"))
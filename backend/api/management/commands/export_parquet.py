@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.snapshots import ROW_GROUP_SIZE, SNAPSHOT_TABLES, snapshot_table
+
+
+class Command(BaseCommand):
+    help = "Write Parquet snapshots of contacts, campaigns and engagements partitioned by organization and month"
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir', help="Directory the <table>/org_id=<id>/month=<YYYY-MM>/ files are written to")
+        parser.add_argument('--table', action='append', dest='tables', choices=list(SNAPSHOT_TABLES),
+                            help="Only export this table (repeatable)")
+        parser.add_argument('--org', type=int, action='append', dest='org_ids',
+                            help="Only export this organization (repeatable)")
+        parser.add_argument('--row-group-size', type=int, default=ROW_GROUP_SIZE)
+        parser.add_argument('--compression', default='zstd', choices=['zstd', 'snappy', 'gzip', 'none'])
+
+    def handle(self, *args, **options):
+        for table in options['tables'] or SNAPSHOT_TABLES:
+            started = time.perf_counter()
+            partitions, rows = snapshot_table(
+                table,
+                options['output_dir'],
+                org_ids=options['org_ids'],
+                row_group_size=options['row_group_size'],
+                compression=options['compression'],
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"{table}: {rows} rows in {partitions} partitions ({time.perf_counter() - started:.1f}s)"
+            ))
@@ -0,0 +1,38 @@
+import time
+from datetime import timedelta
+from uuid import uuid4
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from api.synthetic import create_organization, generate_contacts, generate_campaigns, generate_engagements
+
+
+class Command(BaseCommand):
+    help = "Generate synthetic organizations, contacts and engagement histories for STO benchmarks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orgs', type=int, default=1, help="Number of organizations to create")
+        parser.add_argument('--contacts', type=int, default=10000, help="Contacts per organization")
+        parser.add_argument('--campaigns', type=int, default=30, help="Daily campaigns per organization")
+        parser.add_argument('--engagements', type=int, default=100000, help="Engagement rows per organization")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='synthetic', help="Name prefix of the generated organizations")
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        first_campaign = (now() - timedelta(days=options['campaigns'])).replace(hour=0, minute=0, second=0, microsecond=0)
+
+        for index in range(options['orgs']):
+            started = time.perf_counter()
+            org = create_organization(f"{options['prefix']}{index}-{uuid4().hex[:8]}")
+            preferred_hours = generate_contacts(org, options['contacts'], rng)
+            campaigns = generate_campaigns(org, options['campaigns'], first_campaign)
+            written = generate_engagements(org, preferred_hours, campaigns, options['engagements'], rng)
+            elapsed = time.perf_counter() - started
+
+            self.stdout.write(self.style.SUCCESS(
+                f"Organization {org.org_id_id}: {len(preferred_hours)} contacts, {len(campaigns)} campaigns, "
+                f"{written} engagements in {elapsed:.1f}s ({written / elapsed:,.0f} rows/s)"
+            ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from api.models import CampaignDetails
+from api.sketches import rebuild_delay_sketch
+
+
+class Command(BaseCommand):
+    help = "Recount the engagement-delay sketches of every campaign (or one organization's) from stored clicks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--org', type=int, action='append', dest='org_ids',
+                            help="Only rebuild this organization's campaigns (repeatable)")
+
+    def handle(self, *args, **options):
+        campaigns = CampaignDetails.objects.order_by('campaign_id')
+        if options['org_ids']:
+            campaigns = campaigns.filter(org_id_id__in=options['org_ids'])
+
+        rebuilt = 0
+        for org_id, campaign_id in campaigns.values_list('org_id_id', 'campaign_id'):
+            clicks = rebuild_delay_sketch(org_id, campaign_id)
+            self.stdout.write(f"Campaign {campaign_id}: {clicks} clicks")
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} campaign sketches"))
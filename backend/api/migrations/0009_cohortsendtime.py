@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_companyuserengagement_click_time'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CohortSendTime',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timezone', models.CharField(blank=True, max_length=30)),
+                ('age_band', models.IntegerField(blank=True, null=True)),
+                ('gender', models.CharField(blank=True, max_length=1)),
+                ('location', models.CharField(blank=True, max_length=30)),
+                ('send_hour', models.IntegerField()),
+                ('clicks', models.IntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('org_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cohort_send_times', to='api.organization', to_field='org_id')),
+            ],
+            options={
+                'db_table': 'cohort_send_times',
+            },
+        ),
+    ]
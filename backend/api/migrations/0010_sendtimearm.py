@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_cohortsendtime'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SendTimeArm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.IntegerField()),
+                ('sends', models.IntegerField(default=0)),
+                ('opens', models.IntegerField(default=0)),
+                ('org_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='send_time_arms', to='api.organization', to_field='org_id')),
+                ('user_id', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='send_time_arms', to='api.companyuser')),
+            ],
+            options={
+                'db_table': 'send_time_arms',
+                'constraints': [models.UniqueConstraint(fields=('user_id', 'hour'), name='unique_user_send_time_arm'), models.UniqueConstraint(condition=models.Q(('user_id__isnull', True)), fields=('org_id', 'hour'), name='unique_org_send_time_arm')],
+            },
+        ),
+    ]
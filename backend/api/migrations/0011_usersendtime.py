@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_sendtimearm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSendTime',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour_counts', models.JSONField(default=list)),
+                ('send_hour', models.IntegerField()),
+                ('clicks', models.IntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('org_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_send_times', to='api.organization', to_field='org_id')),
+                ('user_id', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='send_time', to='api.companyuser')),
+            ],
+            options={
+                'db_table': 'user_send_times',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_usersendtime'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usersendtime',
+            name='watermark',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
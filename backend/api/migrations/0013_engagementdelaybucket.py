@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_usersendtime_watermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EngagementDelayBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.IntegerField()),
+                ('count', models.BigIntegerField(default=0)),
+                ('campaign_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='delay_buckets', to='api.campaigndetails')),
+                ('org_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='delay_buckets', to='api.organization', to_field='org_id')),
+            ],
+            options={
+                'db_table': 'engagement_delay_buckets',
+                'constraints': [models.UniqueConstraint(fields=('campaign_id', 'bucket'), name='unique_campaign_delay_bucket')],
+            },
+        ),
+    ]
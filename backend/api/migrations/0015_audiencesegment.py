@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_contactimportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AudienceSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('definition', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'audience_segments',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='companyuser',
+            index=models.Index(fields=['org_id', 'age'], name='company_user_org_age_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='companyuser',
+            index=models.Index(fields=['org_id', 'gender'], name='company_user_org_gender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='companyuser',
+            index=models.Index(fields=['org_id', 'location'], name='company_user_org_location_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='companyuser',
+            index=models.Index(fields=['org_id', 'timezone'], name='company_user_org_tz_idx'),
+        ),
+        migrations.AddField(
+            model_name='audiencesegment',
+            name='org_id',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audience_segments', to='api.organization', to_field='org_id'),
+        ),
+        migrations.AddField(
+            model_name='campaigndetails',
+            name='segment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='campaigns', to='api.audiencesegment'),
+        ),
+        migrations.AddConstraint(
+            model_name='audiencesegment',
+            constraint=models.UniqueConstraint(fields=('org_id', 'name'), name='unique_org_segment_name'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:11
+
+from django.db import migrations, models
+
+INDEXES = [
+    ('companyuser', models.Index(fields=['org_id', 'id'], name='company_user_org_id_idx')),
+    ('companyuserengagement', models.Index(condition=models.Q(('click_time__isnull', True)), fields=['user_id', 'org_id', 'campaign_id', '-send_time'], name='engagement_unclicked_idx')),
+    ('companyuserengagement', models.Index(condition=models.Q(('click_time__isnull', False)), fields=['org_id', 'click_time'], name='engagement_org_click_idx')),
+]
+
+
+def create_indexes(apps, schema_editor):
+    # PostgreSQL builds the indexes without locking writes on the tables
+    concurrently = schema_editor.connection.vendor == 'postgresql'
+    for model_name, index in INDEXES:
+        model = apps.get_model('api', model_name)
+        if concurrently:
+            schema_editor.execute(index.create_sql(model, schema_editor, concurrently=True))
+        else:
+            schema_editor.add_index(model, index)
+
+
+def drop_indexes(apps, schema_editor):
+    concurrently = schema_editor.connection.vendor == 'postgresql'
+    for model_name, index in INDEXES:
+        model = apps.get_model('api', model_name)
+        if concurrently:
+            schema_editor.execute(index.remove_sql(model, schema_editor, concurrently=True))
+        else:
+            schema_editor.remove_index(model, index)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('api', '0015_audiencesegment'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunPython(create_indexes, drop_indexes)],
+            state_operations=[
+                migrations.AddIndex(model_name=model_name, index=index) for model_name, index in INDEXES
+            ],
+        ),
+    ]
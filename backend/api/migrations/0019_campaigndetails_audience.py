@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_restrict_campaign_segment_deletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaigndetails',
+            name='audience',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -67,6 +67,15 @@ class CompanyUser(models.Model):
     class Meta:
         db_table = 'company_users'
         app_label = 'api'
+        indexes = [
+            # Audience segment predicates always filter by organization first
+            models.Index(fields=['org_id', 'age'], name='company_user_org_age_idx'),
+            models.Index(fields=['org_id', 'gender'], name='company_user_org_gender_idx'),
+            models.Index(fields=['org_id', 'location'], name='company_user_org_location_idx'),
+            models.Index(fields=['org_id', 'timezone'], name='company_user_org_tz_idx'),
+            # Contact listings page through an organization in id order
+            models.Index(fields=['org_id', 'id'], name='company_user_org_id_idx'),
+        ]
 
     def __str__(self):
         return self.email
@@ -82,6 +91,9 @@ class CampaignDetails(models.Model):
     campaign_mail_subject = models.CharField(max_length=255)
 
     send_time = models.DateTimeField()
+    segment = models.ForeignKey('AudienceSegment', on_delete=models.RESTRICT, null=True, blank=True, related_name="campaigns")
+    # {"include": [...], "require": [...], "exclude": [...]} audience sources; takes precedence over segment
+    audience = models.JSONField(null=True, blank=True)
 
     class Meta:
         db_table = 'campaign_details'
@@ -102,6 +114,20 @@ class CompanyUserEngagement(models.Model):
     class Meta:
         db_table = 'company_user_engagement'
         app_label = 'api'
+        indexes = [
+            # Open and click tracking look up the latest unclicked send of a contact
+            models.Index(
+                fields=['user_id', 'org_id', 'campaign_id', '-send_time'],
+                name='engagement_unclicked_idx',
+                condition=models.Q(click_time__isnull=True),
+            ),
+            # Send time retraining scans an organization's clicks, newest past a watermark
+            models.Index(
+                fields=['org_id', 'click_time'],
+                name='engagement_org_click_idx',
+                condition=models.Q(click_time__isnull=False),
+            ),
+        ]
 
     def __str__(self):
         return str(self.user_id)
@@ -120,6 +146,129 @@ class CampaignStatistics(models.Model):
     def __str__(self):
         return self.campaign_id
         
+class CohortSendTime(models.Model):
+    """Best click hour (UTC) for a cohort of contacts; blank fields match any value"""
+    org_id = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name="cohort_send_times", to_field="org_id")
+    timezone = models.CharField(max_length=30, blank=True)
+    age_band = models.IntegerField(null=True, blank=True)
+    gender = models.CharField(max_length=1, blank=True)
+    location = models.CharField(max_length=30, blank=True)
+    send_hour = models.IntegerField()
+    clicks = models.IntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'cohort_send_times'
+        app_label = 'api'
+
+    def __str__(self):
+        return f"{self.org_id_id} {self.timezone}/{self.age_band}/{self.gender}/{self.location} - {self.send_hour}"
+
+class UserSendTime(models.Model):
+    """Click counts per hour (UTC) of a contact and the send hour derived from them"""
+    user_id = models.OneToOneField(CompanyUser, on_delete=models.CASCADE, related_name="send_time")
+    org_id = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name="user_send_times", to_field="org_id")
+    hour_counts = models.JSONField(default=list)
+    send_hour = models.IntegerField()
+    clicks = models.IntegerField()
+    watermark = models.DateTimeField(null=True, blank=True)  # latest click_time already counted
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'user_send_times'
+        app_label = 'api'
+
+    def __str__(self):
+        return f"{self.user_id_id} - {self.send_hour}"
+
+class SendTimeArm(models.Model):
+    """Send/open counts of one hour slot (UTC) for a contact, or for the whole org when user_id is null"""
+    org_id = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name="send_time_arms", to_field="org_id")
+    user_id = models.ForeignKey(CompanyUser, on_delete=models.CASCADE, related_name="send_time_arms", null=True, blank=True)
+    hour = models.IntegerField()
+    sends = models.IntegerField(default=0)
+    opens = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'send_time_arms'
+        app_label = 'api'
+        constraints = [
+            models.UniqueConstraint(fields=['user_id', 'hour'], name='unique_user_send_time_arm'),
+            models.UniqueConstraint(fields=['org_id', 'hour'], condition=models.Q(user_id__isnull=True), name='unique_org_send_time_arm'),
+        ]
+
+    def __str__(self):
+        return f"{self.org_id_id}/{self.user_id_id} {self.hour}:00 - {self.opens}/{self.sends}"
+
+class EngagementDelayBucket(models.Model):
+    """Click count of one logarithmic engagement-delay bucket of a campaign (see api.sketches)"""
+    campaign_id = models.ForeignKey(CampaignDetails, on_delete=models.CASCADE, related_name="delay_buckets", to_field="campaign_id")
+    org_id = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name="delay_buckets", to_field="org_id")
+    bucket = models.IntegerField()
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'engagement_delay_buckets'
+        app_label = 'api'
+        constraints = [
+            models.UniqueConstraint(fields=['campaign_id', 'bucket'], name='unique_campaign_delay_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.campaign_id_id} bucket {self.bucket} - {self.count}"
+
+class ContactImportJob(models.Model):
+    """Background import of an uploaded contact CSV; counters are committed with each chunk"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    RETRYING = 'retrying'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'), (RUNNING, 'Running'), (RETRYING, 'Retrying'), (COMPLETED, 'Completed'), (FAILED, 'Failed')
+    ]
+
+    org_id = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name="contact_import_jobs", to_field="org_id")
+    file_name = models.CharField(max_length=255)
+    file_path = models.CharField(max_length=1024)
+    file_size = models.BigIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    rows_processed = models.IntegerField(default=0)  # data rows committed; a resumed job skips these
+    rows_created = models.IntegerField(default=0)
+    duplicates = models.IntegerField(default=0)
+    rejected = models.IntegerField(default=0)
+    errors = models.JSONField(default=list)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'contact_import_jobs'
+        app_label = 'api'
+
+    def __str__(self):
+        return f"{self.org_id_id} {self.file_name} - {self.status}"
+
+class AudienceSegment(models.Model):
+    """Saved contact predicate a campaign can target; see api.segments for the definition format"""
+    org_id = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name="audience_segments", to_field="org_id")
+    name = models.CharField(max_length=100)
+    definition = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'audience_segments'
+        app_label = 'api'
+        constraints = [
+            models.UniqueConstraint(fields=['org_id', 'name'], name='unique_org_segment_name'),
+        ]
+
+    def __str__(self):
+        return f"{self.org_id_id} {self.name}"
+
 class EmailLog(models.Model):
     organization_id = models.IntegerField()
     user_email = models.EmailField()
@@ -0,0 +1,107 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class PaginationError(ValueError):
+    """Raised for a malformed cursor, limit, sort, field or filter parameter"""
+
+
+def encode_cursor(values):
+    """Opaque cursor token for the sort key of the last row of a page"""
+    payload = json.dumps(values, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(token):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, TypeError):
+        raise PaginationError("Invalid cursor.")
+    if not isinstance(values, list) or len(values) != 2:
+        raise PaginationError("Invalid cursor.")
+    return values
+
+
+def parse_limit(value):
+    if value in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise PaginationError("limit must be an integer.")
+    if limit < 1:
+        raise PaginationError("limit must be positive.")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def parse_fields(value, allowed, default):
+    """Requested field projection, e.g. `fields=id,email`"""
+    if not value:
+        return list(default)
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise PaginationError(f"Unknown fields: {', '.join(unknown)}.")
+    return fields
+
+
+def parse_sort(value, allowed, default):
+    """Sort field and direction, e.g. `sort=-date_joined`"""
+    value = value or default
+    field = value.lstrip('-')
+    if field not in allowed:
+        raise PaginationError(f"Cannot sort by {field}.")
+    return field, value.startswith('-')
+
+
+def apply_filters(queryset, params, allowed):
+    """Filter by whitelisted query parameters mapped to ORM lookups"""
+    lookups = {allowed[name]: value for name, value in params.items() if name in allowed and value != ''}
+    try:
+        return queryset.filter(**lookups)
+    except (ValueError, TypeError, ValidationError):
+        raise PaginationError("Invalid filter value.")
+
+
+def keyset_page(queryset, params, *, pk, fields, sortable, default_fields, default_sort=None, filters=None):
+    """
+    One page of `queryset` as a list of dicts plus the cursor of the next page.
+
+    Rows are ordered by the requested sort field with the primary key as a tie
+    breaker, and the cursor holds both values of the last row, so each page is
+    a bounded index range scan rather than an OFFSET over everything before it.
+    Raises PaginationError for invalid parameters.
+    """
+    limit = parse_limit(params.get('limit'))
+    projection = parse_fields(params.get('fields'), fields, default_fields)
+    sort_field, descending = parse_sort(params.get('sort'), sortable, default_sort or pk)
+    queryset = apply_filters(queryset, params, filters or {})
+
+    direction = 'lt' if descending else 'gt'
+    if params.get('cursor'):
+        last_value, last_pk = decode_cursor(params['cursor'])
+        after = Q(**{f'{pk}__{direction}': last_pk})
+        if sort_field != pk:
+            after = Q(**{f'{sort_field}__{direction}': last_value}) | (Q(**{sort_field: last_value}) & after)
+        try:
+            queryset = queryset.filter(after)
+        except (ValueError, TypeError, ValidationError):
+            raise PaginationError("Invalid cursor.")
+
+    ordering = [f"{'-' if descending else ''}{field}" for field in dict.fromkeys([sort_field, pk])]
+    selected = list(dict.fromkeys(projection + [sort_field, pk]))
+    rows = list(queryset.order_by(*ordering).values(*selected)[:limit + 1])
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1][sort_field], rows[-1][pk]])
+    if len(selected) > len(projection):
+        rows = [{field: row[field] for field in projection} for row in rows]
+    return rows, next_cursor
@@ -0,0 +1,176 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+import django
+import numpy as np
+from django.db import connections, transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery
+from django.db.models.functions import ExtractHour
+from django.utils.timezone import now
+
+from .cohorts import compute_cohort_send_times
+from .models import Organization, CompanyUserEngagement, UserSendTime
+
+logger = logging.getLogger(__name__)
+
+HOURS = 24
+
+# Click times are stamped when the tracking request arrives, so anything at or
+# before an organization's latest watermark was already read by the last
+# refresh. The margin covers transactions that committed slightly late; the
+# per-contact watermarks keep those rows from being counted twice.
+WATERMARK_MARGIN = timedelta(minutes=5)
+
+
+def available_cores():
+    """CPU cores this process may run on"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def grouped_clicks(clicks):
+    """Group click rows per (contact, hour) with their count and latest click time"""
+    return (
+        clicks
+        .annotate(click_hour=ExtractHour('click_time'))
+        .values_list('user_id_id', 'click_hour')
+        .annotate(clicks=Count('id'), last_click=Max('click_time'))
+        .order_by()
+    )
+
+
+def accumulate_clicks(rows, chunk_size):
+    """Stream grouped click rows into {user_id: (hour counts, latest click time)}"""
+    accumulated = {}
+    for user_id, hour, count, last_click in rows.iterator(chunk_size=chunk_size):
+        hour_counts, watermark = accumulated.get(user_id, (np.zeros(HOURS, dtype=np.int64), last_click))
+        hour_counts[hour] += count
+        accumulated[user_id] = (hour_counts, max(watermark, last_click))
+    return accumulated
+
+
+def user_send_time(user_id, org_id, hour_counts, watermark):
+    """Build the UserSendTime row for a contact's click counts per hour"""
+    return UserSendTime(
+        user_id_id=user_id,
+        org_id_id=org_id,
+        hour_counts=hour_counts.tolist(),
+        send_hour=int(hour_counts.argmax()),
+        clicks=int(hour_counts.sum()),
+        watermark=watermark,
+    )
+
+
+def retrain_organization(org_id, chunk_size=20000):
+    """
+    Recompute the per-contact and cohort send hours of one organization.
+
+    Clicks are grouped per (contact, hour) in the database and streamed in
+    chunks; the new rows replace the old ones in a single transaction so
+    readers never see a partially retrained organization.
+    """
+    clicks = CompanyUserEngagement.objects.filter(org_id_id=org_id, click_time__isnull=False)
+    accumulated = accumulate_clicks(grouped_clicks(clicks), chunk_size)
+
+    send_times = [
+        user_send_time(user_id, org_id, hour_counts, watermark)
+        for user_id, (hour_counts, watermark) in accumulated.items()
+    ]
+    with transaction.atomic():
+        UserSendTime.objects.filter(org_id_id=org_id).delete()
+        UserSendTime.objects.bulk_create(send_times, batch_size=5000)
+
+    cohorts = compute_cohort_send_times(org_id)
+    logger.info(f"Retrained send times for organization {org_id}: {len(send_times)} contacts, {cohorts} cohorts")
+    return org_id, len(send_times)
+
+
+def refresh_organization(org_id, chunk_size=20000):
+    """
+    Fold clicks newer than each contact's watermark into its stored send time.
+
+    Only engagement rows past the contact's watermark are read, so the cost of
+    a refresh follows the number of new clicks rather than the full history.
+    Cohort hours are left to the full retrain.
+    """
+    clicks = CompanyUserEngagement.objects.filter(org_id_id=org_id, click_time__isnull=False)
+
+    latest = UserSendTime.objects.filter(org_id_id=org_id).aggregate(latest=Max('watermark'))['latest']
+    if latest is not None:
+        clicks = clicks.filter(click_time__gt=latest - WATERMARK_MARGIN)
+
+    contact_watermark = UserSendTime.objects.filter(user_id=OuterRef('user_id')).values('watermark')[:1]
+    clicks = clicks.alias(watermark=Subquery(contact_watermark)).filter(
+        Q(watermark__isnull=True) | Q(click_time__gt=F('watermark'))
+    )
+    accumulated = accumulate_clicks(grouped_clicks(clicks), chunk_size)
+
+    user_ids = list(accumulated)
+    existing = {}
+    for start in range(0, len(user_ids), chunk_size):
+        for send_time in UserSendTime.objects.filter(user_id__in=user_ids[start:start + chunk_size]):
+            existing[send_time.user_id_id] = send_time
+
+    updated, created = [], []
+    refreshed_at = now()
+    for user_id, (hour_counts, watermark) in accumulated.items():
+        send_time = existing.get(user_id)
+        if send_time is None:
+            created.append(user_send_time(user_id, org_id, hour_counts, watermark))
+            continue
+        hour_counts = hour_counts + np.array(send_time.hour_counts, dtype=np.int64)
+        send_time.hour_counts = hour_counts.tolist()
+        send_time.send_hour = int(hour_counts.argmax())
+        send_time.clicks = int(hour_counts.sum())
+        send_time.watermark = max(watermark, send_time.watermark) if send_time.watermark else watermark
+        send_time.updated_at = refreshed_at
+        updated.append(send_time)
+
+    with transaction.atomic():
+        UserSendTime.objects.bulk_update(
+            updated, ['hour_counts', 'send_hour', 'clicks', 'watermark', 'updated_at'], batch_size=5000
+        )
+        UserSendTime.objects.bulk_create(created, batch_size=5000)
+
+    logger.info(f"Refreshed send times for organization {org_id}: {len(updated)} updated, {len(created)} new")
+    return org_id, len(updated) + len(created)
+
+
+def _init_worker():
+    """Give each pool process its own Django setup and database connections"""
+    django.setup()
+    connections.close_all()
+
+
+def retrain_organizations(org_ids=None, workers=None, incremental=False):
+    """
+    Retrain every organization (or the given ones) across a process pool.
+
+    Organizations are independent, so each is retrained in its own process;
+    for full retrains the busiest are submitted first to keep the pool
+    balanced. With `incremental`, only clicks past each contact's watermark
+    are folded in. Yields (org_id, contacts retrained) as organizations finish.
+    """
+    task = refresh_organization if incremental else retrain_organization
+    orgs = Organization.objects.all()
+    if not incremental:
+        orgs = orgs.annotate(engagements=Count('org_user_engagement')).order_by('-engagements')
+    if org_ids is not None:
+        orgs = orgs.filter(org_id_id__in=org_ids)
+    org_ids = list(orgs.values_list('org_id_id', flat=True))
+    workers = min(workers or available_cores(), len(org_ids)) or 1
+
+    if workers == 1:
+        for org_id in org_ids:
+            yield task(org_id)
+        return
+
+    # Forked workers must not share the parent's open database connections
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(task, org_id) for org_id in org_ids]
+        for future in as_completed(futures):
+            yield future.result()
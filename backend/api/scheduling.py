@@ -0,0 +1,82 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import pytz
+
+DEFAULT_TIMEZONE = "Asia/Kolkata"
+
+# Abbreviations contacts are commonly uploaded with; pytz only knows IANA names.
+TIMEZONE_ALIASES = {
+    "IST": "Asia/Kolkata",
+    "PST": "America/Los_Angeles",
+    "PDT": "America/Los_Angeles",
+    "MST": "America/Denver",
+    "CST": "America/Chicago",
+    "EST": "America/New_York",
+    "EDT": "America/New_York",
+    "GMT": "UTC",
+    "BST": "Europe/London",
+    "CET": "Europe/Paris",
+    "JST": "Asia/Tokyo",
+    "AEST": "Australia/Sydney",
+}
+
+
+@lru_cache(maxsize=None)
+def resolve_timezone(name):
+    """Return the tz object for a contact timezone name, defaulting to IST when unknown"""
+    name = (name or "").strip()
+    name = TIMEZONE_ALIASES.get(name.upper(), name)
+    try:
+        return pytz.timezone(name)
+    except pytz.UnknownTimeZoneError:
+        return pytz.timezone(DEFAULT_TIMEZONE)
+
+
+@lru_cache(maxsize=4096)
+def utc_offset_seconds(name, wall_clock):
+    """UTC offset, in seconds, of a naive wall-clock time in the given timezone"""
+    tz = resolve_timezone(name)
+    return int(tz.localize(wall_clock, is_dst=False).utcoffset().total_seconds())
+
+
+def wall_clock(value):
+    """Naive minute-precision wall clock of a stored campaign datetime"""
+    if value.tzinfo is not None:
+        value = value.astimezone(pytz.utc).replace(tzinfo=None)
+    return value.replace(second=0, microsecond=0)
+
+
+def local_to_utc(value, tz_name=DEFAULT_TIMEZONE):
+    """Interpret a naive wall-clock datetime in tz_name and return it as an aware UTC datetime"""
+    return resolve_timezone(tz_name).localize(value, is_dst=False).astimezone(pytz.utc)
+
+
+def local_send_times(timezones, local_datetime):
+    """
+    UTC instants at which a naive local wall-clock time occurs for each recipient.
+
+    Timezone names are factorized so each distinct zone is resolved once, then the
+    offsets are broadcast back to the recipients with NumPy. Returns a
+    datetime64[s] array aligned with `timezones`.
+    """
+    names = pd.Series(timezones, dtype=object).fillna("")
+    codes, uniques = pd.factorize(names)
+    offsets = np.array([utc_offset_seconds(name, local_datetime) for name in uniques], dtype="int64")
+    base = np.datetime64(local_datetime.replace(tzinfo=None), "s")
+    return base - offsets[codes].astype("timedelta64[s]")
+
+
+def to_utc_datetimes(instants):
+    """
+    Convert a datetime64 array from local_send_times to aware UTC datetimes.
+
+    Recipients share a handful of distinct instants (one per timezone offset),
+    so only those are converted to datetime objects and then broadcast back
+    to the recipients by index.
+    """
+    uniques, inverse = np.unique(instants, return_inverse=True)
+    converted = np.empty(len(uniques), dtype=object)
+    converted[:] = [value.replace(tzinfo=pytz.utc) for value in uniques.astype("datetime64[us]").tolist()]
+    return converted[inverse.reshape(-1)].tolist()
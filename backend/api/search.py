@@ -0,0 +1,64 @@
+from functools import reduce
+from operator import or_
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
+
+from .models import CompanyUser
+
+SEARCH_FIELDS = ('email', 'first_name', 'last_name', 'location')
+SEARCH_RESULT_FIELDS = ['id', 'email', 'first_name', 'last_name', 'location', 'timezone']
+# Shorter queries have no trigram to look up in the indexes
+MIN_QUERY_LENGTH = 3
+DEFAULT_SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+# Substring matches ranked by similarity; a very common query ranks only this many
+MAX_RANKED_CANDIDATES = 1000
+
+
+class SearchError(ValueError):
+    """Raised for a search query or limit that cannot be served"""
+
+
+def parse_search_params(params):
+    """(query, limit) of a contact search request, or raise SearchError"""
+    query = params.get('q', '').strip()
+    if len(query) < MIN_QUERY_LENGTH:
+        raise SearchError(f"q must be at least {MIN_QUERY_LENGTH} characters.")
+    try:
+        limit = int(params.get('limit', DEFAULT_SEARCH_LIMIT))
+    except (TypeError, ValueError):
+        raise SearchError("limit must be an integer.")
+    if not 1 <= limit <= MAX_SEARCH_LIMIT:
+        raise SearchError(f"limit must be between 1 and {MAX_SEARCH_LIMIT}.")
+    return query, limit
+
+
+def search_contacts(org_id, query, limit=DEFAULT_SEARCH_LIMIT):
+    """
+    Top `limit` contacts of an organization matching `query` in any search field.
+
+    Matching is a case-insensitive substring test, which PostgreSQL answers
+    from the pg_trgm GIN indexes on UPPER(field). Only the first
+    MAX_RANKED_CANDIDATES matches are then scored by trigram similarity,
+    so a query matching most of the organization does not rank every row.
+    Other databases fall back to ranking prefix matches first.
+    """
+    matches = reduce(or_, (Q(**{f'{field}__icontains': query}) for field in SEARCH_FIELDS))
+    contacts = CompanyUser.objects.filter(org_id_id=org_id).filter(matches)
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        candidates = contacts.order_by().values('id')[:MAX_RANKED_CANDIDATES]
+        contacts = CompanyUser.objects.filter(id__in=candidates).annotate(
+            rank=Greatest(*(TrigramSimilarity(field, query) for field in SEARCH_FIELDS))
+        ).order_by('-rank', 'id')
+    else:
+        prefix = reduce(or_, (Q(**{f'{field}__istartswith': query}) for field in SEARCH_FIELDS))
+        contacts = contacts.annotate(
+            rank=Case(When(prefix, then=Value(1)), default=Value(0), output_field=IntegerField())
+        ).order_by('-rank', 'email')
+
+    return list(contacts.values(*SEARCH_RESULT_FIELDS)[:limit])
@@ -0,0 +1,106 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Q
+from django.utils.timezone import now
+
+from .models import CompanyUser, CompanyUserEngagement
+
+SEGMENT_SIZE_TIMEOUT = 10 * 60
+
+# Definition key -> type of its value. Every key is optional and keys combine with AND:
+#   {"min_age": 25, "max_age": 40, "genders": ["F"], "locations": ["Pune"],
+#    "timezones": ["Asia/Kolkata"], "engaged_within_days": 30, "inactive_for_days": 90}
+SEGMENT_RULES = {
+    'min_age': int,
+    'max_age': int,
+    'genders': list,
+    'locations': list,
+    'timezones': list,
+    'engaged_within_days': int,
+    'inactive_for_days': int,
+}
+
+
+class SegmentError(ValueError):
+    """Raised for a segment definition that cannot be compiled"""
+
+
+def segment_size_key(segment_id):
+    return f"segment_size_{segment_id}"
+
+
+def validate_definition(definition):
+    """Checked copy of a segment definition, or raise SegmentError"""
+    if not isinstance(definition, dict):
+        raise SegmentError("definition must be an object.")
+    unknown = set(definition) - set(SEGMENT_RULES)
+    if unknown:
+        raise SegmentError(f"Unknown rules: {', '.join(sorted(unknown))}.")
+
+    cleaned = {}
+    for rule, value in definition.items():
+        expected = SEGMENT_RULES[rule]
+        if value is None:
+            continue
+        if expected is int:
+            if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+                raise SegmentError(f"{rule} must be a non-negative integer.")
+        elif not isinstance(value, list) or not value or not all(isinstance(item, str) for item in value):
+            raise SegmentError(f"{rule} must be a non-empty list of strings.")
+        cleaned[rule] = value
+
+    if cleaned.get('min_age', 0) > cleaned.get('max_age', float('inf')):
+        raise SegmentError("min_age must not be greater than max_age.")
+    return cleaned
+
+
+def recent_engagement(days):
+    """EXISTS subquery matching contacts that opened or clicked within the last `days` days"""
+    cutoff = now() - timedelta(days=days)
+    return Exists(
+        CompanyUserEngagement.objects.filter(user_id=OuterRef('pk')).filter(
+            Q(open_time__gte=cutoff) | Q(click_time__gte=cutoff)
+        )
+    )
+
+
+def compile_segment(definition):
+    """
+    Compile a segment definition into a single filter expression.
+
+    Attribute rules become predicates over the organization-leading indexes
+    of company_users; engagement recency becomes a correlated EXISTS over
+    the contact's engagement rows, so the database evaluates the whole segment.
+    """
+    condition = Q()
+    if 'min_age' in definition:
+        condition &= Q(age__gte=definition['min_age'])
+    if 'max_age' in definition:
+        condition &= Q(age__lte=definition['max_age'])
+    if 'genders' in definition:
+        condition &= Q(gender__in=definition['genders'])
+    if 'locations' in definition:
+        condition &= Q(location__in=definition['locations'])
+    if 'timezones' in definition:
+        condition &= Q(timezone__in=definition['timezones'])
+    if 'engaged_within_days' in definition:
+        condition &= recent_engagement(definition['engaged_within_days'])
+    if 'inactive_for_days' in definition:
+        condition &= ~recent_engagement(definition['inactive_for_days'])
+    return condition
+
+
+def segment_contacts(org_id, definition):
+    """Contacts of an organization matching a segment definition"""
+    return CompanyUser.objects.filter(org_id_id=org_id).filter(compile_segment(definition))
+
+
+def get_segment_size(segment):
+    """Cached number of contacts in a segment; expires since engagement recency moves with time"""
+    size = cache.get(segment_size_key(segment.id))
+    if size is None:
+        size = segment_contacts(segment.org_id_id, segment.definition).count()
+        cache.set(segment_size_key(segment.id), size, timeout=SEGMENT_SIZE_TIMEOUT)
+    return size
+
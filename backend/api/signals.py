@@ -0,0 +1,42 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .analytics import optimal_start_time_key, chart_data_key, campaign_funnel_key
+from .dashboard import dashboard_summary_key
+from .versions import CONTACT_DATA, ENGAGEMENT_DATA, SEGMENT_DATA, bump_data_version
+from .models import AudienceSegment, CompanyUser, CompanyUserEngagement, CampaignDetails, CampaignStatistics
+
+
+@receiver(post_save, sender=CompanyUserEngagement)
+@receiver(post_delete, sender=CompanyUserEngagement)
+def invalidate_engagement_caches(sender, instance, **kwargs):
+    """Drop cached aggregates that depend on an organization's engagement events"""
+    cache.delete(campaign_funnel_key(instance.campaign_id_id))
+    bump_data_version(instance.org_id_id, ENGAGEMENT_DATA)
+    if instance.open_time is not None:
+        cache.delete(optimal_start_time_key(instance.org_id_id))
+
+
+@receiver(post_save, sender=CampaignStatistics)
+@receiver(post_delete, sender=CampaignStatistics)
+@receiver(post_save, sender=CampaignDetails)
+@receiver(post_delete, sender=CampaignDetails)
+def invalidate_campaign_caches(sender, instance, **kwargs):
+    """Drop cached campaign dashboards of the organization whose campaigns or stats changed"""
+    cache.delete_many([chart_data_key(instance.org_id_id), dashboard_summary_key(instance.org_id_id)])
+    bump_data_version(instance.org_id_id)
+
+
+@receiver(post_save, sender=CompanyUser)
+@receiver(post_delete, sender=CompanyUser)
+def invalidate_contact_caches(sender, instance, **kwargs):
+    """Retire cached audiences of the organization whose contacts changed"""
+    bump_data_version(instance.org_id_id, CONTACT_DATA)
+
+
+@receiver(post_save, sender=AudienceSegment)
+@receiver(post_delete, sender=AudienceSegment)
+def invalidate_segment_caches(sender, instance, **kwargs):
+    """Retire cached audiences built from a redefined or deleted segment"""
+    bump_data_version(instance.org_id_id, SEGMENT_DATA)
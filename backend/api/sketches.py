@@ -0,0 +1,150 @@
+import math
+
+import numpy as np
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from .models import CompanyUserEngagement, EngagementDelayBucket
+from .versions import bump_data_version
+
+# Every quantile is reported within 1% of the true delay. Bucket i holds delays
+# in (GAMMA ** (i - 1), GAMMA ** i] seconds; delays under a second count as one
+# second, so a month-long delay still only needs ~740 buckets.
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+MIN_DELAY = 1.0
+
+SKETCH_PERCENTILES = [50, 90, 99]
+
+
+def bucket_index(delay):
+    return math.ceil(math.log(max(delay, MIN_DELAY)) / LOG_GAMMA)
+
+
+def bucket_value(index):
+    """Representative delay of a bucket, within RELATIVE_ACCURACY of any delay in it"""
+    return 2 * GAMMA ** index / (GAMMA + 1)
+
+
+class DelaySketch:
+    """
+    Log-bucketed quantile sketch of engagement delays (DDSketch).
+
+    Sketches merge by adding bucket counts, so per-campaign sketches combine
+    into an organization's exactly, and a quantile only walks the buckets.
+    """
+
+    def __init__(self, counts=None):
+        self.counts = dict(counts or {})
+
+    def add(self, delay, count=1):
+        index = bucket_index(delay)
+        self.counts[index] = self.counts.get(index, 0) + count
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        return self
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def quantile(self, q):
+        """Delay in seconds at quantile `q` (0-1), or None for an empty sketch"""
+        total = self.total
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen > rank:
+                return bucket_value(index)
+        return bucket_value(max(self.counts))
+
+    def percentiles(self):
+        return {f'p{p}': self.quantile(p / 100) for p in SKETCH_PERCENTILES}
+
+
+def record_engagement_delay(org_id, campaign_id, delay):
+    """Add a click's engagement delay to its campaign's sketch"""
+    index = bucket_index(delay)
+    buckets = EngagementDelayBucket.objects.filter(campaign_id_id=campaign_id, bucket=index)
+    if not buckets.update(count=F('count') + 1):
+        try:
+            with transaction.atomic():
+                EngagementDelayBucket.objects.create(campaign_id_id=campaign_id, org_id_id=org_id, bucket=index, count=1)
+        except IntegrityError:
+            # Another worker created the bucket first
+            buckets.update(count=F('count') + 1)
+    bump_data_version(org_id)
+
+
+def load_delay_sketch(campaign_id):
+    buckets = EngagementDelayBucket.objects.filter(campaign_id_id=campaign_id).values_list('bucket', 'count')
+    return DelaySketch(buckets)
+
+
+def load_org_delay_sketch(org_id):
+    """All campaign sketches of an organization, merged in the database"""
+    buckets = (
+        EngagementDelayBucket.objects.filter(org_id_id=org_id)
+        .values('bucket')
+        .annotate(total=Sum('count'))
+        .values_list('bucket', 'total')
+    )
+    return DelaySketch(buckets)
+
+
+def rebuild_delay_sketch(org_id, campaign_id, chunk_size=20000):
+    """Recount a campaign's sketch from its clicked engagement rows, e.g. to backfill old campaigns"""
+    delays = (
+        CompanyUserEngagement.objects.filter(campaign_id_id=campaign_id, click_time__isnull=False)
+        .values_list('engagement_delay', flat=True)
+    )
+    counts = {}
+    chunk = []
+    for delay in delays.iterator(chunk_size=chunk_size):
+        chunk.append(delay)
+        if len(chunk) >= chunk_size:
+            add_bucket_counts(counts, chunk)
+            chunk = []
+    add_bucket_counts(counts, chunk)
+
+    with transaction.atomic():
+        EngagementDelayBucket.objects.filter(campaign_id_id=campaign_id).delete()
+        EngagementDelayBucket.objects.bulk_create([
+            EngagementDelayBucket(campaign_id_id=campaign_id, org_id_id=org_id, bucket=index, count=count)
+            for index, count in counts.items()
+        ])
+    bump_data_version(org_id)
+    return sum(counts.values())
+
+
+def remove_engagement_delays(engagements):
+    """
+    Take deleted clicks, given as (campaign_id, engagement_delay) pairs, back
+    out of their campaigns' sketches. The caller bumps the data version.
+    """
+    delays_by_campaign = {}
+    for campaign_id, delay in engagements:
+        delays_by_campaign.setdefault(campaign_id, []).append(delay)
+    for campaign_id, delays in delays_by_campaign.items():
+        counts = {}
+        add_bucket_counts(counts, delays)
+        buckets = EngagementDelayBucket.objects.filter(campaign_id_id=campaign_id)
+        for index, count in counts.items():
+            buckets.filter(bucket=index).update(count=F('count') - count)
+        buckets.filter(count__lte=0).delete()
+
+
+def add_bucket_counts(counts, delays):
+    """Vectorized bucket_index over a chunk of delays, added into `counts`"""
+    if not delays:
+        return
+    delays = np.maximum(np.asarray(delays, dtype=np.float64), MIN_DELAY)
+    indexes, chunk_counts = np.unique(np.ceil(np.log(delays) / LOG_GAMMA).astype(np.int64), return_counts=True)
+    for index, count in zip(indexes.tolist(), chunk_counts.tolist()):
+        counts[index] = counts.get(index, 0) + count
@@ -0,0 +1,166 @@
+import os
+import shutil
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.db import models
+
+from .models import CompanyUser, CampaignDetails, CompanyUserEngagement
+
+# Table name -> (model, field that assigns a row to its monthly partition)
+SNAPSHOT_TABLES = {
+    'company_users': (CompanyUser, 'date_joined'),
+    'campaign_details': (CampaignDetails, 'campaign_start_date'),
+    'company_user_engagement': (CompanyUserEngagement, 'send_time'),
+}
+
+ROW_GROUP_SIZE = 100000
+
+
+def arrow_type(field):
+    """Arrow column type of a concrete model field"""
+    if isinstance(field, models.ForeignKey):
+        return arrow_type(field.target_field)
+    if isinstance(field, (models.AutoField, models.BigAutoField, models.IntegerField)):
+        return pa.int64()
+    if isinstance(field, models.FloatField):
+        return pa.float64()
+    if isinstance(field, models.BooleanField):
+        return pa.bool_()
+    if isinstance(field, models.DateTimeField):
+        return pa.timestamp('us', tz='UTC')
+    return pa.string()
+
+
+def table_schema(model, exclude=()):
+    """Column names (model attnames) and Arrow schema of a model's table, leaving out `exclude` attnames"""
+    fields = [field for field in model._meta.concrete_fields if field.attname not in exclude]
+    columns = [field.attname for field in fields]
+    schema = pa.schema([pa.field(field.column, arrow_type(field), nullable=field.null) for field in fields])
+    return columns, schema
+
+
+def partition_path(output_dir, table, org_id, month):
+    return os.path.join(output_dir, table, f"org_id={org_id}", f"month={month}", "part-0.parquet")
+
+
+class PartitionWriter:
+    """
+    Write one table's rows into Hive-style org/month Parquet partitions.
+
+    The organization is carried by the partition path only; files hold the
+    remaining columns, so a dataset reader does not see org_id twice.
+
+    Rows must arrive grouped by partition. They are buffered column-wise and
+    flushed as one row group every `row_group_size` rows, so memory is bounded
+    by a single row group. Each partition file is written under a temporary
+    name and renamed once complete.
+    """
+
+    def __init__(self, output_dir, table, schema, row_group_size=ROW_GROUP_SIZE, compression='zstd'):
+        self.output_dir = output_dir
+        self.table = table
+        self.schema = schema
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.partition = None
+        self.writer = None
+        self.path = None
+        self.columns = [[] for _ in schema]
+        self.partitions = 0
+        self.rows = 0
+        self.written = set()
+
+    def write(self, partition, row):
+        if partition != self.partition:
+            self.close()
+            self.open(partition)
+        for column, value in zip(self.columns, row):
+            column.append(value)
+        if len(self.columns[0]) >= self.row_group_size:
+            self.flush()
+
+    def open(self, partition):
+        self.partition = partition
+        self.path = partition_path(self.output_dir, self.table, *partition)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.writer = pq.ParquetWriter(f"{self.path}.tmp", self.schema, compression=self.compression)
+
+    def flush(self):
+        if not self.columns[0]:
+            return
+        arrays = [pa.array(values, type=field.type) for values, field in zip(self.columns, self.schema)]
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+        self.rows += len(self.columns[0])
+        self.columns = [[] for _ in self.schema]
+
+    def close(self):
+        if self.writer is None:
+            return
+        self.flush()
+        self.writer.close()
+        os.replace(f"{self.path}.tmp", self.path)
+        self.writer = None
+        self.partitions += 1
+        self.written.add(self.partition)
+
+    def abort(self):
+        """Discard the partition being written, leaving any published file in place"""
+        if self.writer is None:
+            return
+        self.writer.close()
+        os.remove(f"{self.path}.tmp")
+        self.writer = None
+        self.columns = [[] for _ in self.schema]
+
+
+def remove_stale_partitions(output_dir, table, written, org_ids=None):
+    """
+    Delete partitions of the exported organizations (all, without `org_ids`)
+    that this run did not write, so a rerun never mixes old files with new ones.
+    """
+    table_dir = os.path.join(output_dir, table)
+    if not os.path.isdir(table_dir):
+        return
+    scope = {str(org_id) for org_id in org_ids} if org_ids else None
+    kept = {(str(org_id), month) for org_id, month in written}
+    for org_dir in os.listdir(table_dir):
+        org_id = org_dir.partition('org_id=')[2]
+        if not org_id or (scope is not None and org_id not in scope):
+            continue
+        for month_dir in os.listdir(os.path.join(table_dir, org_dir)):
+            if (org_id, month_dir.partition('month=')[2]) not in kept:
+                shutil.rmtree(os.path.join(table_dir, org_dir, month_dir))
+        if not os.listdir(os.path.join(table_dir, org_dir)):
+            os.rmdir(os.path.join(table_dir, org_dir))
+
+
+def snapshot_table(table, output_dir, org_ids=None, row_group_size=ROW_GROUP_SIZE, compression='zstd', chunk_size=10000):
+    """
+    Stream one table to Parquet partitioned by organization and month.
+
+    Rows are read in (org, partition date, id) order through a server-side
+    cursor, so each partition is written contiguously. Returns (partitions, rows).
+    """
+    model, partition_field = SNAPSHOT_TABLES[table]
+    org_column = model._meta.get_field('org_id').attname
+    partition_column = model._meta.get_field(partition_field).attname
+    columns, schema = table_schema(model, exclude={org_column})
+
+    queryset = model.objects.all()
+    if org_ids:
+        queryset = queryset.filter(org_id_id__in=org_ids)
+    rows = queryset.order_by(org_column, partition_column, model._meta.pk.attname).values_list(org_column, *columns)
+
+    date_index = columns.index(partition_column)
+    writer = PartitionWriter(output_dir, table, schema, row_group_size, compression)
+    try:
+        for org_id, *row in rows.iterator(chunk_size=chunk_size):
+            writer.write((org_id, row[date_index].strftime('%Y-%m')), row)
+    except BaseException:
+        # A truncated partition must never be renamed over a complete one
+        writer.abort()
+        raise
+    writer.close()
+    remove_stale_partitions(output_dir, table, writer.written, org_ids)
+    return writer.partitions, writer.rows
@@ -0,0 +1,159 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.utils.timezone import now
+
+from .bulk import column_names, copy_rows, supports_copy
+from .models import User, Organization, CompanyUser, CampaignDetails, CompanyUserEngagement
+
+# (timezone, UTC offset in hours, share of contacts, locations)
+TIMEZONES = [
+    ("Asia/Kolkata", 5.5, 0.45, ["Delhi", "Mumbai", "Bangalore", "Chennai", "Pune"]),
+    ("America/New_York", -5, 0.2, ["New York", "Boston", "Miami"]),
+    ("America/Los_Angeles", -8, 0.1, ["Los Angeles", "Seattle", "San Francisco"]),
+    ("Europe/London", 0, 0.15, ["London", "Manchester"]),
+    ("Asia/Tokyo", 9, 0.1, ["Tokyo", "Osaka"]),
+]
+FIRST_NAMES = ["Aarav", "Diya", "Noel", "Mehul", "Rahul", "Tharun", "Emma", "Liam", "Yuki", "Olivia"]
+LAST_NAMES = ["Sharma", "Iyer", "Smith", "Tanaka", "Brown", "Patel", "Jones", "Khan"]
+
+CONTACT_FIELDS = ['org_id', 'email', 'age', 'first_name', 'last_name', 'gender', 'location', 'timezone', 'date_joined']
+ENGAGEMENT_FIELDS = ['user_id', 'campaign_id', 'org_id', 'send_time', 'open_time', 'click_time', 'engagement_delay']
+
+BASE_OPEN_RATE = 0.12
+PEAK_OPEN_RATE = 0.45
+CLICK_RATE = 0.3
+
+
+def create_organization(name):
+    """Create the login user and organization owning a synthetic dataset"""
+    user = User.objects.create_user(email=f"{name}@synthetic.example", username=name[:30], password=None)
+    return Organization.objects.create(
+        org_id=user,
+        email_host_user=f"{name}-smtp@synthetic.example",
+        email_host_password="synthetic",
+    )
+
+
+def write_rows(model, fields, rows):
+    """Bulk load rows with COPY on PostgreSQL, falling back to bulk_create elsewhere"""
+    if supports_copy():
+        return copy_rows(model._meta.db_table, column_names(model, fields), rows)
+
+    attnames = [model._meta.get_field(field).attname for field in fields]
+    objects = [model(**dict(zip(attnames, row))) for row in rows]
+    model.objects.bulk_create(objects, batch_size=2000)
+    return len(objects)
+
+
+def generate_contacts(org, count, rng, chunk_size=50000):
+    """Insert `count` contacts for an organization; returns their latent preferred UTC hours by id"""
+    zone_names = [zone[0] for zone in TIMEZONES]
+    zone_offsets = np.array([zone[1] for zone in TIMEZONES])
+    zone_shares = np.array([zone[2] for zone in TIMEZONES])
+    joined = now()
+
+    preferred_hours = np.empty(count, dtype=np.int64)
+    for start in range(0, count, chunk_size):
+        size = min(chunk_size, count - start)
+        zones = rng.choice(len(TIMEZONES), size=size, p=zone_shares / zone_shares.sum())
+        ages = np.clip(rng.normal(35, 12, size).round(), 18, 80).astype(int)
+        genders = rng.choice(["M", "F"], size=size)
+        first = rng.choice(FIRST_NAMES, size=size)
+        last = rng.choice(LAST_NAMES, size=size)
+        location_picks = rng.integers(0, 1 << 30, size)
+
+        # Contacts read mail either in the morning or the evening, local time
+        local_peak = np.where(rng.random(size) < 0.6, rng.normal(9, 1.5, size), rng.normal(20, 1.5, size))
+        preferred_hours[start:start + size] = np.round(local_peak - zone_offsets[zones]).astype(int) % 24
+
+        rows = (
+            (
+                org.org_id_id,
+                f"c{start + i}.org{org.org_id_id}@synthetic.example",
+                int(ages[i]),
+                first[i],
+                last[i],
+                genders[i],
+                TIMEZONES[zones[i]][3][location_picks[i] % len(TIMEZONES[zones[i]][3])],
+                zone_names[zones[i]],
+                joined,
+            )
+            for i in range(size)
+        )
+        write_rows(CompanyUser, CONTACT_FIELDS, rows)
+
+    contact_ids = np.fromiter(
+        CompanyUser.objects.filter(org_id_id=org.org_id_id).order_by('id').values_list('id', flat=True).iterator(),
+        dtype=np.int64,
+    )
+    return dict(zip(contact_ids.tolist(), preferred_hours.tolist()))
+
+
+def generate_campaigns(org, count, start):
+    """Create `count` daily campaigns for an organization starting at `start`"""
+    campaigns = [
+        CampaignDetails(
+            org_id=org,
+            campaign_name=f"Synthetic {i}",
+            campaign_description="Synthetic benchmark campaign",
+            campaign_start_date=start + timedelta(days=i),
+            campaign_end_date=start + timedelta(days=i + 1),
+            campaign_mail_body="Hello [recipient_name]",
+            campaign_mail_subject=f"Synthetic campaign {i}",
+            send_time=start + timedelta(days=i),
+        )
+        for i in range(count)
+    ]
+    CampaignDetails.objects.bulk_create(campaigns)
+    return list(
+        CampaignDetails.objects.filter(org_id=org).order_by('campaign_id').values_list('campaign_id', 'campaign_start_date')
+    )
+
+
+def generate_engagements(org, preferred_hours, campaigns, count, rng, chunk_size=200000):
+    """
+    Insert `count` engagement rows spread over the organization's contacts and campaigns.
+
+    Send hours are uniform so the data carries a learnable signal: the open
+    probability peaks when an email lands within an hour of the contact's
+    preferred hour. Rows are generated and written one chunk at a time.
+    """
+    contact_ids = np.array(list(preferred_hours.keys()), dtype=np.int64)
+    contact_hours = np.array(list(preferred_hours.values()), dtype=np.int64)
+    campaign_ids = np.array([campaign_id for campaign_id, _ in campaigns], dtype=np.int64)
+    campaign_days = np.array(
+        [start.replace(hour=0, minute=0, second=0, microsecond=0).timestamp() for _, start in campaigns],
+        dtype=np.int64,
+    )
+
+    written = 0
+    while written < count:
+        size = min(chunk_size, count - written)
+        contacts = rng.integers(0, len(contact_ids), size)
+        campaign_idx = rng.integers(0, len(campaign_ids), size)
+        send_hours = rng.integers(0, 24, size)
+        send_ts = campaign_days[campaign_idx] + send_hours * 3600 + rng.integers(0, 3600, size)
+
+        distance = np.abs(send_hours - contact_hours[contacts])
+        distance = np.minimum(distance, 24 - distance)
+        open_rate = np.where(distance <= 1, PEAK_OPEN_RATE, BASE_OPEN_RATE)
+        opened = rng.random(size) < open_rate
+        open_ts = send_ts + rng.exponential(1800, size).astype(np.int64)
+        clicked = opened & (rng.random(size) < CLICK_RATE)
+        click_ts = open_ts + rng.exponential(300, size).astype(np.int64)
+
+        rows = (
+            (
+                int(contact_ids[contacts[i]]),
+                int(campaign_ids[campaign_idx[i]]),
+                org.org_id_id,
+                datetime.fromtimestamp(send_ts[i], dt_timezone.utc),
+                datetime.fromtimestamp(open_ts[i], dt_timezone.utc) if opened[i] else None,
+                datetime.fromtimestamp(click_ts[i], dt_timezone.utc) if clicked[i] else None,
+                float(click_ts[i] - send_ts[i]) if clicked[i] else 0.0,
+            )
+            for i in range(size)
+        )
+        written += write_rows(CompanyUserEngagement, ENGAGEMENT_FIELDS, rows)
+    return written
@@ -2,6 +2,11 @@ from celery import shared_task
 from django.core.mail import get_connection, EmailMultiAlternatives
 from django.utils.timezone import now
 from .models import Organization, CompanyUserEngagement, CompanyUser, CampaignDetails,User
+from .cohorts import compute_cohort_send_times
+from .bandit import record_send
+from .retraining import retrain_organizations
+from .import_jobs import discard_upload, run_import_job
+from .deletion import delete_contacts
 import logging
 
 logger = logging.getLogger(__name__)
@@ -99,7 +104,7 @@ def send_scheduled_email(self, organization_id, campaign_id, user_email, subject
         email.send()
 
         # Log success in CompanyUserEngagement
-        CompanyUserEngagement.objects.create(
+        engagement = CompanyUserEngagement.objects.create(
             user_id=user,
             campaign_id=campaign,
             org_id=organization,
@@ -108,6 +113,7 @@ def send_scheduled_email(self, organization_id, campaign_id, user_email, subject
             click_time=None,
             engagement_delay=0.0
         )
+        record_send(organization.org_id_id, user.id, engagement.send_time.hour)
 
         logger.info(f"Email successfully sent to {user_email} from {organization.email_host_user}")
         return f"Email successfully sent to {user_email} from {organization.email_host_user}"
@@ -123,4 +129,46 @@ def send_scheduled_email(self, organization_id, campaign_id, user_email, subject
         raise
     except Exception as e:
         logger.error(f"Error sending email to {user_email}: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+
+@shared_task
+def refresh_cohort_send_times(organization_id=None):
+    """Recompute cohort send hours for one organization, or for every organization"""
+    if organization_id is None:
+        org_ids = Organization.objects.values_list('org_id_id', flat=True)
+    else:
+        org_ids = [organization_id]
+
+    total = 0
+    for org_id in org_ids:
+        total += compute_cohort_send_times(org_id)
+    return f"Computed {total} cohort send times"
+
+
+@shared_task
+def refresh_user_send_times(organization_id=None):
+    """Fold new clicks into stored contact send times, past each contact's watermark"""
+    org_ids = None if organization_id is None else [organization_id]
+    refreshed = sum(contacts for _, contacts in retrain_organizations(org_ids, workers=1, incremental=True))
+    return f"Refreshed send times of {refreshed} contacts"
+
+
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True, autoretry_for=(Exception,), retry_backoff=5, max_retries=3)
+def import_contacts(self, job_id):
+    """Run a stored contact import; redelivered or retried runs resume after the last committed chunk"""
+    final = self.request.retries >= self.max_retries
+    try:
+        job = run_import_job(job_id, final=final)
+    except Exception:
+        # No retry is left to resume from the stored file
+        if final:
+            discard_upload(job_id)
+        raise
+    return job.rows_processed
+
+
+@shared_task(bind=True, acks_late=True, autoretry_for=(Exception,), retry_backoff=5, max_retries=3)
+def delete_company_users(self, organization_id, user_ids=None):
+    """Delete an organization's contacts (the given ones, or all) in chunked transactions"""
+    return delete_contacts(organization_id, user_ids)
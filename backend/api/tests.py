@@ -1,14 +1,48 @@
-from django.test import TestCase, Client
+from django.test import TestCase, TransactionTestCase, Client
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from rest_framework.authtoken.models import Token
 from django.core.cache import cache
-from django.db import IntegrityError
+from django.db import IntegrityError, connection, models
 from api.models import *
+from api.cohorts import compute_cohort_send_times, load_cohort_send_hours, cohort_send_hour
+from api.scheduling import local_send_times, to_utc_datetimes
+from api.bandit import record_send, record_open, sample_send_hours
+from api.sketches import DelaySketch, load_delay_sketch, rebuild_delay_sketch
+from api.import_jobs import discard_upload, run_import_job
+from api.tasks import import_contacts
+from api.importers import ContactImporter
+from api.deletion import delete_contacts
+from api.segments import segment_contacts
+from api.bitmaps import AudienceBitmap
+from api.retraining import retrain_organizations
+from concurrent.futures import ProcessPoolExecutor
+from api.audiences import audience_key
+from api.versions import CAMPAIGN_DATA, CONTACT_DATA, ENGAGEMENT_DATA, bump_data_version, get_data_version
+from api.analytics import FUNNEL_CACHE_TIMEOUT
+from api.pagination import encode_cursor
 from uuid import uuid4
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.validators import validate_email
 from django.utils.timezone import now
+from django.core.management import call_command
+from django.db.models import F
+from io import StringIO
+from importlib.util import find_spec
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from django.core.files.move import file_move_safe
+from unittest import skipUnless
+from unittest.mock import patch
+from django.test import override_settings
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+import csv
+import gzip
+import os
+import time
+import json
 
 User = get_user_model()
 
@@ -523,6 +557,56 @@ class CompanyUserTests(TestCase):
         self.assertTrue(CompanyUser.objects.filter(email="alice@example.com").exists())
         self.assertEqual(len(response.json()["users"]), 1)
 
+    def test_upload_company_users_csv_summary(self):
+        """
+        Tests that a CSV upload skips duplicates and invalid rows in bounded queries.
+
+        Verifies:
+        1. Valid new rows are created; duplicates in the file and in the database are skipped
+        2. Invalid rows are rejected with their line numbers
+        3. The number of queries does not grow with the number of rows
+        """
+        CompanyUser.objects.create(
+            org_id=self.org, email="existing@example.com", age=30, first_name="Ex", last_name="Isting",
+            gender="M", location="Delhi", timezone="IST"
+        )
+        rows = [f"User{i},Test,user{i}@example.com,{20 + i},F,Pune,IST" for i in range(50)]
+        rows += [
+            "Dup,Test,user0@example.com,20,F,Pune,IST",
+            "Old,Test,existing@example.com,30,M,Delhi,IST",
+            "Bad,Email,not-an-email,30,M,Delhi,IST",
+            "Bad,Age,badage@example.com,abc,M,Delhi,IST",
+        ]
+        csv_data = "first_name,last_name,email,age,gender,location,timezone\n" + "\n".join(rows) + "\n"
+        file = SimpleUploadedFile("users.csv", csv_data.encode(), content_type="text/csv")
+
+        # Lookup, count, insert, count and the returned users
+        with self.assertNumQueries(5):
+            response = self.client.post(reverse("upload-company-users-csv"), {"file": file})
+
+        self.assertEqual(response.status_code, 201)
+        summary = response.json()["summary"]
+        self.assertEqual((summary["processed"], summary["created"]), (54, 50))
+        self.assertEqual((summary["duplicates"], summary["rejected"]), (2, 2))
+        self.assertEqual([error["line"] for error in summary["errors"]], [54, 55])
+        self.assertEqual(CompanyUser.objects.filter(org_id=self.org).count(), 51)
+        self.assertEqual(len(response.json()["users"]), 50)
+
+    def test_insert_counts_only_written_contacts(self):
+        """
+        Tests that a contact inserted concurrently, after the duplicate lookup, is not counted as created.
+        """
+        contacts = {
+            email: {"email": email, "age": 30, "first_name": "New", "last_name": "Test",
+                    "gender": "F", "location": "Pune", "timezone": "IST"}
+            for email in ("fresh@example.com", "raced@example.com")
+        }
+        CompanyUser.objects.create(org_id=self.org, **contacts["raced@example.com"])
+
+        importer = ContactImporter(self.org.org_id_id, use_copy=False)
+        self.assertEqual(importer.insert_contacts(contacts), 1)
+        self.assertTrue(CompanyUser.objects.filter(email="fresh@example.com").exists())
+
 
 # -------------------------
 # Model Constraints Test Cases
@@ -718,4 +802,2095 @@ class ModelConstraintsTests(TestCase):
             subject="Test Email",
             status="Sent"
         )
-        self.assertTrue(log.pk is not None)
\ No newline at end of file
+        self.assertTrue(log.pk is not None)
+
+# -------------------------
+# Cohort Send Time Test Cases
+# -------------------------
+class CohortSendTimeTests(TestCase):
+    """
+    Test suite for the cohort-level send-time fallback.
+
+    Tests that best click hours are computed per cohort of contacts and that
+    contacts without click history are assigned the hour of their closest cohort.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment before each test.
+
+        Creates:
+        1. A test user with an associated organization and campaign
+        2. Two contacts who clicked at 14:00 UTC
+        3. A cold-start contact sharing their timezone, age band and gender
+        """
+        self.user = User.objects.create_user(username='orguser', email='org@example.com', password='secure123')
+        self.org = Organization.objects.create(
+            org_id=self.user,
+            email_host_user="smtp-user@example.com",
+            email_host_password="smtp-pass",
+        )
+        self.campaign = CampaignDetails.objects.create(
+            org_id=self.org,
+            campaign_name="Campaign",
+            campaign_description="Cohort test",
+            campaign_start_date=now(),
+            campaign_end_date=now(),
+            campaign_mail_subject="Subject",
+            campaign_mail_body="Body",
+            send_time=now()
+        )
+        click_time = now().replace(hour=14, minute=5)
+        for i, location in enumerate(["Delhi", "Mumbai"]):
+            contact = CompanyUser.objects.create(
+                org_id=self.org, email=f"clicker{i}@example.com", first_name="C", last_name="L",
+                age=23 + i, gender="F", location=location, timezone="Asia/Kolkata"
+            )
+            CompanyUserEngagement.objects.create(
+                user_id=contact, campaign_id=self.campaign, org_id=self.org,
+                send_time=click_time, click_time=click_time, engagement_delay=0.0
+            )
+        self.cold_user = CompanyUser.objects.create(
+            org_id=self.org, email="cold@example.com", first_name="N", last_name="U",
+            age=27, gender="F", location="Pune", timezone="Asia/Kolkata"
+        )
+        cache.delete(f"cohort_send_hours_{self.user.user_id}")
+
+    def test_compute_cohort_send_times(self):
+        """
+        Tests that cohorts are stored at every level of specificity.
+
+        Verifies:
+        1. One row per exact cohort plus the coarser fallback levels is stored
+        2. The organization-wide cohort uses the most frequent click hour
+        """
+        stored = compute_cohort_send_times(self.user.user_id)
+
+        # 2 exact cohorts + 1 (timezone, age band, gender) + 1 timezone + 1 org-wide
+        self.assertEqual(stored, 5)
+        org_wide = CohortSendTime.objects.get(org_id=self.org, timezone='', age_band=None, gender='', location='')
+        self.assertEqual(org_wide.send_hour, 14)
+        self.assertEqual(org_wide.clicks, 2)
+
+    def test_cold_start_user_gets_cohort_hour(self):
+        """
+        Tests that a contact without click history is assigned a cohort hour.
+
+        Verifies:
+        1. The cold-start contact falls back to its (timezone, age band, gender) cohort
+        2. A contact matching no cohort attributes falls back to the organization-wide hour
+        """
+        compute_cohort_send_times(self.user.user_id)
+        cohort_hours = load_cohort_send_hours(self.user.user_id)
+
+        self.assertEqual(cohort_send_hour(cohort_hours, self.cold_user), 14)
+        stranger = CompanyUser(age=70, gender="M", location="Oslo", timezone="Europe/Oslo")
+        self.assertEqual(cohort_send_hour(cohort_hours, stranger), 14)
+
+    def test_dispatch_schedules_at_cohort_hour(self):
+        """
+        Tests that dispatch queues a cold-start contact's email for its cohort hour,
+        using the computed send time as the Celery eta rather than the dispatch time.
+        """
+        compute_cohort_send_times(self.user.user_id)
+        # 10:30 IST is 05:00 UTC, leaving the 14:00 UTC cohort hour inside the window
+        self.campaign.send_time = datetime(2099, 1, 1, 10, 30, tzinfo=timezone.utc)
+        self.campaign.campaign_end_date = datetime(2099, 1, 3, 10, 30, tzinfo=timezone.utc)
+        self.campaign.save()
+        cache.set("org_id", self.user.user_id)
+        cache.set("campaign_id", self.campaign.campaign_id)
+
+        with patch('api.views.send_scheduled_email.apply_async') as apply_async:
+            response = self.client.get('/api/sto/')
+
+        self.assertEqual(response.status_code, 200)
+        etas = {call.kwargs['args'][2]: call.kwargs['eta'] for call in apply_async.call_args_list}
+        self.assertEqual(etas["cold@example.com"], datetime(2099, 1, 1, 14, 0, tzinfo=timezone.utc))
+
+
+# -------------------------
+# Local Send Time Test Cases
+# -------------------------
+class LocalSendTimeTests(TestCase):
+    """
+    Test suite for recipient-local send time scheduling.
+
+    Tests that a local wall-clock send time is converted to the correct UTC
+    instant for each recipient's timezone in a single vectorized pass.
+    """
+
+    def test_local_send_times_per_timezone(self):
+        """
+        Tests that 9am local resolves to the right UTC instant per recipient.
+
+        Verifies:
+        1. IANA names and common abbreviations are both resolved
+        2. Daylight saving time is applied for the campaign date
+        3. Unknown or missing timezones fall back to IST
+        """
+        timezones = ["Asia/Kolkata", "America/New_York", "PST", "Europe/London", "Not/AZone", None]
+        instants = to_utc_datetimes(local_send_times(timezones, datetime(2025, 7, 1, 9, 0)))
+
+        self.assertEqual(instants, [
+            datetime(2025, 7, 1, 3, 30, tzinfo=timezone.utc),
+            datetime(2025, 7, 1, 13, 0, tzinfo=timezone.utc),
+            datetime(2025, 7, 1, 16, 0, tzinfo=timezone.utc),
+            datetime(2025, 7, 1, 8, 0, tzinfo=timezone.utc),
+            datetime(2025, 7, 1, 3, 30, tzinfo=timezone.utc),
+            datetime(2025, 7, 1, 3, 30, tzinfo=timezone.utc),
+        ])
+
+    def test_dispatch_sends_at_recipient_local_time(self):
+        """
+        Tests that a local-time campaign queues each email for 9am in the recipient's timezone.
+        """
+        cache.clear()
+        user = User.objects.create_user(username='orguser', email='org@example.com', password='secure123')
+        org = Organization.objects.create(org_id=user, email_host_user="smtp-user@example.com", email_host_password="smtp-pass")
+        campaign = CampaignDetails.objects.create(
+            org_id=org,
+            campaign_name="Local",
+            campaign_description="Local time test",
+            campaign_start_date=datetime(2030, 7, 1, 9, 0, tzinfo=timezone.utc),
+            campaign_end_date=datetime(2030, 7, 2, 9, 0, tzinfo=timezone.utc),
+            campaign_mail_subject="Subject",
+            campaign_mail_body="Body",
+            send_time=datetime(2030, 7, 1, 9, 0, tzinfo=timezone.utc)
+        )
+        for email, tz in [("india@example.com", "Asia/Kolkata"), ("ny@example.com", "America/New_York")]:
+            CompanyUser.objects.create(
+                org_id=org, email=email, age=30, first_name="L", last_name="T",
+                gender="F", location="Pune", timezone=tz
+            )
+        cache.set("org_id", user.user_id)
+        cache.set("campaign_id", campaign.campaign_id)
+
+        with patch('api.views.send_scheduled_email.apply_async') as apply_async:
+            response = self.client.get('/api/sto/', {'local_time': '1'})
+
+        self.assertEqual(response.status_code, 200)
+        etas = {call.kwargs['args'][2]: call.kwargs['eta'] for call in apply_async.call_args_list}
+        self.assertEqual(etas, {
+            "india@example.com": datetime(2030, 7, 1, 3, 30, tzinfo=timezone.utc),
+            "ny@example.com": datetime(2030, 7, 1, 13, 0, tzinfo=timezone.utc),
+        })
+
+
+# -------------------------
+# Optimal Start Time Test Cases
+# -------------------------
+class AutofillTimeTests(TestCase):
+    """
+    Test suite for the optimal start time endpoint.
+
+    Tests that the average open time is computed as a circular mean across
+    midnight and that the cached value is refreshed when new opens arrive.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment before each test.
+
+        Creates:
+        1. A test user with an associated organization, contact and campaign
+        2. Sets the organization ID in the cache for authentication simulation
+        """
+        self.client = Client()
+        self.user = User.objects.create_user(username='orguser', email='org@example.com', password='secure123')
+        self.org = Organization.objects.create(
+            org_id=self.user,
+            email_host_user="smtp-user@example.com",
+            email_host_password="smtp-pass",
+        )
+        self.contact = CompanyUser.objects.create(
+            org_id=self.org, email="reader@example.com", first_name="R", last_name="D",
+            age=30, gender="M", location="Delhi", timezone="Asia/Kolkata"
+        )
+        self.campaign = CampaignDetails.objects.create(
+            org_id=self.org,
+            campaign_name="Campaign",
+            campaign_description="Autofill test",
+            campaign_start_date=now(),
+            campaign_end_date=now(),
+            campaign_mail_subject="Subject",
+            campaign_mail_body="Body",
+            send_time=now()
+        )
+        cache.set("org_id", self.user.user_id)
+        cache.delete(f"optimal_start_time_{self.user.user_id}")
+
+    def add_open(self, hour, minute):
+        """Record an engagement opened at the given UTC time of day"""
+        open_time = datetime(2025, 3, 13, hour, minute, tzinfo=timezone.utc)
+        CompanyUserEngagement.objects.create(
+            user_id=self.contact, campaign_id=self.campaign, org_id=self.org,
+            send_time=open_time, open_time=open_time, engagement_delay=0.0
+        )
+
+    def test_no_opens(self):
+        """
+        Tests that the endpoint returns a 404 when no opens are recorded.
+        """
+        response = self.client.get('/api/optimal-start-time/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_circular_mean_across_midnight(self):
+        """
+        Tests that opens on either side of midnight average to midnight.
+
+        Verifies:
+        1. The API returns a 200 status code
+        2. 23:50 and 00:10 average to 00:00 rather than noon
+        """
+        self.add_open(23, 50)
+        self.add_open(0, 10)
+
+        response = self.client.get('/api/optimal-start-time/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["optimalStartTime"], "00:00")
+
+    def test_new_open_invalidates_cache(self):
+        """
+        Tests that a newly recorded open refreshes the cached optimal start time.
+        """
+        self.add_open(9, 0)
+        self.assertEqual(self.client.get('/api/optimal-start-time/').json()["optimalStartTime"], "09:00")
+
+        self.add_open(11, 0)
+        self.assertEqual(self.client.get('/api/optimal-start-time/').json()["optimalStartTime"], "10:00")
+
+
+# -------------------------
+# Send Time Bandit Test Cases
+# -------------------------
+class SendTimeBanditTests(TestCase):
+    """
+    Test suite for the online send-time bandit.
+
+    Tests that send and open events update the hour-slot counters in place and
+    that sampling favours the hours a contact actually opens at.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment before each test.
+
+        Creates a test user with an associated organization, contact and campaign.
+        """
+        self.client = Client()
+        self.user = User.objects.create_user(username='orguser', email='org@example.com', password='secure123')
+        self.org = Organization.objects.create(
+            org_id=self.user,
+            email_host_user="smtp-user@example.com",
+            email_host_password="smtp-pass",
+        )
+        self.contact = CompanyUser.objects.create(
+            org_id=self.org, email="reader@example.com", first_name="R", last_name="D",
+            age=30, gender="M", location="Delhi", timezone="Asia/Kolkata"
+        )
+        self.campaign = CampaignDetails.objects.create(
+            org_id=self.org,
+            campaign_name="Campaign",
+            campaign_description="Bandit test",
+            campaign_start_date=now(),
+            campaign_end_date=now(),
+            campaign_mail_subject="Subject",
+            campaign_mail_body="Body",
+            send_time=now()
+        )
+
+    def test_events_update_contact_and_org_arms(self):
+        """
+        Tests that sends and opens increment both the contact and the org-wide arm.
+        """
+        record_send(self.user.user_id, self.contact.id, 10)
+        record_send(self.user.user_id, self.contact.id, 10)
+        record_open(self.user.user_id, self.contact.id, 10)
+
+        for arm in SendTimeArm.objects.filter(hour=10):
+            self.assertEqual((arm.sends, arm.opens), (2, 1))
+        self.assertEqual(SendTimeArm.objects.count(), 2)
+
+    def test_track_open_records_success(self):
+        """
+        Tests that the open tracking endpoint credits the hour the email was sent at.
+        """
+        send_time = datetime(2025, 3, 13, 7, 30, tzinfo=timezone.utc)
+        CompanyUserEngagement.objects.create(
+            user_id=self.contact, campaign_id=self.campaign, org_id=self.org,
+            send_time=send_time, engagement_delay=0.0
+        )
+        self.client.get('/api/track-open/', {
+            'email': self.contact.email,
+            'organization': self.user.user_id,
+            'campaign': self.campaign.campaign_id,
+        })
+
+        arm = SendTimeArm.objects.get(user_id=self.contact, hour=7)
+        self.assertEqual(arm.opens, 1)
+
+    def test_sampling_prefers_opened_hour(self):
+        """
+        Tests that Thompson sampling picks the hour with the best open rate.
+        """
+        for hour in range(24):
+            for _ in range(20):
+                record_send(self.user.user_id, self.contact.id, hour)
+        for _ in range(18):
+            record_open(self.user.user_id, self.contact.id, 15)
+
+        hours = sample_send_hours(self.user.user_id, [self.contact.id], rng=np.random.default_rng(0))
+        self.assertEqual(hours, {self.contact.id: 15})
+
+    def test_bandit_dispatch_sends_at_sampled_hour(self):
+        """
+        Tests that the bandit strategy queues each email for the hour sampled for it,
+        so sends (and the arms they update) spread over the explored hours.
+        """
+        # 10:30 IST is 05:00 UTC, leaving the sampled 15:00 UTC inside the window
+        self.campaign.send_time = datetime(2030, 1, 1, 10, 30, tzinfo=timezone.utc)
+        self.campaign.campaign_end_date = datetime(2030, 1, 3, 10, 30, tzinfo=timezone.utc)
+        self.campaign.save()
+        cache.set("org_id", self.user.user_id)
+        cache.set("campaign_id", self.campaign.campaign_id)
+
+        with patch('api.views.sample_send_hours', return_value={self.contact.id: 15}), \
+                patch('api.views.send_scheduled_email.apply_async') as apply_async:
+            response = self.client.get('/api/sto/', {'strategy': 'bandit'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(apply_async.call_args.kwargs['eta'], datetime(2030, 1, 1, 15, 0, tzinfo=timezone.utc))
+
+
+# -------------------------
+# Synthetic Data Test Cases
+# -------------------------
+class SyntheticDataTests(TestCase):
+    """
+    Test suite for the synthetic engagement generator used by the STO benchmark.
+    """
+
+    def test_generate_synthetic_engagement(self):
+        """
+        Tests that the generator command creates the requested dataset.
+
+        Verifies:
+        1. The requested number of contacts and engagements are written
+        2. Some engagements are opened and clicked, and every click is after its open
+        """
+        call_command('generate_synthetic_engagement', contacts=50, campaigns=3, engagements=500, stdout=StringIO())
+
+        org = Organization.objects.get(email_host_user__endswith='@synthetic.example')
+        self.assertEqual(CompanyUser.objects.filter(org_id=org).count(), 50)
+        engagements = CompanyUserEngagement.objects.filter(org_id=org)
+        self.assertEqual(engagements.count(), 500)
+        self.assertTrue(engagements.filter(click_time__isnull=False).exists())
+        self.assertFalse(engagements.filter(click_time__lt=F('open_time')).exists())
+
+    def test_benchmark_times_every_stage(self):
+        """
+        Tests that the benchmark reports every stage, including a stubbed end-to-end dispatch.
+        """
+        call_command('generate_synthetic_engagement', contacts=50, campaigns=3, engagements=500, stdout=StringIO())
+        org = Organization.objects.get(email_host_user__endswith='@synthetic.example')
+
+        out = StringIO()
+        with patch('api.tasks.send_scheduled_email.apply_async') as apply_async:
+            call_command('benchmark_sto', org.org_id_id, stdout=out)
+        apply_async.assert_not_called()
+        for stage in ("train: cohort send times", "schedule: local send times", "dispatch: send_time_optim"):
+            self.assertIn(stage, out.getvalue())
+
+
+# -------------------------
+# Send Time Retraining Test Cases
+# -------------------------
+class RetrainSendTimesTests(TestCase):
+    """
+    Test suite for per-organization send-time retraining.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment before each test.
+
+        Creates an organization with one contact who clicked twice at 08:00 UTC
+        and once at 19:00 UTC.
+        """
+        self.user = User.objects.create_user(username='orguser', email='org@example.com', password='secure123')
+        self.org = Organization.objects.create(
+            org_id=self.user,
+            email_host_user="smtp-user@example.com",
+            email_host_password="smtp-pass",
+        )
+        self.contact = CompanyUser.objects.create(
+            org_id=self.org, email="reader@example.com", first_name="R", last_name="D",
+            age=30, gender="M", location="Delhi", timezone="Asia/Kolkata"
+        )
+        campaign = CampaignDetails.objects.create(
+            org_id=self.org,
+            campaign_name="Campaign",
+            campaign_description="Retraining test",
+            campaign_start_date=now(),
+            campaign_end_date=now(),
+            campaign_mail_subject="Subject",
+            campaign_mail_body="Body",
+            send_time=now()
+        )
+        self.campaign = campaign
+        for hour in (8, 8, 19):
+            self.add_click(self.contact, datetime(2025, 3, 13, hour, 15, tzinfo=timezone.utc))
+
+    def add_click(self, contact, click_time):
+        """Record an engagement clicked at the given time"""
+        CompanyUserEngagement.objects.create(
+            user_id=contact, campaign_id=self.campaign, org_id=self.org,
+            send_time=click_time, click_time=click_time, engagement_delay=0.0
+        )
+
+    def test_retrain_sto_command(self):
+        """
+        Tests that the retraining command stores each contact's best click hour.
+
+        Verifies:
+        1. The contact's hourly click counts and send hour are stored
+        2. Retraining again replaces rather than duplicates the stored rows
+        """
+        call_command('retrain_sto', workers=1, stdout=StringIO())
+        call_command('retrain_sto', workers=1, stdout=StringIO())
+
+        send_time = UserSendTime.objects.get(user_id=self.contact)
+        self.assertEqual(send_time.send_hour, 8)
+        self.assertEqual(send_time.clicks, 3)
+        self.assertEqual(send_time.hour_counts[19], 1)
+        self.assertEqual(UserSendTime.objects.count(), 1)
+
+    def test_incremental_refresh_reads_only_new_clicks(self):
+        """
+        Tests that an incremental refresh folds in clicks past each contact's watermark.
+
+        Verifies:
+        1. New clicks move the contact's send hour and advance its watermark
+        2. A contact without stored state gets one
+        3. Refreshing again without new clicks changes nothing
+        """
+        call_command('retrain_sto', workers=1, stdout=StringIO())
+        newcomer = CompanyUser.objects.create(
+            org_id=self.org, email="newcomer@example.com", first_name="N", last_name="C",
+            age=41, gender="F", location="Pune", timezone="Asia/Kolkata"
+        )
+        self.add_click(self.contact, datetime(2025, 3, 14, 19, 5, tzinfo=timezone.utc))
+        self.add_click(self.contact, datetime(2025, 3, 15, 19, 5, tzinfo=timezone.utc))
+        self.add_click(newcomer, datetime(2025, 3, 15, 6, 0, tzinfo=timezone.utc))
+
+        for _ in range(2):
+            call_command('retrain_sto', workers=1, incremental=True, stdout=StringIO())
+
+            send_time = UserSendTime.objects.get(user_id=self.contact)
+            self.assertEqual(send_time.send_hour, 19)
+            self.assertEqual(send_time.clicks, 5)
+            self.assertEqual(send_time.watermark, datetime(2025, 3, 15, 19, 5, tzinfo=timezone.utc))
+            self.assertEqual(UserSendTime.objects.get(user_id=newcomer).send_hour, 6)
+
+
+class RetrainProcessPoolTests(TransactionTestCase):
+    """
+    Test suite for retraining organizations across a process pool.
+
+    Uses committed data so the pool's worker processes, which open their own
+    database connections, can read it.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment before each test.
+
+        Creates two organizations, each with one contact who clicked at 08:00 UTC.
+        """
+        self.org_ids = []
+        for i in range(2):
+            user = User.objects.create_user(username=f'orguser{i}', email=f'org{i}@example.com', password='secure123')
+            org = Organization.objects.create(org_id=user, email_host_user=f"smtp{i}@example.com", email_host_password="smtp-pass")
+            contact = CompanyUser.objects.create(
+                org_id=org, email=f"reader{i}@example.com", first_name="R", last_name="D",
+                age=30, gender="M", location="Delhi", timezone="Asia/Kolkata"
+            )
+            campaign = CampaignDetails.objects.create(
+                org_id=org,
+                campaign_name="Campaign",
+                campaign_description="Pool test",
+                campaign_start_date=now(),
+                campaign_end_date=now(),
+                campaign_mail_subject="Subject",
+                campaign_mail_body="Body",
+                send_time=now()
+            )
+            click_time = datetime(2025, 3, 13, 8, 15, tzinfo=timezone.utc)
+            CompanyUserEngagement.objects.create(
+                user_id=contact, campaign_id=campaign, org_id=org,
+                send_time=click_time, click_time=click_time, engagement_delay=0.0
+            )
+            self.org_ids.append(user.user_id)
+
+    def test_retrain_across_process_pool(self):
+        """
+        Tests that each organization is retrained in a pool worker and reported back.
+        """
+        with patch('api.retraining.ProcessPoolExecutor', wraps=ProcessPoolExecutor) as pool:
+            results = list(retrain_organizations(workers=2))
+
+        pool.assert_called_once()
+        self.assertEqual(sorted(results), sorted((org_id, 1) for org_id in self.org_ids))
+
+
+# -------------------------
+# Chart Data Test Cases
+# -------------------------
+class ChartDataTests(TestCase):
+    """
+    Test suite for the dashboard chart data endpoint.
+
+    Tests that chart rows are loaded with a single joined query, served from
+    the cache afterwards, and refreshed when campaign statistics change.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment before each test.
+
+        Creates an organization with three campaigns and their statistics and
+        sets the organization ID in the cache.
+        """
+        self.client = Client()
+        self.user = User.objects.create_user(username='orguser', email='org@example.com', password='secure123')
+        self.org = Organization.objects.create(
+            org_id=self.user,
+            email_host_user="smtp-user@example.com",
+            email_host_password="smtp-pass",
+        )
+        for i in range(3):
+            campaign = CampaignDetails.objects.create(
+                org_id=self.org,
+                campaign_name=f"Campaign {i}",
+                campaign_description="Chart test",
+                campaign_start_date=now(),
+                campaign_end_date=now(),
+                campaign_mail_subject="Subject",
+                campaign_mail_body="Body",
+                send_time=now()
+            )
+            self.stat = CampaignStatistics.objects.create(
+                campaign_id=campaign, org_id=self.org,
+                user_click_rate=0.1 * i, user_open_rate=0.2 * i, user_engagement_delay=10.0 * i
+            )
+        cache.set("org_id", self.user.user_id)
+        cache.delete(f"chart_data_{self.user.user_id}")
+
+    def test_chart_data_single_query_then_cached(self):
+        """
+        Tests that chart data costs one query regardless of campaign count, then none.
+
+        Verifies:
+        1. The first request runs a single joined query
+        2. Every campaign is returned with its name and rates
+        3. A repeated request is answered from the cache
+        """
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/get_chart_data/')
+        self.assertEqual(response.status_code, 200)
+        chart_data = response.json()['chart_data']
+        self.assertEqual(sorted(row['campaignName'] for row in chart_data), ["Campaign 0", "Campaign 1", "Campaign 2"])
+        self.assertEqual(set(chart_data[0]), {
+            'id', 'campaignName', 'start_date', 'clickRate', 'openRate', 'engagementDelay', 'campaignId'
+        })
+
+        with self.assertNumQueries(0):
+            self.client.get('/api/get_chart_data/')
+
+    def test_stats_change_invalidates_cache(self):
+        """
+        Tests that saving campaign statistics refreshes the cached chart data.
+        """
+        self.client.get('/api/get_chart_data/')
+        self.stat.user_click_rate = 0.9
+        self.stat.save()
+
+        chart_data = self.client.get('/api/get_chart_data/').json()['chart_data']
+        self.assertIn(0.9, [row['clickRate'] for row in chart_data])
+
+
+# -------------------------
+# Dashboard Summary Test Cases
+# -------------------------
+class DashboardSummaryTests(TestCase):
+    """
+    Test suite for the per-organization dashboard summary snapshot.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment before each test.
+
+        Creates an organization with three campaigns started on consecutive days
+        and sets the organization ID in the cache.
+        """
+        self.client = Client()
+        self.user = User.objects.create_user(username='orguser', email='org@example.com', password='secure123')
+        self.org = Organization.objects.create(
+            org_id=self.user,
+            email_host_user="smtp-user@example.com",
+            email_host_password="smtp-pass",
+        )
+        for day, open_rate in enumerate([0.2, 0.4, 0.6], start=1):
+            campaign = CampaignDetails.objects.create(
+                org_id=self.org,
+                campaign_name=f"Day {day}",
+                campaign_description="Summary test",
+                campaign_start_date=datetime(2025, 3, day, tzinfo=timezone.utc),
+                campaign_end_date=datetime(2025, 3, day + 1, tzinfo=timezone.utc),
+                campaign_mail_subject="Subject",
+                campaign_mail_body="Body",
+                send_time=datetime(2025, 3, day, tzinfo=timezone.utc)
+            )
+            CampaignStatistics.objects.create(
+                campaign_id=campaign, org_id=self.org,
+                user_click_rate=open_rate / 2, user_open_rate=open_rate, user_engagement_delay=60.0
+            )
+        cache.set("org_id", self.user.user_id)
+        cache.delete_many([f"chart_data_{self.user.user_id}", f"dashboard_summary_{self.user.user_id}"])
+
+    def test_summary_snapshot(self):
+        """
+        Tests the summary document and that repeat loads are a single cache lookup.
+
+        Verifies:
+        1. Totals, recent campaigns and top campaigns are computed
+        2. The trend compares the latest campaign with the earlier ones
+        3. A repeated request does not touch the database
+        """
+        response = self.client.get(reverse('dashboard-summary'))
+        self.assertEqual(response.status_code, 200)
+        summary = response.json()['summary']
+
+        self.assertEqual(summary['totals']['campaigns'], 3)
+        self.assertAlmostEqual(summary['totals']['avgOpenRate'], 0.4)
+        self.assertEqual(summary['recentCampaigns'][0]['campaign_name'], "Day 3")
+        self.assertEqual(summary['topByOpenRate'][0]['campaignName'], "Day 3")
+        self.assertAlmostEqual(summary['trend']['openRate'], 0.3)
+
+        with self.assertNumQueries(0):
+            self.client.get(reverse('dashboard-summary'))
+
+    def test_new_campaign_refreshes_summary(self):
+        """
+        Tests that creating a campaign refreshes the cached summary.
+        """
+        self.client.get(reverse('dashboard-summary'))
+        CampaignDetails.objects.create(
+            org_id=self.org,
+            campaign_name="Day 4",
+            campaign_description="Summary test",
+            campaign_start_date=datetime(2025, 3, 4, tzinfo=timezone.utc),
+            campaign_end_date=datetime(2025, 3, 5, tzinfo=timezone.utc),
+            campaign_mail_subject="Subject",
+            campaign_mail_body="Body",
+            send_time=datetime(2025, 3, 4, tzinfo=timezone.utc)
+        )
+
+        summary = self.client.get(reverse('dashboard-summary')).json()['summary']
+        self.assertEqual(summary['totals']['campaigns'], 4)
+        self.assertEqual(summary['recentCampaigns'][0]['campaign_name'], "Day 4")
+
+
+# -------------------------
+# Listing Pagination Test Cases
+# -------------------------
+class ListingPaginationTests(TestCase):
+    """
+    Test suite for the keyset-paginated contact and campaign listings.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment before each test.
+
+        Creates an organization with five contacts and three campaigns and sets
+        the organization ID in the cache.
+        """
+        self.client = Client()
+        self.user = User.objects.create_user(username='orguser', email='org@example.com', password='secure123')
+        self.org = Organization.objects.create(
+            org_id=self.user,
+            email_host_user="smtp-user@example.com",
+            email_host_password="smtp-pass",
+        )
+        for i, age in enumerate([30, 25, 30, 40, 22]):
+            CompanyUser.objects.create(
+                org_id=self.org, email=f"c{i}@example.com", age=age, first_name=f"C{i}", last_name="Test",
+                gender="F" if i % 2 else "M", location="Delhi", timezone="Asia/Kolkata"
+            )
+        for day in range(1, 4):
+            CampaignDetails.objects.create(
+                org_id=self.org,
+                campaign_name=f"Campaign {day}",
+                campaign_description="Pagination test",
+                campaign_start_date=datetime(2025, 3, day, tzinfo=timezone.utc),
+                campaign_end_date=datetime(2025, 3, day + 1, tzinfo=timezone.utc),
+                campaign_mail_subject="Subject",
+                campaign_mail_body="Body",
+                send_time=datetime(2025, 3, day, tzinfo=timezone.utc)
+            )
+        cache.set("org_id", self.user.user_id)
+
+    def fetch_all(self, url, key, params):
+        """Follow next_cursor until the listing is exhausted; returns every page"""
+        pages, cursor = [], None
+        while True:
+            query = dict(params, cursor=cursor) if cursor else params
+            response = self.client.get(url, query)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.json()[key])
+            cursor = response.json()['next_cursor']
+            if cursor is None:
+                return pages
+
+    def test_company_users_sorted_pages(self):
+        """
+        Tests paging contacts by a non-unique sort key.
+
+        Verifies:
+        1. Pages are bounded by the limit
+        2. Rows with equal ages are neither repeated nor skipped across pages
+        3. Only the requested fields are returned
+        """
+        pages = self.fetch_all('/api/get-company-users/', 'company_users', {'limit': 2, 'sort': '-age', 'fields': 'email,age'})
+
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        rows = [row for page in pages for row in page]
+        self.assertEqual([row['age'] for row in rows], [40, 30, 30, 25, 22])
+        self.assertEqual(len({row['email'] for row in rows}), 5)
+        self.assertEqual(set(rows[0]), {'email', 'age'})
+
+    def test_company_users_filters(self):
+        """
+        Tests server-side filters and parameter validation.
+        """
+        response = self.client.get('/api/get-company-users/', {'gender': 'M', 'min_age': 25})
+        self.assertEqual(sorted(row['age'] for row in response.json()['company_users']), [30, 30])
+        self.assertIsNone(response.json()['next_cursor'])
+
+        self.assertEqual(self.client.get('/api/get-company-users/', {'fields': 'password'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/get-company-users/', {'cursor': 'garbage'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/get-company-users/', {'joined_after': 'abc'}).status_code, 400)
+        bad_date_cursor = encode_cursor(['not-a-date', 1])
+        response = self.client.get('/api/get-company-users/', {'sort': 'date_joined', 'cursor': bad_date_cursor})
+        self.assertEqual(response.status_code, 400)
+
+    def test_campaigns_pages(self):
+        """
+        Tests paging campaigns by start date with a name filter.
+        """
+        pages = self.fetch_all('/api/campaigns/', 'campaigns', {'limit': 2, 'sort': '-campaign_start_date'})
+        names = [row['campaign_name'] for page in pages for row in page]
+        self.assertEqual(names, ["Campaign 3", "Campaign 2", "Campaign 1"])
+
+        response = self.client.get('/api/campaigns/', {'name': 'campaign 2'})
+        self.assertEqual([row['campaign_name'] for row in response.json()['campaigns']], ["Campaign 2"])
+
+
+# -------------------------
+# Engagement Export Test Cases
+# -------------------------
+class EngagementExportTests(TestCase):
+    """
+    Test suite for the streaming engagement export endpoint and command.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment before each test.
+
+        Creates an organization with two campaigns, one contact and three
+        engagements, one of them opened and clicked.
+        """
+        self.client = Client()
+        self.user = User.objects.create_user(username='orguser', email='org@example.com', password='secure123')
+        self.org = Organization.objects.create(
+            org_id=self.user,
+            email_host_user="smtp-user@example.com",
+            email_host_password="smtp-pass",
+        )
+        contact = CompanyUser.objects.create(
+            org_id=self.org, email="c@example.com", age=30, first_name="C", last_name="Test",
+            gender="F", location="Delhi", timezone="Asia/Kolkata"
+        )
+        self.campaigns = [
+            CampaignDetails.objects.create(
+                org_id=self.org,
+                campaign_name=f"Campaign {day}",
+                campaign_description="Export test",
+                campaign_start_date=datetime(2025, 3, day, tzinfo=timezone.utc),
+                campaign_end_date=datetime(2025, 3, day + 1, tzinfo=timezone.utc),
+                campaign_mail_subject="Subject",
+                campaign_mail_body="Body",
+                send_time=datetime(2025, 3, day, tzinfo=timezone.utc)
+            )
+            for day in (1, 2)
+        ]
+        sent = datetime(2025, 3, 1, 9, tzinfo=timezone.utc)
+        CompanyUserEngagement.objects.create(
+            user_id=contact, campaign_id=self.campaigns[0], org_id=self.org, send_time=sent,
+            open_time=sent.replace(minute=5), click_time=sent.replace(minute=10), engagement_delay=600.0
+        )
+        for campaign in self.campaigns:
+            CompanyUserEngagement.objects.create(
+                user_id=contact, campaign_id=campaign, org_id=self.org, send_time=sent, engagement_delay=0.0
+            )
+        cache.set("org_id", self.user.user_id)
+
+    def test_export_ndjson(self):
+        """
+        Tests the NDJSON export of one campaign.
+
+        Verifies:
+        1. The response is streamed as an attachment
+        2. Only the campaign's rows are exported, with timestamps in ISO format
+        """
+        response = self.client.get(reverse('export-engagements'), {'campaign_id': self.campaigns[0].campaign_id})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment', response['Content-Disposition'])
+
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['click_time'], "2025-03-01T09:10:00+00:00")
+        self.assertIsNone(rows[1]['open_time'])
+
+    def test_export_csv(self):
+        """
+        Tests the CSV export of the whole organization and parameter validation.
+        """
+        response = self.client.get(reverse('export-engagements'), {'format': 'csv'})
+        rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1]['click_time'], '')
+
+        self.assertEqual(self.client.get(reverse('export-engagements'), {'format': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('export-engagements'), {'campaign_id': 999}).status_code, 404)
+
+    def test_export_command(self):
+        """
+        Tests that the management command writes the same rows to stdout.
+        """
+        out = StringIO()
+        call_command('export_engagements', self.user.user_id, format='csv', chunk_size=1, stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 4)
+
+
+# -------------------------
+# Campaign Funnel Test Cases
+# -------------------------
+class CampaignFunnelTests(TestCase):
+    """
+    Test suite for the per-campaign send -> open -> click funnel.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment before each test.
+
+        Creates a campaign sent to four contacts: two opened (after 2 and 30
+        minutes), one of them clicked 10 minutes after the send.
+        """
+        self.client = Client()
+        self.user = User.objects.create_user(username='orguser', email='org@example.com', password='secure123')
+        self.org = Organization.objects.create(
+            org_id=self.user,
+            email_host_user="smtp-user@example.com",
+            email_host_password="smtp-pass",
+        )
+        self.campaign = CampaignDetails.objects.create(
+            org_id=self.org,
+            campaign_name="Funnel",
+            campaign_description="Funnel test",
+            campaign_start_date=datetime(2025, 3, 1, tzinfo=timezone.utc),
+            campaign_end_date=datetime(2025, 3, 2, tzinfo=timezone.utc),
+            campaign_mail_subject="Subject",
+            campaign_mail_body="Body",
+            send_time=datetime(2025, 3, 1, tzinfo=timezone.utc)
+        )
+        sent = datetime(2025, 3, 1, 9, tzinfo=timezone.utc)
+        events = [(2, 10), (30, None), (None, None), (None, None)]
+        for i, (open_after, click_after) in enumerate(events):
+            contact = CompanyUser.objects.create(
+                org_id=self.org, email=f"c{i}@example.com", age=25 + i * 10, first_name=f"C{i}", last_name="Test",
+                gender="F" if i % 2 else "M", location="Delhi", timezone="Asia/Kolkata"
+            )
+            CompanyUserEngagement.objects.create(
+                user_id=contact, campaign_id=self.campaign, org_id=self.org, send_time=sent,
+                open_time=sent + timedelta(minutes=open_after) if open_after is not None else None,
+                click_time=sent + timedelta(minutes=click_after) if click_after is not None else None,
+                engagement_delay=0.0
+            )
+        cache.set("org_id", self.user.user_id)
+        cache.delete(f"campaign_funnel_{self.campaign.campaign_id}")
+
+    def test_funnel(self):
+        """
+        Tests the funnel stages, delay distributions and segments.
+
+        Verifies:
+        1. Stage counts and conversion rates
+        2. Time-to-open percentiles and histogram buckets
+        3. Per-gender breakdown
+        4. A repeated request is served from the cache
+        """
+        response = self.client.get(reverse('campaign-funnel'), {'campaign_id': self.campaign.campaign_id})
+        self.assertEqual(response.status_code, 200)
+        funnel = response.json()['funnel']
+
+        self.assertEqual((funnel['stages']['sent'], funnel['stages']['opened'], funnel['stages']['clicked']), (4, 2, 1))
+        self.assertAlmostEqual(funnel['stages']['clickToOpenRate'], 0.5)
+
+        self.assertEqual(funnel['timeToOpen']['percentiles']['p50'], 120.0)
+        self.assertEqual(funnel['timeToOpen']['percentiles']['p90'], 1800.0)
+        counts = {bucket['to']: bucket['count'] for bucket in funnel['timeToOpen']['histogram']}
+        self.assertEqual((counts[300], counts[3600]), (1, 1))
+        self.assertEqual(funnel['timeToClick']['percentiles']['p50'], 600.0)
+
+        genders = {row['segment']: row for row in funnel['segments']['gender']}
+        self.assertEqual((genders['M']['sent'], genders['M']['clicked']), (2, 1))
+        self.assertEqual([row['segment'] for row in funnel['segments']['age_band']], [20, 30, 40, 50])
+
+        with self.assertNumQueries(1):
+            self.client.get(reverse('campaign-funnel'), {'campaign_id': self.campaign.campaign_id})
+
+    def test_funnel_invalidated_by_new_engagement(self):
+        """
+        Tests that recording an open refreshes the cached funnel.
+        """
+        self.client.get(reverse('campaign-funnel'), {'campaign_id': self.campaign.campaign_id})
+        engagement = CompanyUserEngagement.objects.filter(open_time__isnull=True).first()
+        engagement.open_time = engagement.send_time + timedelta(hours=2)
+        engagement.save()
+
+        funnel = self.client.get(reverse('campaign-funnel'), {'campaign_id': self.campaign.campaign_id}).json()['funnel']
+        self.assertEqual(funnel['stages']['opened'], 3)
+        self.assertEqual(self.client.get(reverse('campaign-funnel'), {'campaign_id': 999}).status_code, 404)
+
+    def test_funnel_expires_after_missed_invalidation(self):
+        """
+        Tests that a funnel left stale by a change that bypassed the signals expires.
+        """
+        self.client.get(reverse('campaign-funnel'), {'campaign_id': self.campaign.campaign_id})
+        CompanyUserEngagement.objects.filter(open_time__isnull=True).update(open_time=F('send_time'))
+
+        later = time.time() + FUNNEL_CACHE_TIMEOUT + 1
+        with patch('django.core.cache.backends.locmem.time.time', return_value=later):
+            cache.set("org_id", self.user.user_id)
+            funnel = self.client.get(reverse('campaign-funnel'), {'campaign_id': self.campaign.campaign_id}).json()['funnel']
+        self.assertEqual(funnel['stages']['opened'], 4)
+
+
+# -------------------------
+# Conditional GET Test Cases
+# -------------------------
+class ConditionalGetTests(TestCase):
+    """
+    Test suite for ETag revalidation of the campaign endpoints.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment before each test.
+
+        Creates an organization with one campaign and its statistics.
+        """
+        self.client = Client()
+        self.user = User.objects.create_user(username='orguser', email='org@example.com', password='secure123')
+        self.org = Organization.objects.create(
+            org_id=self.user,
+            email_host_user="smtp-user@example.com",
+            email_host_password="smtp-pass",
+        )
+        self.campaign = CampaignDetails.objects.create(
+            org_id=self.org,
+            campaign_name="Polled",
+            campaign_description="ETag test",
+            campaign_start_date=datetime(2025, 3, 1, tzinfo=timezone.utc),
+            campaign_end_date=datetime(2025, 3, 2, tzinfo=timezone.utc),
+            campaign_mail_subject="Subject",
+            campaign_mail_body="Body",
+            send_time=datetime(2025, 3, 1, tzinfo=timezone.utc)
+        )
+        self.stats = CampaignStatistics.objects.create(
+            campaign_id=self.campaign, org_id=self.org,
+            user_click_rate=0.1, user_open_rate=0.3, user_engagement_delay=60.0
+        )
+        cache.set("org_id", self.user.user_id)
+
+    def test_not_modified_without_queries(self):
+        """
+        Tests that a matching If-None-Match is answered with 304 before the view runs.
+
+        Verifies:
+        1. Each endpoint emits an ETag
+        2. Revalidating with it returns 304 without any database query
+        """
+        urls = [
+            '/api/campaigns/',
+            f'/api/get-campaign-details/?campaign_id={self.campaign.campaign_id}',
+            '/api/get_chart_data/',
+        ]
+        for url in urls:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.has_header('ETag'))
+
+            with self.assertNumQueries(0):
+                revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(revalidated.status_code, 304)
+
+    def test_etag_changes_with_data(self):
+        """
+        Tests that updating campaign statistics changes the ETag.
+        """
+        etag = self.client.get('/api/get_chart_data/')['ETag']
+        self.stats.user_open_rate = 0.5
+        self.stats.save()
+
+        response = self.client.get('/api/get_chart_data/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['chart_data'][0]['openRate'], 0.5)
+
+
+# -------------------------
+# Parquet Snapshot Test Cases
+# -------------------------
+@skipUnless(find_spec('pyarrow'), "pyarrow is not installed")
+class ParquetSnapshotTests(TestCase):
+    """
+    Test suite for the partitioned Parquet snapshot command.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment before each test.
+
+        Creates one contact and campaign with engagements sent in two different months.
+        """
+        self.user = User.objects.create_user(username='orguser', email='org@example.com', password='secure123')
+        self.org = Organization.objects.create(
+            org_id=self.user,
+            email_host_user="smtp-user@example.com",
+            email_host_password="smtp-pass",
+        )
+        contact = CompanyUser.objects.create(
+            org_id=self.org, email="c@example.com", age=30, first_name="C", last_name="Test",
+            gender="F", location="Delhi", timezone="Asia/Kolkata"
+        )
+        campaign = CampaignDetails.objects.create(
+            org_id=self.org,
+            campaign_name="Snapshot",
+            campaign_description="Parquet test",
+            campaign_start_date=datetime(2025, 3, 1, tzinfo=timezone.utc),
+            campaign_end_date=datetime(2025, 4, 2, tzinfo=timezone.utc),
+            campaign_mail_subject="Subject",
+            campaign_mail_body="Body",
+            send_time=datetime(2025, 3, 1, tzinfo=timezone.utc)
+        )
+        for month, day in [(3, 1), (3, 31), (4, 1)]:
+            CompanyUserEngagement.objects.create(
+                user_id=contact, campaign_id=campaign, org_id=self.org,
+                send_time=datetime(2025, month, day, 9, tzinfo=timezone.utc), engagement_delay=0.0
+            )
+
+    def test_export_parquet(self):
+        """
+        Tests the engagement snapshot.
+
+        Verifies:
+        1. One file is written per organization and month
+        2. Row groups are capped at the requested size
+        3. The files read back with the original rows
+        """
+        import pyarrow.parquet as pq
+
+        with TemporaryDirectory() as output_dir:
+            call_command('export_parquet', output_dir, tables=['company_user_engagement'], row_group_size=1, stdout=StringIO())
+
+            partition = Path(output_dir, 'company_user_engagement', f'org_id={self.user.user_id}')
+            self.assertEqual(sorted(path.name for path in partition.iterdir()), ['month=2025-03', 'month=2025-04'])
+
+            march = pq.ParquetFile(partition / 'month=2025-03' / 'part-0.parquet')
+            self.assertEqual(march.metadata.num_row_groups, 2)
+            table = march.read()
+            self.assertEqual(table.num_rows, 2)
+            self.assertEqual(table.column('send_time')[1].as_py(), datetime(2025, 3, 31, 9, tzinfo=timezone.utc))
+
+    def test_snapshot_reads_as_hive_dataset(self):
+        """
+        Tests reading a whole table snapshot as a Hive-partitioned dataset.
+
+        Verifies:
+        1. pyarrow and pandas read the directory with org_id and month from the paths
+        2. A rerun removes partitions that no longer have rows
+        """
+        import pyarrow.dataset as ds
+        from api.snapshots import snapshot_table
+
+        with TemporaryDirectory() as output_dir:
+            table_dir = Path(output_dir, 'company_user_engagement')
+            snapshot_table('company_user_engagement', output_dir)
+
+            table = ds.dataset(table_dir, partitioning='hive').to_table()
+            self.assertEqual(table.num_rows, 3)
+            self.assertEqual(set(table.column('org_id').to_pylist()), {self.user.user_id})
+            self.assertEqual(sorted(pd.read_parquet(table_dir)['month'].astype(str)), ['2025-03', '2025-03', '2025-04'])
+
+            CompanyUserEngagement.objects.filter(send_time__month=4).delete()
+            snapshot_table('company_user_engagement', output_dir)
+            partition = table_dir / f'org_id={self.user.user_id}'
+            self.assertEqual([path.name for path in partition.iterdir()], ['month=2025-03'])
+            self.assertEqual(ds.dataset(table_dir, partitioning='hive').to_table().num_rows, 2)
+
+    def test_failed_export_keeps_published_partition(self):
+        """
+        Tests that a stream failing mid-partition leaves the previous file intact and no temp file behind.
+        """
+        import pyarrow.parquet as pq
+        from api.snapshots import PartitionWriter, snapshot_table
+
+        with TemporaryDirectory() as output_dir:
+            snapshot_table('company_user_engagement', output_dir)
+            write = PartitionWriter.write
+            calls = []
+
+            def fail_on_second_row(writer, partition, row):
+                calls.append(row)
+                if len(calls) == 2:
+                    raise RuntimeError("connection lost")
+                write(writer, partition, row)
+
+            with patch.object(PartitionWriter, 'write', fail_on_second_row):
+                with self.assertRaises(RuntimeError):
+                    snapshot_table('company_user_engagement', output_dir)
+
+            march = Path(output_dir, 'company_user_engagement', f'org_id={self.user.user_id}', 'month=2025-03')
+            self.assertEqual([path.name for path in march.iterdir()], ['part-0.parquet'])
+            self.assertEqual(pq.read_table(march / 'part-0.parquet').num_rows, 2)
+
+
+# -------------------------
+# Engagement Delay Sketch Test Cases
+# -------------------------
+class EngagementDelaySketchTests(TestCase):
+    """
+    Test suite for the per-campaign engagement delay quantile sketch.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment before each test.
+
+        Creates an organization, a contact and a campaign.
+        """
+        self.client = Client()
+        self.user = User.objects.create_user(username='orguser', email='org@example.com', password='secure123')
+        self.org = Organization.objects.create(
+            org_id=self.user,
+            email_host_user="smtp-user@example.com",
+            email_host_password="smtp-pass",
+        )
+        self.contact = CompanyUser.objects.create(
+            org_id=self.org, email="c@example.com", age=30, first_name="C", last_name="Test",
+            gender="F", location="Delhi", timezone="Asia/Kolkata"
+        )
+        self.campaign = CampaignDetails.objects.create(
+            org_id=self.org,
+            campaign_name="Sketch",
+            campaign_description="Sketch test",
+            campaign_start_date=datetime(2025, 3, 1, tzinfo=timezone.utc),
+            campaign_end_date=datetime(2025, 3, 2, tzinfo=timezone.utc),
+            campaign_mail_subject="Subject",
+            campaign_mail_body="Body",
+            send_time=datetime(2025, 3, 1, tzinfo=timezone.utc)
+        )
+        cache.set("org_id", self.user.user_id)
+
+    def test_sketch_accuracy(self):
+        """
+        Tests that quantiles stay within the relative accuracy and that sketches merge.
+        """
+        rng = np.random.default_rng(0)
+        delays = rng.lognormal(6, 1.5, 10000)
+        first, second = DelaySketch(), DelaySketch()
+        for i, delay in enumerate(delays):
+            (first if i % 2 else second).add(delay)
+        merged = first.merge(second)
+
+        self.assertEqual(merged.total, len(delays))
+        for q in (0.5, 0.9, 0.99):
+            self.assertAlmostEqual(merged.quantile(q) / np.quantile(delays, q, method='lower'), 1, delta=0.011)
+        self.assertIsNone(DelaySketch().quantile(0.5))
+
+    def test_click_updates_sketch(self):
+        """
+        Tests that tracked clicks feed the campaign sketch shown in its details.
+
+        Verifies:
+        1. Each click increments a bucket of the campaign
+        2. The campaign details report the delay percentiles
+        3. Rebuilding from the stored clicks gives the same sketch
+        """
+        for minutes in (5, 10, 60):
+            CompanyUserEngagement.objects.create(
+                user_id=self.contact, campaign_id=self.campaign, org_id=self.org,
+                send_time=now() - timedelta(minutes=minutes), engagement_delay=0.0
+            )
+            self.client.get(reverse('track-email-click'), {
+                'email': self.contact.email,
+                'organization': self.user.user_id,
+                'campaign': self.campaign.campaign_id,
+            })
+
+        sketch = load_delay_sketch(self.campaign.campaign_id)
+        self.assertEqual(sketch.total, 3)
+
+        response = self.client.get('/api/get-campaign-details/', {'campaign_id': self.campaign.campaign_id})
+        percentiles = response.json()['engagement_delay_percentiles']
+        self.assertAlmostEqual(percentiles['p50'], 600, delta=600 * 0.011)
+        self.assertEqual(set(percentiles), {'p50', 'p90', 'p99'})
+        self.assertAlmostEqual(sketch.quantile(1), 3600, delta=3600 * 0.011)
+
+        rebuild_delay_sketch(self.user.user_id, self.campaign.campaign_id)
+        self.assertEqual(load_delay_sketch(self.campaign.campaign_id).counts, sketch.counts)
+
+
+# -------------------------
+# Contact Import Job Test Cases
+# -------------------------
+class ContactImportJobTests(TestCase):
+    """
+    Test suite for background contact CSV imports.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment before each test.
+
+        Creates an organization, points uploads at a temporary directory and
+        builds a CSV of 12 contacts, one of them invalid.
+        """
+        self.client = Client()
+        self.user = User.objects.create_user(username='orguser', email='org@example.com', password='secure123')
+        self.org = Organization.objects.create(
+            org_id=self.user,
+            email_host_user="smtp-user@example.com",
+            email_host_password="smtp-pass",
+        )
+        cache.set("org_id", self.user.user_id)
+
+        self.import_dir = TemporaryDirectory()
+        self.addCleanup(self.import_dir.cleanup)
+        self.settings_override = override_settings(CONTACT_IMPORT_DIR=self.import_dir.name)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        rows = [f"User{i},Test,job{i}@example.com,{20 + i},F,Pune,IST" for i in range(11)]
+        rows.insert(5, "Bad,Row,not-an-email,30,M,Delhi,IST")
+        self.csv_data = ("first_name,last_name,email,age,gender,location,timezone\n" + "\n".join(rows) + "\n").encode()
+
+    def upload(self):
+        file = SimpleUploadedFile("contacts.csv", self.csv_data, content_type="text/csv")
+        with patch('api.views.import_contacts.delay') as delay:
+            response = self.client.post(reverse("upload-company-users-csv") + "?async=1", {"file": file})
+        self.assertEqual(response.status_code, 202)
+        delay.assert_called_once()
+        return ContactImportJob.objects.get(id=response.json()["job"]["id"])
+
+    def test_import_job(self):
+        """
+        Tests a stored upload imported by the background job.
+
+        Verifies:
+        1. The upload is stored to disk and a pending job is returned
+        2. Running the job imports the contacts and reports its progress
+        3. The stored file is removed once the job completes
+        """
+        job = self.upload()
+        self.assertEqual(job.status, ContactImportJob.PENDING)
+        self.assertTrue(os.path.exists(job.file_path))
+
+        run_import_job(job.id)
+
+        status_data = self.client.get(reverse("import-job", args=[job.id])).json()["job"]
+        self.assertEqual(status_data["status"], ContactImportJob.COMPLETED)
+        self.assertEqual((status_data["processed"], status_data["created"], status_data["rejected"]), (12, 11, 1))
+        self.assertIsNotNone(status_data["rows_per_second"])
+        self.assertEqual(CompanyUser.objects.filter(org_id=self.org).count(), 11)
+        self.assertFalse(os.path.exists(job.file_path))
+
+    def test_import_job_resumes(self):
+        """
+        Tests that an interrupted job continues after its last committed chunk.
+        """
+        job = self.upload()
+        import_chunk = ContactImporter.import_chunk
+
+        def crash_on_second_chunk(importer, rows, first_line):
+            import_chunk(importer, rows, first_line)
+            if first_line > 2:
+                raise RuntimeError("worker lost")
+
+        with patch.object(ContactImporter, 'import_chunk', crash_on_second_chunk):
+            with self.assertRaises(RuntimeError):
+                run_import_job(job.id, chunk_size=4)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_processed), (ContactImportJob.FAILED, 4))
+        self.assertEqual(CompanyUser.objects.filter(org_id=self.org).count(), 4)
+
+        run_import_job(job.id, chunk_size=4)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_processed, job.rows_created), (ContactImportJob.COMPLETED, 12, 11))
+        self.assertEqual(CompanyUser.objects.filter(org_id=self.org).count(), 11)
+
+    def test_failed_job_discards_upload_after_last_retry(self):
+        """
+        Tests that a job's stored file is removed once its last retry fails, and not before.
+        """
+        job = self.upload()
+        with patch.object(ContactImporter, 'import_chunk', side_effect=RuntimeError("bad data")), \
+                patch('api.tasks.discard_upload', wraps=discard_upload) as discard:
+            # Eager retries run inline, so one apply goes through every retry
+            self.assertTrue(import_contacts.apply(args=[job.id]).failed())
+
+        discard.assert_called_once_with(job.id)
+        self.assertFalse(os.path.exists(job.file_path))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ContactImportJob.FAILED)
+
+    def test_failed_attempt_with_retries_left_is_retrying(self):
+        """
+        Tests that a failed attempt which will be retried keeps the job and its file alive.
+        """
+        job = self.upload()
+        with patch.object(ContactImporter, 'import_chunk', side_effect=RuntimeError("database restarting")):
+            with self.assertRaises(RuntimeError):
+                run_import_job(job.id, final=False)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (ContactImportJob.RETRYING, "database restarting"))
+        self.assertTrue(os.path.exists(job.file_path))
+
+    def test_async_flag_is_parsed(self):
+        """
+        Tests that ?async=0 keeps a small upload inline.
+        """
+        file = SimpleUploadedFile("contacts.csv", self.csv_data, content_type="text/csv")
+        with patch('api.views.import_contacts.delay') as delay:
+            response = self.client.post(reverse("upload-company-users-csv") + "?async=0", {"file": file})
+        self.assertEqual(response.status_code, 201)
+        delay.assert_not_called()
+
+    def test_gzip_upload_imports_in_background(self):
+        """
+        Tests that a gzip-compressed CSV is detected and streamed by the background job.
+
+        Verifies:
+        1. A compressed upload goes to a background job even when small
+        2. The stored file keeps a .csv.gz suffix
+        3. The job decompresses and imports it in chunks
+        """
+        file = SimpleUploadedFile("contacts.csv.gz", gzip.compress(self.csv_data), content_type="application/gzip")
+        with patch('api.views.import_contacts.delay') as delay:
+            response = self.client.post(reverse("upload-company-users-csv"), {"file": file})
+        self.assertEqual(response.status_code, 202)
+        delay.assert_called_once()
+
+        job = ContactImportJob.objects.get(id=response.json()["job"]["id"])
+        self.assertTrue(job.file_path.endswith(".csv.gz"))
+        job = run_import_job(job.id, chunk_size=4)
+        self.assertEqual((job.status, job.rows_processed, job.rows_created), (ContactImportJob.COMPLETED, 12, 11))
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=0)
+    def test_spooled_upload_is_moved_into_place(self):
+        """
+        Tests that an upload spooled to a temporary file is moved, not copied, into the import directory.
+        """
+        with patch('api.import_jobs.file_move_safe', wraps=file_move_safe) as move:
+            job = self.upload()
+        move.assert_called_once()
+        with open(job.file_path, 'rb') as stored:
+            self.assertEqual(stored.read(), self.csv_data)
+
+
+# -------------------------
+# COPY Contact Import Test Cases
+# -------------------------
+@skipUnless(connection.vendor == 'postgresql', "COPY imports need PostgreSQL")
+class CopyContactImportTests(TestCase):
+    """
+    Test suite for the PostgreSQL COPY path of contact imports.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment before each test.
+
+        Creates an organization with one existing contact.
+        """
+        self.user = User.objects.create_user(username='orguser', email='org@example.com', password='secure123')
+        self.org = Organization.objects.create(
+            org_id=self.user,
+            email_host_user="smtp-user@example.com",
+            email_host_password="smtp-pass",
+        )
+        CompanyUser.objects.create(
+            org_id=self.org, email="existing@example.com", age=30, first_name="Ex", last_name="Isting",
+            gender="M", location="Delhi", timezone="IST"
+        )
+
+    def test_copy_import(self):
+        """
+        Tests that chunks are merged through the staging table without duplicates.
+        """
+        rows = [
+            {'email': f"copy{i}@example.com", 'age': '30', 'gender': 'F', 'location': 'Pune', 'timezone': 'IST'}
+            for i in range(10)
+        ]
+        rows.append({'email': "existing@example.com", 'age': '30', 'gender': 'M', 'location': 'Delhi', 'timezone': 'IST'})
+
+        importer = ContactImporter(self.user.user_id, chunk_size=4, use_copy=True).run(rows)
+
+        self.assertEqual((importer.created, importer.duplicates), (10, 1))
+        self.assertEqual(CompanyUser.objects.filter(org_id=self.org).count(), 11)
+        self.assertTrue(CompanyUser.objects.filter(email="copy9@example.com", date_joined__isnull=False).exists())
+
+
+# -------------------------
+# Contact Deletion Test Cases
+# -------------------------
+class ContactDeletionTests(TestCase):
+    """
+    Test suite for chunked contact deletion with raw cascading deletes.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment before each test.
+
+        Creates an organization with five contacts, each with engagements, a
+        stored send time and bandit arms, plus a contact of another organization.
+        """
+        self.client = Client()
+        self.user = User.objects.create_user(username='orguser', email='org@example.com', password='secure123')
+        self.org = Organization.objects.create(
+            org_id=self.user,
+            email_host_user="smtp-user@example.com",
+            email_host_password="smtp-pass",
+        )
+        other_user = User.objects.create_user(username='otheruser', email='other@example.com', password='secure123')
+        other_org = Organization.objects.create(
+            org_id=other_user,
+            email_host_user="other-smtp@example.com",
+            email_host_password="smtp-pass",
+        )
+        self.other_contact = CompanyUser.objects.create(
+            org_id=other_org, email="other-contact@example.com", age=30, first_name="O", last_name="Ther",
+            gender="M", location="Delhi", timezone="IST"
+        )
+        self.campaign = campaign = CampaignDetails.objects.create(
+            org_id=self.org,
+            campaign_name="Deletion",
+            campaign_description="Deletion test",
+            campaign_start_date=datetime(2025, 3, 1, tzinfo=timezone.utc),
+            campaign_end_date=datetime(2025, 3, 2, tzinfo=timezone.utc),
+            campaign_mail_subject="Subject",
+            campaign_mail_body="Body",
+            send_time=datetime(2025, 3, 1, tzinfo=timezone.utc)
+        )
+        self.contacts = []
+        for i in range(5):
+            contact = CompanyUser.objects.create(
+                org_id=self.org, email=f"c{i}@example.com", age=30, first_name=f"C{i}", last_name="Test",
+                gender="F", location="Pune", timezone="IST"
+            )
+            for _ in range(3):
+                CompanyUserEngagement.objects.create(
+                    user_id=contact, campaign_id=campaign, org_id=self.org,
+                    send_time=datetime(2025, 3, 1, 9, tzinfo=timezone.utc), engagement_delay=0.0
+                )
+            UserSendTime.objects.create(user_id=contact, org_id=self.org, hour_counts=[0] * 24, send_hour=9, clicks=1)
+            record_send(self.user.user_id, contact.id, 9)
+            self.contacts.append(contact)
+        cache.set("org_id", self.user.user_id)
+
+    def test_delete_contacts_in_chunks(self):
+        """
+        Tests that contacts and their dependent rows are removed chunk by chunk.
+
+        Verifies:
+        1. Engagements, send times and contact arms are deleted with their contacts
+        2. The organization-wide arms and other organizations are untouched
+        3. The query count follows the number of chunks, not of dependent rows
+        """
+        with self.assertNumQueries(26):
+            deleted = delete_contacts(self.user.user_id, chunk_size=2)
+
+        self.assertEqual(deleted, 5)
+        self.assertFalse(CompanyUser.objects.filter(org_id=self.org).exists())
+        self.assertFalse(CompanyUserEngagement.objects.filter(org_id=self.org).exists())
+        self.assertFalse(UserSendTime.objects.filter(org_id=self.org).exists())
+        self.assertEqual(SendTimeArm.objects.filter(org_id=self.org).count(), 1)
+        self.assertTrue(CompanyUser.objects.filter(id=self.other_contact.id).exists())
+
+    def test_delete_users_endpoint(self):
+        """
+        Tests inline and background deletions through the endpoint.
+        """
+        response = self.client.post(
+            reverse("delete-users"),
+            {"user_ids": [self.contacts[0].id, self.other_contact.id]},
+            content_type="application/json"
+        )
+        self.assertEqual(response.json()["deleted"], 1)
+        self.assertTrue(CompanyUser.objects.filter(id=self.other_contact.id).exists())
+
+        with patch('api.views.delete_company_users.delay') as delay:
+            delay.return_value.id = 'task-id'
+            response = self.client.post(reverse("delete-users"), {"all": True}, content_type="application/json")
+        self.assertEqual(response.status_code, 202)
+        delay.assert_called_once_with(self.user.user_id, None)
+
+    def test_deletion_updates_sketches_and_versions(self):
+        """
+        Tests that the raw deletes keep what their skipped signals would have maintained.
+
+        Verifies:
+        1. Deleted clicks are taken out of the campaign's delay sketch
+        2. Campaign, contact and engagement data versions move
+        """
+        clicked = datetime(2025, 3, 1, 10, tzinfo=timezone.utc)
+        for contact, delay in zip(self.contacts[:2], [60.0, 3600.0]):
+            CompanyUserEngagement.objects.filter(user_id=contact).update(click_time=clicked, engagement_delay=delay)
+        self.assertEqual(rebuild_delay_sketch(self.user.user_id, self.campaign.campaign_id), 6)
+        versions = {scope: get_data_version(self.user.user_id, scope) for scope in (CAMPAIGN_DATA, CONTACT_DATA, ENGAGEMENT_DATA)}
+
+        with patch('api.versions.time.time', return_value=time.time() + 10):
+            delete_contacts(self.user.user_id, [self.contacts[0].id])
+
+        self.assertEqual(load_delay_sketch(self.campaign.campaign_id).total, 3)
+        for scope, version in versions.items():
+            self.assertNotEqual(get_data_version(self.user.user_id, scope), version)
+
+    def test_deletion_follows_on_delete(self):
+        """
+        Tests that references which do not cascade are honoured by the raw deletes.
+
+        Verifies:
+        1. A SET_NULL reference is cleared and its row kept
+        2. A PROTECT reference aborts the chunk without deleting anything
+        """
+        # Arms are unique per organization and hour, so make room for the orphaned contact arm
+        SendTimeArm.objects.filter(org_id=self.org, user_id__isnull=True).delete()
+        set_null = patch.object(SendTimeArm._meta.get_field('user_id').remote_field, 'on_delete', models.SET_NULL)
+        with set_null:
+            delete_contacts(self.user.user_id, [self.contacts[0].id])
+        self.assertFalse(CompanyUser.objects.filter(id=self.contacts[0].id).exists())
+        self.assertEqual(SendTimeArm.objects.filter(org_id=self.org, user_id__isnull=True).count(), 1)
+
+        protect = patch.object(UserSendTime._meta.get_field('user_id').remote_field, 'on_delete', models.PROTECT)
+        with protect, self.assertRaises(models.ProtectedError):
+            delete_contacts(self.user.user_id, [self.contacts[1].id])
+        self.assertTrue(CompanyUser.objects.filter(id=self.contacts[1].id).exists())
+        self.assertEqual(CompanyUserEngagement.objects.filter(user_id=self.contacts[1]).count(), 3)
+
+
+# -------------------------
+# Audience Segment Test Cases
+# -------------------------
+class AudienceSegmentTests(TestCase):
+    """
+    Test suite for saved audience segments and segment-targeted campaigns.
+    """
+
+    def setUp(self):
+        """
+        Set up test environment before each test.
+
+        Creates an organization with six contacts of varying age, gender and
+        timezone; the first two opened an email yesterday, the third 60 days ago.
+        Cached segment sizes of earlier tests are cleared, as segment ids are reused.
+        """
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='orguser', email='org@example.com', password='secure123')
+        self.org = Organization.objects.create(
+            org_id=self.user,
+            email_host_user="smtp-user@example.com",
+            email_host_password="smtp-pass",
+        )
+        self.campaign = CampaignDetails.objects.create(
+            org_id=self.org,
+            campaign_name="Targeted",
+            campaign_description="Segment test",
+            campaign_start_date=now(),
+            campaign_end_date=now() + timedelta(days=3),
+            campaign_mail_subject="Subject",
+            campaign_mail_body="Hello [recipient_name]",
+            send_time=now() + timedelta(hours=1)
+        )
+        self.contacts = []
+        attributes = [(25, "F", "IST"), (32, "M", "IST"), (41, "F", "IST"), (28, "F", "America/New_York"), (55, "M", "IST"), (35, "F", "IST")]
+        for i, (age, gender, tz) in enumerate(attributes):
+            self.contacts.append(CompanyUser.objects.create(
+                org_id=self.org, email=f"c{i}@example.com", age=age, first_name=f"C{i}", last_name="Test",
+                gender=gender, location="Pune", timezone=tz
+            ))
+        for contact, days_ago in zip(self.contacts, [1, 1, 60]):
+            sent = now() - timedelta(days=days_ago)
+            CompanyUserEngagement.objects.create(
+                user_id=contact, campaign_id=self.campaign, org_id=self.org,
+                send_time=sent, open_time=sent + timedelta(minutes=5), engagement_delay=0.0
+            )
+        cache.set("org_id", self.user.user_id)
+
+    def emails(self, definition):
+        return sorted(segment_contacts(self.user.user_id, definition).values_list('email', flat=True))
+
+    def test_compile_segment(self):
+        """
+        Tests that attribute and recency rules combine with AND.
+        """
+        self.assertEqual(self.emails({'genders': ['F'], 'min_age': 26, 'max_age': 45}), ["c2@example.com", "c3@example.com", "c5@example.com"])
+        self.assertEqual(self.emails({'engaged_within_days': 30}), ["c0@example.com", "c1@example.com"])
+        self.assertEqual(self.emails({'inactive_for_days': 30, 'timezones': ['IST']}), ["c2@example.com", "c4@example.com", "c5@example.com"])
+
+    def test_segment_endpoints(self):
+        """
+        Tests creating, listing and redefining segments.
+
+        Verifies:
+        1. A valid segment is saved with its size
+        2. Invalid definitions and duplicate names are rejected
+        3. Redefining a segment refreshes its cached size
+        """
+        response = self.client.post(reverse('audience-segments'), {'name': 'Women', 'definition': {'genders': ['F']}}, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        segment = response.json()['segment']
+        self.assertEqual(segment['size'], 4)
+
+        bad = self.client.post(reverse('audience-segments'), {'name': 'Bad', 'definition': {'min_age': 'old'}}, content_type='application/json')
+        self.assertEqual(bad.status_code, 400)
+        duplicate = self.client.post(reverse('audience-segments'), {'name': 'Women', 'definition': {}}, content_type='application/json')
+        self.assertEqual(duplicate.status_code, 400)
+
+        response = self.client.put(
+            reverse('audience-segment', args=[segment['id']]),
+            {'definition': {'genders': ['F'], 'timezones': ['IST']}},
+            content_type='application/json'
+        )
+        self.assertEqual(response.json()['segment']['size'], 3)
+        self.assertEqual([row['name'] for row in self.client.get(reverse('audience-segments')).json()['segments']], ['Women'])
+
+    def test_campaign_targets_segment(self):
+        """
+        Tests that dispatch only schedules emails for the campaign's segment.
+        """
+        segment = AudienceSegment.objects.create(org_id=self.org, name="Recent", definition={'engaged_within_days': 30})
+        self.campaign.segment = segment
+        self.campaign.save()
+        cache.set("campaign_id", self.campaign.campaign_id)
+
+        with patch('api.views.send_scheduled_email.apply_async') as apply_async:
+            response = self.client.get('/api/sto/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.json()['scheduled_times']), ["c0@example.com", "c1@example.com"])
+        self.assertEqual(apply_async.call_count, 2)
+
+    def test_targeted_segment_cannot_be_deleted(self):
+        """
+        Tests that a segment stays while campaigns target it.
+
+        Verifies:
+        1. The delete endpoint refuses with a 400 and keeps the campaign's segment
+        2. The segment can be deleted once no campaign targets it
+        3. Deleting the organization still removes both
+        """
+        segment = AudienceSegment.objects.create(org_id=self.org, name="Recent", definition={'engaged_within_days': 30})
+        self.campaign.segment = segment
+        self.campaign.save()
+
+        response = self.client.delete(reverse('audience-segment', args=[segment.id]))
+        self.assertEqual(response.status_code, 400)
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.segment_id, segment.id)
+
+        second = AudienceSegment.objects.create(org_id=self.org, name="Unused", definition={})
+        self.assertEqual(self.client.delete(reverse('audience-segment', args=[second.id])).status_code, 200)
+
+        self.user.delete()
+        self.assertFalse(AudienceSegment.objects.exists())
+
+
+# -------------------------
+# Audience Bitmap Test Cases
+# -------------------------
+class AudienceBitmapTests(TestCase):
+    """
+    Test suite for compressed audience bitmaps and audience resolution.
+    """
+
+    def test_set_operations(self):
+        """
+        Tests union, intersection and difference across sparse and dense containers.
+        """
+        rng = np.random.default_rng(0)
+        first = rng.choice(300000, 20000, replace=False)
+        second = np.concatenate([rng.choice(300000, 20000, replace=False), np.arange(70000, 80000)])
+        a, b = AudienceBitmap.from_ids(first), AudienceBitmap.from_ids(second)
+        first_set, second_set = set(first.tolist()), set(second.tolist())
+
+        self.assertEqual(set((a | b).to_ids().tolist()), first_set | second_set)
+        self.assertEqual(set((a & b).to_ids().tolist()), first_set & second_set)
+        self.assertEqual(set((a - b).to_ids().tolist()), first_set - second_set)
+        self.assertEqual(len(a | b), len(first_set | second_set))
+        self.assertIn(75000, b)
+        self.assertEqual(len(AudienceBitmap.from_ids([]) | a), 20000)
+
+    def test_resolve_audience(self):
+        """
+        Tests combining a segment with previous-campaign clickers through the endpoint.
+
+        Verifies:
+        1. Excluded clickers are removed from the segment
+        2. A new contact is picked up once the contact data version changes
+        3. Unknown audiences are rejected
+        """
+        user = User.objects.create_user(username='orguser', email='org@example.com', password='secure123')
+        org = Organization.objects.create(org_id=user, email_host_user="smtp-user@example.com", email_host_password="smtp-pass")
+        campaign = CampaignDetails.objects.create(
+            org_id=org,
+            campaign_name="Previous",
+            campaign_description="Audience test",
+            campaign_start_date=datetime(2025, 3, 1, tzinfo=timezone.utc),
+            campaign_end_date=datetime(2025, 3, 2, tzinfo=timezone.utc),
+            campaign_mail_subject="Subject",
+            campaign_mail_body="Body",
+            send_time=datetime(2025, 3, 1, tzinfo=timezone.utc)
+        )
+        contacts = [
+            CompanyUser.objects.create(
+                org_id=org, email=f"c{i}@example.com", age=30, first_name=f"C{i}", last_name="Test",
+                gender="F" if i < 3 else "M", location="Pune", timezone="IST"
+            )
+            for i in range(5)
+        ]
+        sent = datetime(2025, 3, 1, 9, tzinfo=timezone.utc)
+        CompanyUserEngagement.objects.create(
+            user_id=contacts[0], campaign_id=campaign, org_id=org, send_time=sent,
+            open_time=sent, click_time=sent, engagement_delay=0.0
+        )
+        segment = AudienceSegment.objects.create(org_id=org, name="Women", definition={'genders': ['F']})
+        cache.set("org_id", user.user_id)
+
+        body = {'include': [f'segment:{segment.id}'], 'exclude': [f'clicked:{campaign.campaign_id}']}
+        response = self.client.post(reverse('resolve-audience'), body, content_type='application/json')
+        self.assertEqual(response.json()['contact_ids'], [contacts[1].id, contacts[2].id])
+
+        new_contact = CompanyUser.objects.create(
+            org_id=org, email="new@example.com", age=30, first_name="N", last_name="Ew",
+            gender="F", location="Pune", timezone="IST"
+        )
+        response = self.client.post(reverse('resolve-audience'), body, content_type='application/json')
+        self.assertEqual(response.json()['size'], 3)
+        self.assertIn(new_contact.id, response.json()['contact_ids'])
+
+        bad = self.client.post(reverse('resolve-audience'), {'include': ['segment:999']}, content_type='application/json')
+        self.assertEqual(bad.status_code, 400)
+        bad = self.client.post(reverse('resolve-audience'), {'include': [1]}, content_type='application/json')
+        self.assertEqual(bad.status_code, 400)
+        bad = self.client.post(reverse('resolve-audience'), {'include': ['all'], 'limit': -1}, content_type='application/json')
+        self.assertEqual(bad.status_code, 400)
+
+    def test_campaign_dispatches_to_stored_audience(self):
+        """
+        Tests that a campaign's stored audience decides who the send is dispatched to.
+
+        Verifies:
+        1. Dispatch schedules the segment minus previous-campaign clickers
+        2. A segment referenced by a campaign audience cannot be deleted
+        """
+        user = User.objects.create_user(username='orguser', email='org@example.com', password='secure123')
+        org = Organization.objects.create(org_id=user, email_host_user="smtp-user@example.com", email_host_password="smtp-pass")
+        campaign_fields = {
+            'org_id': org,
+            'campaign_description': "Audience test",
+            'campaign_start_date': datetime(2030, 3, 1, tzinfo=timezone.utc),
+            'campaign_end_date': datetime(2030, 3, 2, tzinfo=timezone.utc),
+            'campaign_mail_subject': "Subject",
+            'campaign_mail_body': "Hi [recipient_name]",
+            'send_time': datetime(2030, 3, 1, tzinfo=timezone.utc),
+        }
+        previous = CampaignDetails.objects.create(campaign_name="Previous", **campaign_fields)
+        contacts = [
+            CompanyUser.objects.create(
+                org_id=org, email=f"c{i}@example.com", age=30, first_name=f"C{i}", last_name="Test",
+                gender="F" if i < 3 else "M", location="Pune", timezone="IST"
+            )
+            for i in range(5)
+        ]
+        sent = datetime(2025, 3, 1, 9, tzinfo=timezone.utc)
+        CompanyUserEngagement.objects.create(
+            user_id=contacts[0], campaign_id=previous, org_id=org, send_time=sent,
+            open_time=sent, click_time=sent, engagement_delay=0.0
+        )
+        segment = AudienceSegment.objects.create(org_id=org, name="Women", definition={'genders': ['F']})
+        follow_up = CampaignDetails.objects.create(
+            campaign_name="Follow-up",
+            audience={'include': [f'segment:{segment.id}'], 'exclude': [f'clicked:{previous.campaign_id}']},
+            **campaign_fields
+        )
+        cache.set("org_id", user.user_id)
+        cache.set("campaign_id", follow_up.campaign_id)
+
+        with patch('api.views.send_scheduled_email.apply_async') as apply_async:
+            response = self.client.get('/api/sto/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()['scheduled_times']), {'c1@example.com', 'c2@example.com'})
+        self.assertEqual(apply_async.call_count, 2)
+
+        response = self.client.delete(reverse('audience-segment', args=[segment.id]))
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(AudienceSegment.objects.filter(id=segment.id).exists())
+
+    def test_audience_keys_follow_their_data(self):
+        """
+        Tests that each source's cache key only moves with the data it is built from.
+
+        Verifies:
+        1. Engagement changes leave contact and segment bitmaps cached
+        2. Engagement changes retire opened/clicked bitmaps
+        3. Contact changes retire contact and segment bitmaps
+        """
+        org_id = 42
+        sources = ['all', 'segment:1', 'clicked:1']
+        keys = {source: audience_key(org_id, source) for source in sources}
+
+        bump_data_version(org_id, ENGAGEMENT_DATA)
+        self.assertEqual([audience_key(org_id, source) == keys[source] for source in sources], [True, True, False])
+
+        keys = {source: audience_key(org_id, source) for source in sources}
+        bump_data_version(org_id, CONTACT_DATA)
+        self.assertEqual([audience_key(org_id, source) == keys[source] for source in sources], [False, False, True])
+
+
+# -------------------------
+# Engagement Index Test Cases
+# -------------------------
+class EngagementIndexTests(TestCase):
+    """
+    Test suite checking that hot tracking and listing queries are served by their indexes.
+    """
+
+    def setUp(self):
+        user = User.objects.create_user(username='orguser', email='org@example.com', password='secure123')
+        self.org = Organization.objects.create(org_id=user, email_host_user="smtp-user@example.com", email_host_password="smtp-pass")
+        self.campaign = CampaignDetails.objects.create(
+            org_id=self.org,
+            campaign_name="Indexed",
+            campaign_description="Index test",
+            campaign_start_date=datetime(2025, 3, 1, tzinfo=timezone.utc),
+            campaign_end_date=datetime(2025, 3, 2, tzinfo=timezone.utc),
+            campaign_mail_subject="Subject",
+            campaign_mail_body="Body",
+            send_time=datetime(2025, 3, 1, tzinfo=timezone.utc)
+        )
+        self.contact = CompanyUser.objects.create(
+            org_id=self.org, email="c@example.com", age=30, first_name="C", last_name="Test",
+            gender="F", location="Pune", timezone="IST"
+        )
+
+    def query_plan(self, queryset):
+        """Query plan of a queryset, with sequential scans discouraged on PostgreSQL"""
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def test_unclicked_engagement_lookup_uses_partial_index(self):
+        """
+        Tests the open/click tracking lookup of the latest unclicked send.
+        """
+        engagements = CompanyUserEngagement.objects.filter(
+            user_id=self.contact.id,
+            org_id=self.org.org_id_id,
+            campaign_id=self.campaign.campaign_id,
+            click_time__isnull=True
+        ).order_by('-send_time')
+        self.assertIn('engagement_unclicked_idx', self.query_plan(engagements[:1]))
+
+    def test_organization_clicks_use_click_index(self):
+        """
+        Tests the retraining scan of an organization's clicks past a watermark.
+        """
+        clicks = CompanyUserEngagement.objects.filter(
+            org_id_id=self.org.org_id_id,
+            click_time__isnull=False,
+            click_time__gt=datetime(2025, 3, 1, tzinfo=timezone.utc)
+        )
+        self.assertIn('engagement_org_click_idx', self.query_plan(clicks))
+
+    def test_contact_listing_uses_organization_index(self):
+        """
+        Tests the keyset-paginated contact listing of an organization.
+        """
+        contacts = CompanyUser.objects.filter(org_id_id=self.org.org_id_id, id__gt=0).order_by('id')[:100]
+        self.assertIn('company_user_org_id_idx', self.query_plan(contacts))
+
+
+# -------------------------
+# Contact Search Test Cases
+# -------------------------
+class ContactSearchTests(TestCase):
+    """
+    Test suite for the server-side contact typeahead search.
+    """
+
+    def setUp(self):
+        user = User.objects.create_user(username='orguser', email='org@example.com', password='secure123')
+        self.org = Organization.objects.create(org_id=user, email_host_user="smtp-user@example.com", email_host_password="smtp-pass")
+        other_user = User.objects.create_user(username='otheruser', email='other@example.com', password='secure123')
+        other_org = Organization.objects.create(org_id=other_user, email_host_user="smtp-other@example.com", email_host_password="smtp-pass")
+        people = [
+            ("anita@example.com", "Anita", "Rao", "Pune"),
+            ("ravi@example.com", "Ravi", "Kumar", "Bangalore"),
+            ("john@example.com", "John", "Smith", "Manipal"),
+        ]
+        for email, first_name, last_name, location in people:
+            CompanyUser.objects.create(
+                org_id=self.org, email=email, age=30, first_name=first_name, last_name=last_name,
+                gender="F", location=location, timezone="IST"
+            )
+        CompanyUser.objects.create(
+            org_id=other_org, email="ana@other.com", age=30, first_name="Ana", last_name="Other",
+            gender="F", location="Delhi", timezone="IST"
+        )
+        cache.set("org_id", user.user_id)
+
+    def test_search_matches_any_field_within_organization(self):
+        """
+        Tests case-insensitive substring matching across email, names and location.
+
+        Verifies:
+        1. Contacts of other organizations are never returned
+        2. Prefix matches are ranked ahead of inner matches
+        3. The limit caps the number of results
+        """
+        response = self.client.get(reverse('search-company-users'), {'q': 'ANI'})
+        self.assertEqual(response.status_code, 200)
+        emails = [contact['email'] for contact in response.json()['company_users']]
+        self.assertEqual(set(emails), {"anita@example.com", "john@example.com"})
+        self.assertEqual(emails[0], "anita@example.com")
+
+        response = self.client.get(reverse('search-company-users'), {'q': 'example', 'limit': 2})
+        self.assertEqual(len(response.json()['company_users']), 2)
+
+    def test_search_rejects_invalid_parameters(self):
+        """
+        Tests that too-short queries and out-of-range limits are rejected.
+        """
+        self.assertEqual(self.client.get(reverse('search-company-users'), {'q': 'an'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('search-company-users'), {'q': 'ani', 'limit': 500}).status_code, 400)
+
+
+# -------------------------
+# Bulk Contact Upsert Test Cases
+# -------------------------
+class BulkContactUpsertTests(TestCase):
+    """
+    Test suite for the bulk JSON contact upsert endpoint.
+    """
+
+    def setUp(self):
+        user = User.objects.create_user(username='orguser', email='org@example.com', password='secure123')
+        self.org = Organization.objects.create(org_id=user, email_host_user="smtp-user@example.com", email_host_password="smtp-pass")
+        other_user = User.objects.create_user(username='otheruser', email='other@example.com', password='secure123')
+        other_org = Organization.objects.create(org_id=other_user, email_host_user="smtp-other@example.com", email_host_password="smtp-pass")
+        self.existing = CompanyUser.objects.create(
+            org_id=self.org, email="old@example.com", age=30, first_name="Old", last_name="Name",
+            gender="F", location="Pune", timezone="IST"
+        )
+        CompanyUser.objects.create(
+            org_id=other_org, email="taken@example.com", age=30, first_name="Taken", last_name="Other",
+            gender="M", location="Delhi", timezone="IST"
+        )
+        cache.set("org_id", user.user_id)
+
+    def contact(self, email, **overrides):
+        return {"email": email, "age": 40, "first_name": "New", "last_name": "Name",
+                "gender": "M", "location": "Mumbai", "timezone": "IST", **overrides}
+
+    def test_upsert_creates_updates_and_rejects_per_item(self):
+        """
+        Tests a mixed batch of new, existing, invalid and foreign contacts.
+
+        Verifies:
+        1. New contacts are created and existing ones updated in place
+        2. Invalid items, repeated emails and other organizations' emails are rejected
+        3. Results are returned per item in request order
+        """
+        contacts = [
+            self.contact("new@example.com"),
+            self.contact("old@example.com", first_name="Renamed", age=31),
+            self.contact("bad-email"),
+            self.contact("taken@example.com"),
+            self.contact("new@example.com"),
+        ]
+        response = self.client.post(reverse('bulk-upsert-users'), {"contacts": contacts}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['created'], data['updated'], data['rejected']), (1, 1, 3))
+        self.assertEqual([result['status'] for result in data['results']], ['created', 'updated', 'error', 'error', 'error'])
+        self.assertEqual(data['results'][1]['id'], self.existing.id)
+
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.first_name, self.existing.age), ("Renamed", 31))
+        self.assertEqual(CompanyUser.objects.get(email="taken@example.com").first_name, "Taken")
+        self.assertEqual(CompanyUser.objects.get(email="new@example.com").org_id_id, self.org.org_id_id)
+
+    def test_upsert_keeps_names_that_are_not_given(self):
+        """
+        Tests that an omitted or blank name leaves the stored name in place.
+        """
+        contact = self.contact("old@example.com", age=33, last_name="")
+        del contact["first_name"]
+        first_name, last_name = self.existing.first_name, self.existing.last_name
+        response = self.client.post(reverse('bulk-upsert-users'), {"contacts": [contact]}, content_type='application/json')
+        self.assertEqual(response.json()['updated'], 1)
+
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.first_name, self.existing.last_name, self.existing.age), (first_name, last_name, 33))
+
+    def test_upsert_uses_set_based_queries(self):
+        """
+        Tests that a batch costs a constant number of queries regardless of its size.
+        """
+        contacts = [self.contact(f"sync{i}@example.com") for i in range(100)]
+        contacts.append(self.contact("old@example.com"))
+        with self.assertNumQueries(5):
+            response = self.client.post(reverse('bulk-upsert-users'), {"contacts": contacts}, content_type='application/json')
+        self.assertEqual(response.json()['created'], 100)
+
+    def test_upsert_rejects_oversized_batches(self):
+        """
+        Tests that empty and oversized batches are rejected.
+        """
+        self.assertEqual(self.client.post(reverse('bulk-upsert-users'), {"contacts": []}, content_type='application/json').status_code, 400)
+        contacts = [self.contact(f"c{i}@example.com") for i in range(5001)]
+        response = self.client.post(reverse('bulk-upsert-users'), {"contacts": contacts}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
@@ -16,6 +16,9 @@ from .views import (
     get_campaigns,
     get_campaign_details,
     get_chart_data,
+    campaign_funnel,
+    get_dashboard_summary,
+    export_engagements,
     autofill_time,
     update_email,
     get_email,
@@ -23,8 +26,14 @@ from .views import (
     get_email_normal,
     user_logout,
     get_company_users,
+    search_company_users,
     add_user,
     upload_company_users_csv,
+    bulk_upsert_users,
+    get_import_job,
+    audience_segments,
+    audience_segment,
+    resolve_audience_view,
     delete_users,
     get_username,
     forgot_password,
@@ -51,6 +60,9 @@ urlpatterns = [
     path('campaigns/',get_campaigns),
     path('get-campaign-details/',get_campaign_details),
     path('get_chart_data/', get_chart_data),
+    path('campaign-funnel/', campaign_funnel, name='campaign-funnel'),
+    path('dashboard-summary/', get_dashboard_summary, name='dashboard-summary'),
+    path('export-engagements/', export_engagements, name='export-engagements'),
     path('optimal-start-time/',autofill_time),
     path('update-email/', update_email),
     path('get-email/', get_email, name='get-email'),
@@ -58,8 +70,14 @@ urlpatterns = [
     path('get-email-original/', get_email_original, name='get-email-original'),
     path('logout/', user_logout, name='user-logout'),
     path('get-company-users/',get_company_users),
+    path('search-company-users/', search_company_users, name='search-company-users'),
     path('add-user/',add_user, name='add-user'),
+    path('bulk-upsert-users/', bulk_upsert_users, name='bulk-upsert-users'),
     path('upload-company-users-csv/',upload_company_users_csv, name='upload-company-users-csv'),
+    path('import-jobs/<int:job_id>/', get_import_job, name='import-job'),
+    path('segments/', audience_segments, name='audience-segments'),
+    path('segments/<int:segment_id>/', audience_segment, name='audience-segment'),
+    path('audiences/resolve/', resolve_audience_view, name='resolve-audience'),
     path('delete-users/',delete_users, name='delete-users'),
     path('get-username/',get_username),
     path('forgot-password/', forgot_password),
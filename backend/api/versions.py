@@ -0,0 +1,40 @@
+import time
+
+from django.core.cache import cache
+
+# Independently versioned parts of an organization's data
+CAMPAIGN_DATA = 'campaigns'
+CONTACT_DATA = 'contacts'
+ENGAGEMENT_DATA = 'engagement'
+SEGMENT_DATA = 'segments'
+
+
+def data_version_key(org_id, scope=CAMPAIGN_DATA):
+    return f"{scope}_data_version_{org_id}"
+
+
+def get_data_version(org_id, scope=CAMPAIGN_DATA):
+    """
+    Current version of one part of an organization's data, bumped on every change.
+
+    A missing counter (first use or cache eviction) starts from the current
+    time in nanoseconds rather than 1, so a fresh counter never repeats a
+    version a client may still hold in an ETag.
+    """
+    cache.add(data_version_key(org_id, scope), time.time_ns(), timeout=None)
+    return cache.get(data_version_key(org_id, scope))
+
+
+def bump_data_version(org_id, scope=CAMPAIGN_DATA):
+    try:
+        cache.incr(data_version_key(org_id, scope))
+    except ValueError:
+        cache.set(data_version_key(org_id, scope), time.time_ns(), timeout=None)
+
+
+def org_data_etag(request, *args, **kwargs):
+    """ETag of a response built only from the organization's campaign data; no database access"""
+    org_id = cache.get('org_id')
+    if not org_id:
+        return None
+    return f"{org_id}-{get_data_version(org_id)}"
@@ -2,19 +2,20 @@ import json
 import csv
 import random
 import logging
+from collections import Counter
 from datetime import datetime, timedelta
-from io import TextIOWrapper
 
 import pandas as pd
-import pytz
+from django.conf import settings
 from django.core.cache import cache
 from django.core.mail import send_mail, get_connection
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
-from django.http import JsonResponse, HttpResponse, HttpResponseRedirect
+from django.http import JsonResponse, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.utils.timezone import now, make_aware
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
 from django.contrib import messages
 from django.contrib.auth import login, authenticate, logout, get_user_model
 from django.contrib.auth.decorators import login_required
@@ -30,13 +31,48 @@ from social_core.backends.oauth import BaseOAuth2
 from social_core.exceptions import MissingBackend
 
 from api.models import User, Organization, CompanyUser, CampaignDetails, CompanyUserEngagement, CampaignStatistics
-from .models import EmailLog
+from .models import EmailLog, UserSendTime, ContactImportJob, AudienceSegment
 from .sto_model import get_optimal_send_time
-from .tasks import send_scheduled_email
+from .cohorts import load_cohort_send_hours, cohort_send_hour
+from .scheduling import wall_clock, local_to_utc, local_send_times, to_utc_datetimes
+from .analytics import get_optimal_start_time, get_chart_data_rows, get_campaign_funnel
+from .bandit import record_open, sample_send_hours
+from .sketches import record_engagement_delay, load_delay_sketch
+from .dashboard import get_dashboard_snapshot
+from .versions import org_data_etag
+from .pagination import keyset_page, PaginationError
+from .exports import EXPORT_FORMATS, engagement_rows
+from .importers import ContactConflictError, ContactImporter, MAX_UPSERT_CONTACTS, is_gzipped, open_csv_text, upsert_contacts
+from .import_jobs import store_upload, job_status
+from .audiences import AUDIENCE_KEYS, AudienceError, audiences_using_source, campaign_audience, resolve_audience, validate_audience
+from .search import SearchError, parse_search_params, search_contacts
+from .segments import SegmentError, validate_definition, get_segment_size, segment_size_key
+from .deletion import INLINE_DELETE_LIMIT, delete_contacts
+from .tasks import send_scheduled_email, import_contacts, delete_company_users
 from .LLM_template_generator import TemplateGenerator
 
 logger = logging.getLogger(__name__)
 
+# Listing endpoints: projectable fields, sortable fields and filter parameters
+COMPANY_USER_FIELDS = ['id', 'org_id_id', 'email', 'age', 'first_name', 'last_name', 'gender', 'location', 'timezone', 'date_joined']
+COMPANY_USER_SORT_FIELDS = ['id', 'email', 'age', 'first_name', 'last_name', 'date_joined']
+COMPANY_USER_FILTERS = {
+    'gender': 'gender',
+    'location': 'location',
+    'timezone': 'timezone',
+    'min_age': 'age__gte',
+    'max_age': 'age__lte',
+    'joined_after': 'date_joined__gte',
+    'joined_before': 'date_joined__lt',
+}
+CAMPAIGN_FIELDS = ['campaign_id', 'campaign_name', 'campaign_description', 'campaign_start_date', 'campaign_end_date', 'send_time']
+CAMPAIGN_SORT_FIELDS = ['campaign_id', 'campaign_name', 'campaign_start_date', 'send_time']
+CAMPAIGN_FILTERS = {
+    'name': 'campaign_name__icontains',
+    'starts_after': 'campaign_start_date__gte',
+    'starts_before': 'campaign_start_date__lt',
+}
+
 @api_view(['POST'])
 def login_view(request):
     """Logs in the user and sets the authToken cookie"""
@@ -194,22 +230,31 @@ def check_auth(request):
 def convert_ist_to_utc(ist_date, ist_time):
     """Convert IST date and time to UTC."""
     try:
-        ist = pytz.timezone("Asia/Kolkata")
-        utc = pytz.utc
-
         # Combine date and time into a single datetime object
         ist_datetime_str = f"{ist_date} {ist_time}"
         ist_datetime = datetime.strptime(ist_datetime_str, "%Y-%m-%d %H:%M")
 
-        # Localize and convert to UTC
-        ist_datetime = ist.localize(ist_datetime)
-        utc_datetime = ist_datetime.astimezone(utc)
-
-        return utc_datetime
+        return local_to_utc(ist_datetime)
     except Exception as e:
         logger.error(f"Error converting IST to UTC: {str(e)}")
         return Response({'error': 'Invalid date or time format'}, status=400)
 
+def fit_hour_to_window(optimal_hour, utc_start_time, utc_end_time):
+    """Move a preferred send hour onto the first valid day of the campaign window."""
+    # Adjust to campaign window
+    start_hour = utc_start_time.hour
+    end_hour = 23 if utc_end_time.date() > utc_start_time.date() else utc_end_time.hour
+    optimal_hour = max(start_hour, min(int(optimal_hour), end_hour))
+
+    # Set to first valid day
+    optimal_send_time = utc_start_time.replace(hour=optimal_hour)
+    now_ = now()
+    while optimal_send_time < now_ and optimal_send_time <= utc_end_time:
+        optimal_send_time += timedelta(days=1)
+    if optimal_send_time > utc_end_time:
+        optimal_send_time = utc_start_time
+    return optimal_send_time
+
 @api_view(['GET'])
 def send_time_optim(request):
     # Fetch cached values
@@ -231,62 +276,78 @@ def send_time_optim(request):
     except CampaignDetails.DoesNotExist:
         return Response({"error": "Invalid campaign ID"}, status=400)
 
-    schedule_date, schedule_time_str = str(schedule_time).split(" ")
-    schedule_time_str = schedule_time_str.split("+")[0][:-3]  # "HH:MM"
-    end_date, end_time_str = str(campaign_end_date).split(" ")
-    end_time_str = end_time_str.split("+")[0][:-3]  # "HH:MM"
-
-    utc_start_time = convert_ist_to_utc(schedule_date, schedule_time_str)
-    utc_end_time = convert_ist_to_utc(end_date, end_time_str)
+    start_wall_clock = wall_clock(schedule_time)
+    end_wall_clock = wall_clock(campaign_end_date)
+    utc_start_time = local_to_utc(start_wall_clock)
+    utc_end_time = local_to_utc(end_wall_clock)
 
     if utc_end_time < utc_start_time:
         return Response({"error": "End date must be after start date"}, status=400)
 
-    # Fetch users
-    users = CompanyUser.objects.filter(org_id_id=org_id)
-    if not users.exists():
+    # Fetch the campaign's audience: its stored audience, its segment, or every contact of the organization
+    try:
+        users = campaign_audience(campaign)
+    except AudienceError as e:
+        return Response({"error": str(e)}, status=400)
+    if not users:
         return Response({"error": "No users found for this organization"}, status=400)
 
+    # "Send at HH:MM local" campaigns resolve every recipient's timezone in one pass
+    recipient_local = request.GET.get('local_time', '').lower() in ('1', 'true')
+    if recipient_local:
+        users = list(users)
+        timezones = [user.timezone for user in users]
+        local_start_times = to_utc_datetimes(local_send_times(timezones, start_wall_clock))
+        local_end_times = to_utc_datetimes(local_send_times(timezones, end_wall_clock))
+
+    # Send hours precomputed by retrain_sto, and cohort send hours for contacts without click history
+    stored_hours = dict(UserSendTime.objects.filter(org_id_id=org_id).values_list('user_id_id', 'send_hour'))
+    cohort_hours = load_cohort_send_hours(org_id)
+    clicked_users = set(
+        CompanyUserEngagement.objects.filter(org_id_id=org_id, click_time__isnull=False)
+        .values_list('user_id', flat=True).distinct()
+    )
+    link = cache.get('company_link') or "https://smartreachai.social"
+
+    # The bandit strategy samples every contact's hour from its open-rate posterior in one pass
+    use_bandit = request.GET.get('strategy') == 'bandit'
+    if use_bandit:
+        users = list(users)
+        bandit_hours = sample_send_hours(org_id, [user.id for user in users])
+
     # Schedule emails with statistical optimal time
     scheduled_times = {}
-    for user in users:
+    for index, user in enumerate(users):
+        if recipient_local:
+            user_start_time, user_end_time = local_start_times[index], local_end_times[index]
+        else:
+            user_start_time, user_end_time = utc_start_time, utc_end_time
+
         user_email = user.email  # Assuming email field exists; adjust if it’s user_email
         personalized_message = message.replace("[company_name]", "SmartReach").replace("[recipient_name]", user.first_name)
 
-        # Get optimal send time statistically
-        engagements = CompanyUserEngagement.objects.filter(
-            user_id=user,
-            click_time__isnull=False
-        )
-
-        if not engagements.exists():
-            # Fallback to campaign start if no click data
-            optimal_send_time = utc_start_time
+        if use_bandit:
+            optimal_send_time = fit_hour_to_window(bandit_hours[user.id], user_start_time, user_end_time)
+        elif user.id in stored_hours:
+            optimal_send_time = fit_hour_to_window(stored_hours[user.id], user_start_time, user_end_time)
+        elif user.id not in clicked_users:
+            # Fallback to the contact's cohort hour, or campaign start if no cohort has click data
+            cohort_hour = cohort_send_hour(cohort_hours, user)
+            if cohort_hour is None:
+                optimal_send_time = user_start_time
+            else:
+                optimal_send_time = fit_hour_to_window(cohort_hour, user_start_time, user_end_time)
         else:
-            # Statistical method: most frequent click hour
+            # Statistical method: most frequent click hour, for clickers not yet retrained
+            engagements = CompanyUserEngagement.objects.filter(user_id=user, click_time__isnull=False)
             df = pd.DataFrame(list(engagements.values('click_time')))
             df['click_hour'] = df['click_time'].dt.hour
             optimal_hour = df['click_hour'].value_counts().idxmax()
-
-            # Adjust to campaign window
-            start_hour = utc_start_time.hour
-            end_hour = 23 if utc_end_time.date() > utc_start_time.date() else utc_end_time.hour
-            optimal_hour = max(start_hour, min(optimal_hour, end_hour))
-
-            # Set to first valid day
-            optimal_send_time = utc_start_time.replace(hour=optimal_hour)
-            now_ = now()
-            while optimal_send_time < now_ and optimal_send_time <= utc_end_time:
-                optimal_send_time += timedelta(days=1)
-            if optimal_send_time > utc_end_time:
-                optimal_send_time = utc_start_time
+            optimal_send_time = fit_hour_to_window(optimal_hour, user_start_time, user_end_time)
         # Schedule email via Celery
-        link = cache.get('company_link')
-        if not link:
-            link = "https://smartreachai.social"
         send_scheduled_email.apply_async(
             args=[org_id, campaign_id, user_email, subject, personalized_message, link],
-            eta=now()
+            eta=optimal_send_time
         )
         scheduled_times[user_email] = str(optimal_send_time)
 
@@ -495,6 +556,10 @@ def track_email_click(request):
                     engagement.click_time = now()
                     engagement.engagement_delay = (engagement.click_time - engagement.send_time).total_seconds()
                     engagement.save()
+                    record_engagement_delay(engagement.org_id_id, engagement.campaign_id_id, engagement.engagement_delay)
+                    if engagement.open_time is None:
+                        # Clicking implies an open whose tracking pixel was blocked
+                        record_open(engagement.org_id_id, engagement.user_id_id, engagement.send_time.hour)
                     logger.info(f"Email click tracked for {user_email} in organization {organization_id}")
                 else:
                     logger.warning(f"No unclicked engagement found for {user_email} in {organization_id}")
@@ -557,6 +622,22 @@ def generate_template_send_time(request):
 
     org_instance = Organization.objects.get(org_id_id=cache.get('org_id'))
 
+    segment = None
+    segment_id = request.data.get('segmentId')
+    if segment_id:
+        segment = AudienceSegment.objects.filter(id=segment_id, org_id=org_instance).first()
+        if not segment:
+            return Response({'error': 'Segment not found'}, status=400)
+
+    audience = request.data.get('audience')
+    if audience is not None:
+        try:
+            audience = validate_audience(audience)
+            # Resolving checks every source exists and warms the bitmaps dispatch reads
+            resolve_audience(org_instance.org_id_id, **audience)
+        except AudienceError as e:
+            return Response({'error': str(e)}, status=400)
+
     campaign_details = {
         'org_id': org_instance,
         'campaign_name': campaign_name,
@@ -565,7 +646,9 @@ def generate_template_send_time(request):
         'campaign_end_date': campaign_end_date,
         'campaign_mail_body': cache.get('Template')['Body'],
         'campaign_mail_subject': cache.get('Template')['Subject'],
-        'send_time': campaign_start_time
+        'send_time': campaign_start_time,
+        'segment': segment,
+        'audience': audience,
     }
     try:
         campaign_object = CampaignDetails.objects.create(**campaign_details)
@@ -610,17 +693,30 @@ def generate_template_send_time(request):
         return Response({'error': 'Internal Server Error'}, status=500)
 
 
+@condition(etag_func=org_data_etag)
 def get_campaigns(request):
-    """Fetch all campaigns for the logged-in user"""
+    """Fetch a page of campaigns for the logged-in user"""
     org_id = cache.get('org_id')
-    campaigns = CampaignDetails.objects.filter(org_id_id=org_id).values('campaign_id','campaign_name', 'campaign_description')
-    if not campaigns:
+    try:
+        campaigns, next_cursor = keyset_page(
+            CampaignDetails.objects.filter(org_id_id=org_id),
+            request.GET,
+            pk='campaign_id',
+            fields=CAMPAIGN_FIELDS,
+            sortable=CAMPAIGN_SORT_FIELDS,
+            default_fields=['campaign_id', 'campaign_name', 'campaign_description'],
+            filters=CAMPAIGN_FILTERS,
+        )
+    except PaginationError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if not campaigns and not request.GET.get('cursor'):
         return JsonResponse({'error': 'No campaigns found'}, status=404)
 
-    return JsonResponse({'campaigns': list(campaigns)})
+    return JsonResponse({'campaigns': campaigns, 'next_cursor': next_cursor})
 
 
 
+@condition(etag_func=org_data_etag)
 def get_campaign_details(request):
     """Fetch details of a specific campaign"""
     org_id = cache.get('org_id')
@@ -645,40 +741,68 @@ def get_campaign_details(request):
 
     return JsonResponse({
         'campaign_details': list(campaign_details),
-        'campaign_meta_details': list(campaign_meta_details)
+        'campaign_meta_details': list(campaign_meta_details),
+        'engagement_delay_percentiles': load_delay_sketch(campaign_id).percentiles()
     })
 
+@condition(etag_func=org_data_etag)
 def get_chart_data(request):
     """Fetch chart data for the logged-in user"""
     org_id = cache.get('org_id')
     if not org_id:
         return JsonResponse({'error': 'Organization not found'}, status=400)
 
-    campaigns = CampaignStatistics.objects.filter(org_id_id=org_id).values(
-        'id',
-        'user_click_rate',
-        'user_open_rate',
-        'user_engagement_delay',
-        'campaign_id_id'
-    )
-
-    chart_data = []
-    for campaign in campaigns:
-        chart_data.append({
-            'id': campaign['id'],
-            'campaignName': CampaignDetails.objects.get(campaign_id=campaign['campaign_id_id']).campaign_name,
-            'start_date': CampaignDetails.objects.get(campaign_id=campaign['campaign_id_id']).campaign_start_date,
-            'clickRate': campaign['user_click_rate'],
-            'openRate': campaign['user_open_rate'],
-            'engagementDelay': campaign['user_engagement_delay'],
-            'campaignId': campaign['campaign_id_id']
-        })
+    chart_data = get_chart_data_rows(org_id)
 
     if not chart_data:
         return JsonResponse({'error': 'No campaign data found'}, status=404)
     return JsonResponse({'chart_data': chart_data})
 
 
+def campaign_funnel(request):
+    """Fetch the send -> open -> click funnel of a campaign"""
+    org_id = cache.get('org_id')
+    campaign_id = request.GET.get('campaign_id')
+
+    if not org_id or not campaign_id:
+        return JsonResponse({'error': 'Missing required parameters'}, status=400)
+    if not campaign_id.isdigit() or not CampaignDetails.objects.filter(org_id_id=org_id, campaign_id=campaign_id).exists():
+        return JsonResponse({'error': 'Campaign not found'}, status=404)
+
+    return JsonResponse({'funnel': get_campaign_funnel(org_id, int(campaign_id))})
+
+
+def get_dashboard_summary(request):
+    """Fetch the dashboard summary snapshot for the logged-in user"""
+    org_id = cache.get('org_id')
+    if not org_id:
+        return JsonResponse({'error': 'Organization not found'}, status=400)
+
+    return JsonResponse({'summary': get_dashboard_snapshot(org_id)})
+
+
+def export_engagements(request):
+    """Stream the engagement rows of the organization, or of one campaign, as NDJSON or CSV"""
+    org_id = cache.get('org_id')
+    if not org_id:
+        return JsonResponse({'error': 'Organization not found'}, status=400)
+
+    export_format = request.GET.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}, status=400)
+
+    campaign_id = request.GET.get('campaign_id')
+    if campaign_id:
+        if not campaign_id.isdigit() or not CampaignDetails.objects.filter(org_id_id=org_id, campaign_id=campaign_id).exists():
+            return JsonResponse({'error': 'Campaign not found'}, status=404)
+        campaign_id = int(campaign_id)
+
+    render_lines, content_type, extension = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(render_lines(engagement_rows(org_id, campaign_id)), content_type=content_type)
+    filename = f"engagements_campaign_{campaign_id}" if campaign_id else f"engagements_org_{org_id}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
+    return response
+
 
 @api_view(['GET'])
 def autofill_time(request):
@@ -688,26 +812,12 @@ def autofill_time(request):
         if not org_id:
             return Response({"error": "Organization not found"}, status=400)
 
-        open_times_qs = CompanyUserEngagement.objects.filter(org_id_id=org_id)
-        times = []
-
-        for record in open_times_qs:
-            try:
-                time_obj = record.open_time.time()
-                delta = timedelta(hours=time_obj.hour, minutes=time_obj.minute, seconds=time_obj.second)
-                times.append(delta)
-            except Exception as e:
-                print(f"Error parsing datetime object: {e}")
-
-        if not times:
+        optimal_start_time = get_optimal_start_time(org_id)
+        if optimal_start_time is None:
             return Response({"message": "No valid open times found"}, status=404)
 
-        total_seconds = sum(t.total_seconds() for t in times)
-        avg_seconds = total_seconds / len(times)
-        avg_time = (datetime.min + timedelta(seconds=avg_seconds)).time()
-
         return Response({
-            "optimalStartTime": avg_time.strftime("%H:%M")
+            "optimalStartTime": optimal_start_time
         })
     except Exception as e:
         logger.error(f"Error in autofill_time: {str(e)}")
@@ -736,10 +846,12 @@ def track_email_open(request):
             ).order_by('-send_time').first()
 
             if engagement:
+                first_open = engagement.open_time is None
                 engagement.open_time = now()
-                engagement.engagement_delay = (engagement.click_time - engagement.open_time).total_seconds()
                 engagement.save()
-                logger.info(f"Email click tracked for {user_email} in organization {organization_id}")
+                if first_open:
+                    record_open(engagement.org_id_id, engagement.user_id_id, engagement.send_time.hour)
+                logger.info(f"Email open tracked for {user_email} in organization {organization_id}")
             else:
                 logger.warning(f"No unclicked engagement found for {user_email} in {organization_id}")
 
@@ -925,13 +1037,38 @@ def get_email_normal(request):
 
 @api_view(['GET'])
 def get_company_users(request):
-    """Fetch all users in the organization"""
+    """Fetch a page of users in the organization"""
     org_id = cache.get('org_id')
     if not org_id:
         return JsonResponse({'error': 'Organization not found'}, status=400)
-        
-    company_users = CompanyUser.objects.filter(org_id_id = org_id)
-    return JsonResponse({'company_users':list(company_users.values())})
+
+    try:
+        company_users, next_cursor = keyset_page(
+            CompanyUser.objects.filter(org_id_id = org_id),
+            request.GET,
+            pk='id',
+            fields=COMPANY_USER_FIELDS,
+            sortable=COMPANY_USER_SORT_FIELDS,
+            default_fields=COMPANY_USER_FIELDS,
+            filters=COMPANY_USER_FILTERS,
+        )
+    except PaginationError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'company_users': company_users, 'next_cursor': next_cursor})
+
+
+@api_view(['GET'])
+def search_company_users(request):
+    """Typeahead search over the organization's contacts by email, name and location"""
+    org_id = cache.get('org_id')
+    if not org_id:
+        return JsonResponse({'error': 'Organization not found'}, status=400)
+
+    try:
+        query, limit = parse_search_params(request.GET)
+    except SearchError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'company_users': search_contacts(org_id, query, limit)})
 
 
 
@@ -990,65 +1127,176 @@ def add_user(request):
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
 
+@api_view(['POST'])
+def bulk_upsert_users(request):
+    """Create or update many of the organization's contacts, keyed by email"""
+    org_id = cache.get("org_id")
+    if not org_id:
+        return Response({"error": "Organization not found."}, status=status.HTTP_400_BAD_REQUEST)
+
+    contacts = request.data.get("contacts")
+    if not isinstance(contacts, list) or not contacts:
+        return Response({"error": "contacts must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+    if len(contacts) > MAX_UPSERT_CONTACTS:
+        return Response({"error": f"At most {MAX_UPSERT_CONTACTS} contacts per request."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        results = upsert_contacts(org_id, contacts)
+    except ContactConflictError as e:
+        return Response({"error": f"{e} was added by another organization during the request; retry."}, status=status.HTTP_409_CONFLICT)
+
+    counts = Counter(result['status'] for result in results)
+    return Response({
+        "created": counts['created'],
+        "updated": counts['updated'],
+        "rejected": counts['error'],
+        "results": results,
+    })
+
+
 @api_view(['POST'])
 def upload_company_users_csv(request):
     """Upload a CSV file to add multiple users to the organization"""
     if "file" not in request.FILES:
         return Response({"error": "No file uploaded."}, status=status.HTTP_400_BAD_REQUEST)
 
-    file = request.FILES["file"]
-    decoded_file = TextIOWrapper(file.file, encoding="utf-8")
-    reader = csv.DictReader(decoded_file)
+    org_id = cache.get("org_id")
+    if not org_id:
+        return Response({"error": "Organization not found."}, status=status.HTTP_400_BAD_REQUEST)
+
+    upload = request.FILES["file"]
+    # The row count of a compressed upload is not bounded by its size
+    run_async = request.query_params.get("async", "").lower() in ("1", "true")
+    if upload.size > settings.CONTACT_IMPORT_ASYNC_BYTES or is_gzipped(upload.file) or run_async:
+        job = store_upload(org_id, upload)
+        import_contacts.delay(job.id)
+        return Response({"job": job_status(job)}, status=status.HTTP_202_ACCEPTED)
 
-    created_users = []
-    for row in reader:
-        email = row.get("email")
-        try:
-            validate_email(email)
-        except ValidationError:
-            print('invalid email')  # Skip invalid emails
+    reader = csv.DictReader(open_csv_text(upload.file))
+    if not reader.fieldnames or "email" not in reader.fieldnames:
+        return Response({"error": "The CSV file must have a header row with an email column."}, status=status.HTTP_400_BAD_REQUEST)
+
+    importer = ContactImporter(org_id).run(reader)
+    logger.info(f"Imported contacts for organization {org_id}: {importer.summary()}")
+    return Response({"users": importer.users, "summary": importer.summary()}, status=status.HTTP_201_CREATED)
+
+@api_view(['GET'])
+def get_import_job(request, job_id):
+    """Progress of a background contact import of the organization"""
+    org_id = cache.get("org_id")
+    job = ContactImportJob.objects.filter(id=job_id, org_id_id=org_id).first()
+    if not job:
+        return Response({"error": "Import job not found."}, status=status.HTTP_404_NOT_FOUND)
+    return Response({"job": job_status(job)})
+
+def segment_data(segment):
+    return {
+        'id': segment.id,
+        'name': segment.name,
+        'definition': segment.definition,
+        'size': get_segment_size(segment),
+        'updated_at': segment.updated_at,
+    }
+
+
+@api_view(['GET', 'POST'])
+def audience_segments(request):
+    """List the organization's audience segments, or save a new one"""
+    org_id = cache.get("org_id")
+    if not org_id:
+        return Response({"error": "Organization not found."}, status=status.HTTP_400_BAD_REQUEST)
+
+    if request.method == 'GET':
+        segments = AudienceSegment.objects.filter(org_id_id=org_id).order_by('name')
+        return Response({"segments": [segment_data(segment) for segment in segments]})
+
+    name = str(request.data.get("name", "")).strip()
+    if not name:
+        return Response({"error": "name is required."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        definition = validate_definition(request.data.get("definition", {}))
+    except SegmentError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if AudienceSegment.objects.filter(org_id_id=org_id, name=name).exists():
+        return Response({"error": "A segment with this name already exists."}, status=status.HTTP_400_BAD_REQUEST)
+
+    segment = AudienceSegment.objects.create(org_id_id=org_id, name=name, definition=definition)
+    return Response({"segment": segment_data(segment)}, status=status.HTTP_201_CREATED)
 
-        if CompanyUser.objects.filter(email=email).exists():
-            continue  # Skip duplicates
 
+@api_view(['GET', 'PUT', 'DELETE'])
+def audience_segment(request, segment_id):
+    """Fetch, redefine or delete one audience segment"""
+    org_id = cache.get("org_id")
+    segment = AudienceSegment.objects.filter(id=segment_id, org_id_id=org_id).first()
+    if not segment:
+        return Response({"error": "Segment not found."}, status=status.HTTP_404_NOT_FOUND)
+
+    if request.method == 'DELETE':
+        # Deleting a targeted segment would silently widen its campaigns to the whole organization
+        if segment.campaigns.exists() or audiences_using_source(org_id, f"segment:{segment.id}"):
+            return Response({"error": "Segment is targeted by campaigns."}, status=status.HTTP_400_BAD_REQUEST)
+        segment.delete()
+        cache.delete(segment_size_key(segment_id))
+        return Response({"status": "success"})
+
+    if request.method == 'PUT':
         try:
-            user = CompanyUser.objects.create(
-                first_name=row.get("first_name", ""),
-                last_name=row.get("last_name", ""),
-                email=email,
-                age=row.get("age"),
-                gender=row.get("gender"),
-                location=row.get("location"),
-                timezone=row.get("timezone"),
-                date_joined= now(),
-                org_id_id = cache.get("org_id")
-            )
-            print(user)
-            created_users.append({
-                "id": user.id,
-                "first_name": user.first_name,
-                "last_name": user.last_name,
-                "email": user.email,
-                "age": user.age,
-                "gender": user.gender,
-                "location": user.location,
-                "timezone": user.timezone,
-                "date_joined": user.date_joined,
-                "org_id_id":user.org_id_id
-            })
-        except Exception as e:
-            print(e)
+            segment.definition = validate_definition(request.data.get("definition", segment.definition))
+        except SegmentError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        name = str(request.data.get("name", segment.name)).strip() or segment.name
+        if AudienceSegment.objects.filter(org_id_id=org_id, name=name).exclude(id=segment.id).exists():
+            return Response({"error": "A segment with this name already exists."}, status=status.HTTP_400_BAD_REQUEST)
+        segment.name = name
+        segment.save()
+        cache.delete(segment_size_key(segment_id))
+
+    return Response({"segment": segment_data(segment)})
+
+@api_view(['POST'])
+def resolve_audience_view(request):
+    """
+    Preview the size and first contact ids of a combination of audiences,
+    e.g. a segment minus last campaign's clickers
+    """
+    org_id = cache.get("org_id")
+    if not org_id:
+        return Response({"error": "Organization not found."}, status=status.HTTP_400_BAD_REQUEST)
 
-    return Response({"users": created_users}, status=status.HTTP_201_CREATED)
+    try:
+        limit = int(request.data.get("limit", 100))
+    except (TypeError, ValueError):
+        return Response({"error": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+    if limit < 0:
+        return Response({"error": "limit must not be negative."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        audience = validate_audience({key: request.data.get(key, []) for key in AUDIENCE_KEYS})
+        bitmap = resolve_audience(org_id, **audience)
+    except AudienceError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    limit = min(limit, 10000)
+
+    return Response({"size": len(bitmap), "contact_ids": bitmap.to_ids()[:limit].tolist()})
 
 @csrf_exempt
 @api_view(['POST'])
 def delete_users(request):
-    """Delete users from the organization"""
-    user_ids = request.data.get('user_ids', [])
-    if not isinstance(user_ids, list):
+    """Delete users from the organization; large deletions run in the background"""
+    org_id = cache.get("org_id")
+    if not org_id:
+        return Response({"error": "Organization not found."}, status=status.HTTP_400_BAD_REQUEST)
+
+    delete_all = request.data.get('all') is True
+    user_ids = None if delete_all else request.data.get('user_ids', [])
+    if not delete_all and not isinstance(user_ids, list):
         return Response({"error": "user_ids must be a list"}, status=status.HTTP_400_BAD_REQUEST)
-    deleted_count, _ = CompanyUser.objects.filter(id__in=user_ids).delete()
+
+    if delete_all or len(user_ids) > INLINE_DELETE_LIMIT:
+        task = delete_company_users.delay(org_id, user_ids)
+        return Response({"status": "scheduled", "task_id": task.id}, status=status.HTTP_202_ACCEPTED)
+
+    deleted_count = delete_contacts(org_id, user_ids)
     return Response({"status": "success", "deleted": deleted_count}, status=status.HTTP_200_OK)
 
 @api_view(['GET'])
@@ -290,11 +290,28 @@ AUTH_USER_MODEL = 'api.User'
 SOCIAL_AUTH_USER_MODEL = 'api.User'
 
 
+# Cache shared by the web processes and the Celery worker, so invalidation done
+# on either side (engagement signals, background imports and deletions) is seen
+# by both
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('CACHE_URL', 'redis://localhost:6380/1'),
+    }
+}
+
 # Celery settings
 CELERY_BROKER_URL = "redis://localhost:6380/0"
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 
+# Contact CSV uploads larger than this are stored under CONTACT_IMPORT_DIR and
+# imported by a background job instead of inside the request
+CONTACT_IMPORT_DIR = os.path.join(BASE_DIR, 'imports')
+CONTACT_IMPORT_ASYNC_BYTES = 5 * 1024 * 1024
+# Uploads larger than this are spooled to a temporary file instead of memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024
+
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
@@ -8,6 +8,12 @@ DATABASES['default'] = {
     'HOST': 'smartreachai-tests-smartreachai-tests.k.aivencloud.com',
     'PORT': 27244,
 }
+# Tests clear the cache freely, so they get a private in-process one
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
 SILENCED_SYSTEM_CHECKS = [
     "staticfiles.W004",
     "fields.W342",
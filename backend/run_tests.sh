@@ -15,6 +15,29 @@ declare -a TEST_CLASSES=(
     "GetEmailTests"
     "CompanyUserTests"
     "ModelConstraintsTests"
+    "CohortSendTimeTests"
+    "LocalSendTimeTests"
+    "AutofillTimeTests"
+    "SendTimeBanditTests"
+    "SyntheticDataTests"
+    "RetrainSendTimesTests"
+    "RetrainProcessPoolTests"
+    "ChartDataTests"
+    "DashboardSummaryTests"
+    "ListingPaginationTests"
+    "EngagementExportTests"
+    "CampaignFunnelTests"
+    "ConditionalGetTests"
+    "ParquetSnapshotTests"
+    "EngagementDelaySketchTests"
+    "ContactImportJobTests"
+    "CopyContactImportTests"
+    "ContactDeletionTests"
+    "AudienceSegmentTests"
+    "AudienceBitmapTests"
+    "EngagementIndexTests"
+    "ContactSearchTests"
+    "BulkContactUpsertTests"
 )
 
 for test_class in "${TEST_CLASSES[@]}"; do
@@ -6,6 +6,9 @@ import { useRouter } from "next/navigation";
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, Legend } from "recharts";
 import { UserPlus, Upload, Search, X } from "lucide-react";
 
+const USERS_PAGE_SIZE = 100;
+const IMPORT_POLL_INTERVAL = 2000;
+
 function CustomersPage() {
   const [users, setUsers] = useState([]);
   const [filteredUsers, setFilteredUsers] = useState([]);
@@ -19,6 +22,9 @@ const [selectAll, setSelectAll] = useState(false);
     engagementDelay: true,
   });
   const [searchTerm, setSearchTerm] = useState("");
+  const [nextCursor, setNextCursor] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
+  const [importJob, setImportJob] = useState(null);
   const [showAddModal, setShowAddModal] = useState(false);
   const [showCsvModal, setShowCsvModal] = useState(false);
   const [formData, setFormData] = useState({
@@ -33,6 +39,32 @@ const [selectAll, setSelectAll] = useState(false);
   const [csvFile, setCsvFile] = useState(null);
   const router = useRouter();
 
+  // Fetch one page of users after the given cursor
+  const fetchUsersPage = async (cursor) => {
+    const token = localStorage.getItem("authToken");
+    const query = new URLSearchParams({ limit: String(USERS_PAGE_SIZE) });
+    if (cursor) query.set("cursor", cursor);
+    const usersResponse = await fetch(`/api/get-company-users/?${query}`, {
+      headers: { "Authorization": `Token ${token}` },
+      credentials: "include",
+    });
+    if (!usersResponse.ok) throw new Error("Failed to fetch users");
+    return usersResponse.json();
+  };
+
+  const handleLoadMore = async () => {
+    setIsLoadingMore(true);
+    try {
+      const usersData = await fetchUsersPage(nextCursor);
+      setUsers([...users, ...(usersData.company_users || [])]);
+      setNextCursor(usersData.next_cursor);
+    } catch (err) {
+      console.error("Error fetching users:", err);
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   // Fetch users and engagement data
   useEffect(() => {
     const fetchData = async () => {
@@ -40,15 +72,11 @@ const [selectAll, setSelectAll] = useState(false);
         const token = localStorage.getItem("authToken");
 
 
-        // Fetch users (CompanyUser)
-        const usersResponse = await fetch("/api/get-company-users/", {
-          headers: { "Authorization": `Token ${token}` },
-          credentials: "include",
-        });
-        if (!usersResponse.ok) throw new Error("Failed to fetch users");
-        const usersData = await usersResponse.json();
+        // Fetch the first page of users (CompanyUser); later pages load on demand
+        const usersData = await fetchUsersPage(null);
         setUsers(usersData.company_users || []);
         setFilteredUsers(usersData.company_users || []);
+        setNextCursor(usersData.next_cursor);
 
         // Fetch engagement data for chart
         const chartResponse = await fetch("/api/user-engagement-stats/", {
@@ -73,16 +101,57 @@ const [selectAll, setSelectAll] = useState(false);
     fetchData();
   }, [router]);
 
-  // Filter users based on search term
+  // Search users on the server once the search term is long enough
   useEffect(() => {
-    const results = users.filter(user =>
-      `${user.first_name} ${user.last_name}`.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      user.email.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      (user.location && user.location.toLowerCase().includes(searchTerm.toLowerCase()))
-    );
-    setFilteredUsers(results);
+    const term = searchTerm.trim();
+    if (term.length < 3) {
+      setFilteredUsers(users);
+      return;
+    }
+    const timeout = setTimeout(async () => {
+      try {
+        const token = localStorage.getItem("authToken");
+        const query = new URLSearchParams({ q: term, limit: "50" });
+        const response = await fetch(`/api/search-company-users/?${query}`, {
+          headers: { "Authorization": `Token ${token}` },
+          credentials: "include",
+        });
+        if (!response.ok) throw new Error("Failed to search users");
+        const data = await response.json();
+        setFilteredUsers(data.company_users || []);
+      } catch (err) {
+        console.error("Error searching users:", err);
+      }
+    }, 200);
+    return () => clearTimeout(timeout);
   }, [searchTerm, users]);
 
+  // Poll a background import until it finishes, then reload the first page of users
+  useEffect(() => {
+    if (!importJob || ["completed", "failed"].includes(importJob.status)) return;
+    const timeout = setTimeout(async () => {
+      try {
+        const token = localStorage.getItem("authToken");
+        const response = await fetch(`/api/import-jobs/${importJob.id}/`, {
+          headers: { "Authorization": `Token ${token}` },
+          credentials: "include",
+        });
+        if (!response.ok) throw new Error("Failed to fetch import job");
+        const data = await response.json();
+        setImportJob(data.job);
+        // Chunks committed before a failure are kept, so reload on either final status
+        if (["completed", "failed"].includes(data.job.status)) {
+          const usersData = await fetchUsersPage(null);
+          setUsers(usersData.company_users || []);
+          setNextCursor(usersData.next_cursor);
+        }
+      } catch (err) {
+        console.error("Error polling import job:", err);
+      }
+    }, IMPORT_POLL_INTERVAL);
+    return () => clearTimeout(timeout);
+  }, [importJob]);
+
   // Handle form input changes
   const handleInputChange = (e) => {
     const { name, value } = e.target;
@@ -145,8 +214,13 @@ const [selectAll, setSelectAll] = useState(false);
       });
       if (!response.ok) throw new Error("Failed to upload CSV");
       const data = await response.json();
-      setUsers([...users, ...data.users]);
-      setFilteredUsers([...users, ...data.users]); // Update filtered list too
+      if (data.job) {
+        // Large files are imported in the background; poll the job until it finishes
+        setImportJob(data.job);
+      } else {
+        setUsers([...users, ...data.users]);
+        setFilteredUsers([...users, ...data.users]); // Update filtered list too
+      }
       setShowCsvModal(false);
       setCsvFile(null);
     } catch (err) {
@@ -299,6 +373,22 @@ const [selectAll, setSelectAll] = useState(false);
             
           </div>
 
+          {/* Background Import Status */}
+          {importJob && (
+            <div className="mb-6 bg-[#1A1F4A] rounded-lg p-4 text-gray-300 flex justify-between items-center">
+              <p>
+                Importing {importJob.file_name}: {importJob.status}, {importJob.processed} rows processed,{" "}
+                {importJob.created} added, {importJob.rejected} rejected
+                {importJob.status === "failed" && importJob.error ? ` (${importJob.error})` : ""}
+              </p>
+              {["completed", "failed"].includes(importJob.status) && (
+                <button onClick={() => setImportJob(null)} className="text-gray-400 hover:text-white">
+                  <X size={16} />
+                </button>
+              )}
+            </div>
+          )}
+
           {/* Search Section */}
           <div className="mb-6">
             <div className="relative w-full md:w-64">
@@ -457,6 +547,17 @@ const [selectAll, setSelectAll] = useState(false);
                     )}
                   </tbody>
                 </table>
+                {nextCursor && searchTerm.trim().length < 3 && (
+                  <div className="flex justify-center py-4 bg-[#1A1F4A]">
+                    <button
+                      onClick={handleLoadMore}
+                      disabled={isLoadingMore}
+                      className="bg-blue-600 hover:bg-blue-700 text-white py-2 px-4 rounded-lg disabled:opacity-50"
+                    >
+                      {isLoadingMore ? "Loading..." : "Load more"}
+                    </button>
+                  </div>
+                )}
               </div>
             )}
           </div>
@@ -6,10 +6,14 @@ import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContai
 import NavigationMenu from '../components/NavigationMenu';
 import Footer from '../components/Footer';
 
+const CAMPAIGNS_PAGE_SIZE = 100;
+
 function HomePage() {
   const [campaigns, setCampaigns] = useState([]);
   const [filteredCampaigns, setFilteredCampaigns] = useState([]);
   const [isLoading, setIsLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [searchTerm, setSearchTerm] = useState('');
   const [filterDate, setFilterDate] = useState('all');
   const [selectedMetrics, setSelectedMetrics] = useState({
@@ -20,14 +24,35 @@ function HomePage() {
   const [performanceData, setPerformanceData] = useState([]);
   const router = useRouter();
 
-  // Fetch campaigns data
+  // Fetch one page of campaigns after the given cursor
+  const fetchCampaignsPage = async (cursor) => {
+    const query = new URLSearchParams({ limit: String(CAMPAIGNS_PAGE_SIZE) });
+    if (cursor) query.set('cursor', cursor);
+    const res = await fetch(`/api/campaigns/?${query}`, { credentials: 'include' });
+    return res.json();
+  };
+
+  const handleLoadMore = async () => {
+    setIsLoadingMore(true);
+    try {
+      const data = await fetchCampaignsPage(nextCursor);
+      setCampaigns([...campaigns, ...(data.campaigns || [])]);
+      setNextCursor(data.next_cursor || null);
+    } catch (err) {
+      console.error('Error fetching campaigns:', err);
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
+  // Fetch the first page of campaigns; later pages load on demand
   useEffect(() => {
-    fetch('/api/campaigns/', { credentials: 'include' })
-      .then((res) => res.json())
+    fetchCampaignsPage(null)
       .then((data) => {
         const campaignsData = data.campaigns || [];
         setCampaigns(campaignsData);
         setFilteredCampaigns(campaignsData);
+        setNextCursor(data.next_cursor || null);
         setIsLoading(false);
       })
       .catch((err) => {
@@ -250,6 +275,18 @@ function HomePage() {
                   </p>
                 )}
               </div>
+
+              {nextCursor && (
+                <div className="flex justify-center mt-6">
+                  <button
+                    onClick={handleLoadMore}
+                    disabled={isLoadingMore}
+                    className="bg-blue-600 hover:bg-blue-700 text-white py-2 px-4 rounded-lg disabled:opacity-50"
+                  >
+                    {isLoadingMore ? 'Loading...' : 'Load more'}
+                  </button>
+                </div>
+              )}
             </>
           )}
         </div>